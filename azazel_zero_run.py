@@ -2,14 +2,9 @@
 from __future__ import annotations
 
 import argparse
-import json
-import logging
 import os
 import signal
-import subprocess
 import sys
-import time
-import urllib.request
 from pathlib import Path
 
 REPO_ROOT = Path(__file__).resolve().parent
@@ -17,12 +12,18 @@ PY_ROOT = REPO_ROOT / "py"
 if str(PY_ROOT) not in sys.path:
     sys.path.insert(0, str(PY_ROOT))
 
-from azazel_zero.first_minute.config import FirstMinuteConfig
-from azazel_zero.first_minute.controller import FirstMinuteController
-from azazel_zero.first_minute.nft import NftManager
-from azazel_zero.first_minute.probes import run_all
+# Only the config and stage names are needed to parse arguments. Everything
+# else (controller, probes -> ssl/urllib, http.server, nft/tc, NumPy) is
+# imported inside the subcommand that uses it so stop/status/reload stay
+# cheap on a Zero 2 W. Check with tools/cli_startup_bench.py.
+from azazel_zero.first_minute.config import ConfigError, FirstMinuteConfig
+from azazel_zero.first_minute import replay
 from azazel_zero.first_minute.state_machine import Stage
-from azazel_zero.first_minute.tc import TcManager
+
+# Subcommands that write to the log file / console through logging.
+LOGGING_COMMANDS = ("start", "force-state", "cleanup")
+# Subcommands that apply the config (or ask the daemon to): refuse an invalid one up front.
+VALIDATED_COMMANDS = ("start", "reload", "force-state", "dry-run")
 
 
 def parse_args() -> argparse.Namespace:
@@ -41,13 +42,21 @@ def parse_args() -> argparse.Namespace:
     sub = parser.add_subparsers(dest="command")
     sub.add_parser("start", parents=[common], add_help=False, help="コントローラ起動")
     sub.add_parser("stop", parents=[common], add_help=False, help="デーモンにSIGTERMを送って停止")
-    sub.add_parser("status", parents=[common], add_help=False, help="PID表示とローカルAPIの簡易ステータス取得")
+    sub.add_parser("reload", parents=[common], add_help=False, help="デーモンにSIGHUPを送って設定を再読込")
+    status = sub.add_parser("status", parents=[common], add_help=False, help="PID表示とローカルAPIの簡易ステータス取得")
+    status.add_argument("--follow", action="store_true", help="/events (SSE) を購読してイベントを逐次表示")
     sub.add_parser("probe-now", parents=[common], add_help=False, help="安全プローブのみ即時実行して結果表示")
     force = sub.add_parser("force-state", parents=[common], add_help=False, help="指定ステージへ強制遷移 (tc/nft適用)")
     force.add_argument("state", choices=[s.value for s in Stage], help="目標ステージ")
     sub.add_parser("dry-run", parents=[common], add_help=False, help="nft/tcテンプレートを表示 (変更なし)")
     cleanup = sub.add_parser("cleanup", parents=[common], add_help=False, help="本プログラムが設定したnft/tc/dnsmasq(任意)を初期化")
     cleanup.add_argument("--kill-dnsmasq", action="store_true", help="dnsmasq-first_minute.confで起動したdnsmasqをpkillで落とす")
+    dump = sub.add_parser("flight-dump", parents=[common], add_help=False, help="フライトレコーダ(リングバッファ)の内容を表示")
+    dump.add_argument("--file", default="", help="レコーダファイル (既定: paths.flight_recorder)")
+    dump.add_argument("--all", action="store_true", help="変化のないティックも含めて全件表示")
+    dump.add_argument("--json", action="store_true", help="JSON Lines で出力 (replay の入力形式)")
+    rep = sub.add_parser("replay", parents=[common], add_help=False, help="記録トレースを状態機械で再生し、しきい値グリッドを評価")
+    replay.add_arguments(rep)
     sub.add_parser("help", parents=[common], add_help=False, help="このヘルプを表示")
 
     args = parser.parse_args()
@@ -68,10 +77,13 @@ def read_pid(pid_file: Path) -> int:
     return int(pid_file.read_text().strip())
 
 
-def setup_logging(cfg: FirstMinuteConfig) -> None:
-    cfg.ensure_dirs()
+def setup_logging(cfg: FirstMinuteConfig, console: bool = True) -> None:
+    import logging
+
     log_path = cfg.log_dir / "first_minute.log"
-    handlers = [logging.StreamHandler()]
+    # With --pretty-console the terminal belongs to the dashboard; log lines
+    # written in between would scroll it and break the row-diff redraw.
+    handlers = [logging.StreamHandler()] if console else []
     try:
         handlers.append(logging.FileHandler(log_path))
     except OSError:
@@ -85,6 +97,8 @@ def cmd_start(args: argparse.Namespace, cfg: FirstMinuteConfig) -> None:
     if os.geteuid() != 0:
         print("start: root 権限が必要です (sudo を使用してください)")
         sys.exit(1)
+    from azazel_zero.first_minute.controller import FirstMinuteController
+
     ctrl = FirstMinuteController(cfg, dry_run=args.dry_run, no_dns_start=args.no_dns_start, pretty_console=args.pretty_console)
     if args.daemonize:
         pid = os.fork()
@@ -111,31 +125,87 @@ def cmd_stop(cfg: FirstMinuteConfig) -> None:
         print("stop: プロセスにSIGTERMを送れませんでした（権限不足か既に終了）")
 
 
-def cmd_status(cfg: FirstMinuteConfig) -> None:
+def follow_events(base_url: str) -> None:
+    """Print Server-Sent Events from the status API until interrupted."""
+    import time
+    import urllib.request
+
+    event = "message"
+    with urllib.request.urlopen(base_url + "events", timeout=60) as resp:
+        for raw in resp:
+            line = raw.decode("utf-8").rstrip("\n")
+            if line.startswith("event: "):
+                event = line[7:]
+            elif line.startswith("data: "):
+                print(f"[{time.strftime('%H:%M:%S')}] {event}: {line[6:]}", flush=True)
+            elif not line:
+                event = "message"
+
+
+def http_get(host: str, port: int, path: str, timeout: float = 2.0) -> bytes:
+    """Plain HTTP/1.0 GET against the local status API.
+
+    urllib.request pulls in http.client, email and ssl; a socket is enough
+    for a loopback JSON endpoint and keeps `status` on the fast path.
+    """
+    import socket
+
+    with socket.create_connection((host, port), timeout=timeout) as sock:
+        sock.sendall(f"GET {path} HTTP/1.0\r\nHost: {host}\r\n\r\n".encode("ascii"))
+        chunks = []
+        while True:
+            data = sock.recv(65536)
+            if not data:
+                break
+            chunks.append(data)
+    head, _, body = b"".join(chunks).partition(b"\r\n\r\n")
+    status_line = head.split(b"\r\n", 1)[0].decode("latin-1")
+    parts = status_line.split(" ", 2)
+    if len(parts) < 2 or parts[1] != "200":
+        raise OSError(f"unexpected response: {status_line or 'empty'}")
+    return body
+
+
+def cmd_reload(cfg: FirstMinuteConfig) -> None:
+    pid = read_pid(cfg.pid_file)
+    try:
+        os.kill(pid, signal.SIGHUP)
+        print(f"Sent SIGHUP to {pid} (reload {cfg.source})")
+    except (PermissionError, ProcessLookupError):
+        print("reload: プロセスにSIGHUPを送れませんでした（権限不足か既に終了）")
+
+
+def cmd_status(cfg: FirstMinuteConfig, follow: bool = False) -> None:
     try:
         pid = read_pid(cfg.pid_file)
         print(f"Daemon PID: {pid}")
     except SystemExit:
         print("Daemon not running.")
-    url = f"http://{cfg.status_api.get('host', '127.0.0.1')}:{cfg.status_api.get('port', 8081)}/"
+    host, port = cfg.status_api.get("host", "127.0.0.1"), int(cfg.status_api.get("port", 8081))
     try:
-        with urllib.request.urlopen(url, timeout=2) as resp:
-            print(resp.read().decode("utf-8"))
+        if follow:
+            follow_events(f"http://{host}:{port}/")
+            return
+        print(http_get(host, port, "/").decode("utf-8"))
+    except KeyboardInterrupt:
+        pass
     except Exception as exc:
         print(f"Status API unavailable: {exc}")
 
 
 def cmd_probe_now(cfg: FirstMinuteConfig) -> None:
+    import json
+
+    from azazel_zero.first_minute.probes import run_all
+
     out = run_all(cfg.probes, cfg.interfaces["upstream"])
     print(json.dumps(out.details, indent=2))
 
 
-def cmd_force_state(cfg: FirstMinuteConfig, state: str) -> None:
-    stage = Stage(state)
-    if os.geteuid() != 0:
-        print("force-state: root 権限が必要です (sudo を使用してください)")
-        sys.exit(1)
-    nft = NftManager(
+def make_nft(cfg: FirstMinuteConfig):
+    from azazel_zero.first_minute.nft import NftManager
+
+    return NftManager(
         cfg.nft_template_path,
         cfg.interfaces["upstream"],
         cfg.interfaces["downstream"],
@@ -144,7 +214,17 @@ def cmd_force_state(cfg: FirstMinuteConfig, state: str) -> None:
         int(cfg.policy.get("probe_allow_ttl", 120)),
         int(cfg.policy.get("dynamic_allow_ttl", 300)),
     )
-    tc = TcManager(cfg.interfaces["downstream"], cfg.interfaces["upstream"])
+
+
+def cmd_force_state(cfg: FirstMinuteConfig, state: str) -> None:
+    stage = Stage(state)
+    if os.geteuid() != 0:
+        print("force-state: root 権限が必要です (sudo を使用してください)")
+        sys.exit(1)
+    from azazel_zero.first_minute.tc import TcManager
+
+    nft = make_nft(cfg)
+    tc = TcManager(cfg.interfaces["downstream"], cfg.interfaces["upstream"], cfg.tc)
     try:
         nft.set_stage(stage)
     except Exception:
@@ -155,21 +235,13 @@ def cmd_force_state(cfg: FirstMinuteConfig, state: str) -> None:
 
 
 def cmd_dry_run(cfg: FirstMinuteConfig) -> None:
-    nft = NftManager(
-        cfg.nft_template_path,
-        cfg.interfaces["upstream"],
-        cfg.interfaces["downstream"],
-        cfg.interfaces["mgmt_ip"],
-        cfg.interfaces["mgmt_subnet"],
-        int(cfg.policy.get("probe_allow_ttl", 120)),
-        int(cfg.policy.get("dynamic_allow_ttl", 300)),
-    )
+    from azazel_zero.first_minute.tc import TcManager
+
+    nft = make_nft(cfg)
     print("=== nftables preview ===")
     print(nft.render_preview())
     print("=== tc stages ===")
-    print("PROBE: netem 220ms/100ms; tbf 1mbit")
-    print("DEGRADED: netem 150ms/50ms; tbf 2mbit")
-    print("CONTAIN: netem 400ms/200ms loss 5%; tbf 512kbit")
+    print(TcManager(cfg.interfaces["downstream"], cfg.interfaces["upstream"], cfg.tc).describe())
 
 
 def cmd_cleanup(cfg: FirstMinuteConfig, kill_dnsmasq: bool) -> None:
@@ -177,15 +249,11 @@ def cmd_cleanup(cfg: FirstMinuteConfig, kill_dnsmasq: bool) -> None:
     if os.geteuid() != 0:
         print("cleanup: root 権限が必要です (sudo を使用してください)")
         sys.exit(1)
-    nft = NftManager(
-        cfg.nft_template_path,
-        cfg.interfaces["upstream"],
-        cfg.interfaces["downstream"],
-        cfg.interfaces["mgmt_ip"],
-        cfg.interfaces["mgmt_subnet"],
-        int(cfg.policy.get("probe_allow_ttl", 120)),
-        int(cfg.policy.get("dynamic_allow_ttl", 300)),
-    )
+    import subprocess
+
+    from azazel_zero.first_minute.tc import TcManager
+
+    nft = make_nft(cfg)
     tc = TcManager(cfg.interfaces["downstream"], cfg.interfaces["upstream"])
     nft.clear()
     tc.clear()
@@ -203,22 +271,59 @@ def cmd_cleanup(cfg: FirstMinuteConfig, kill_dnsmasq: bool) -> None:
     print("Cleanup complete (nft/tc flushed{})".format(", dnsmasq stopped" if kill_dnsmasq else ""))
 
 
+def cmd_flight_dump(cfg: FirstMinuteConfig, path: str, show_all: bool, as_json: bool) -> None:
+    import json
+    import time
+
+    from azazel_zero.first_minute.flight_recorder import format_signals, iter_changes, read_records
+
+    try:
+        records = read_records(Path(path) if path else cfg.flight_recorder_path)
+    except (OSError, ValueError) as exc:
+        print(f"flight-dump: {exc}")
+        sys.exit(1)
+    rows = records if show_all else list(iter_changes(records))
+    for rec in rows:
+        if as_json:
+            print(json.dumps(rec))
+            continue
+        active = format_signals(rec["signals"]) or "-"
+        bssid = rec["signals"].get("bssid") or "-"
+        stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(rec["ts"]))
+        print(f"{stamp}  {rec['stage']:9}  {rec['suspicion']:6.2f}  {bssid:17}  {active}")
+
+
 def main() -> None:
     args = parse_args()
-    cfg = FirstMinuteConfig.load(args.config)
-    setup_logging(cfg)
+    try:
+        cfg = FirstMinuteConfig.load(args.config)
+    except ConfigError as exc:
+        raise SystemExit(f"config: {exc}")
+    if args.command in VALIDATED_COMMANDS:
+        errors = cfg.validate()
+        if errors:
+            raise SystemExit(f"config: {cfg.source}: " + "; ".join(errors))
+    cfg.ensure_dirs()
+    if args.command in LOGGING_COMMANDS:
+        setup_logging(cfg, console=not (args.command == "start" and args.pretty_console))
     if args.command == "start":
         cmd_start(args, cfg)
     elif args.command == "stop":
         cmd_stop(cfg)
+    elif args.command == "reload":
+        cmd_reload(cfg)
     elif args.command == "status":
-        cmd_status(cfg)
+        cmd_status(cfg, args.follow)
     elif args.command == "probe-now":
         cmd_probe_now(cfg)
     elif args.command == "force-state":
         cmd_force_state(cfg, args.state)
     elif args.command == "dry-run":
         cmd_dry_run(cfg)
+    elif args.command == "flight-dump":
+        cmd_flight_dump(cfg, args.file, args.all, args.json)
+    elif args.command == "replay":
+        sys.exit(replay.run(args, cfg.state_machine))
     elif args.command == "cleanup":
         cmd_cleanup(cfg, args.kill_dnsmasq)
     else:
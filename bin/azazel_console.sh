@@ -22,6 +22,10 @@ export LANG LC_ALL LC_CTYPE
 export HOME
 export PATH="/usr/local/sbin:/usr/local/bin:/usr/sbin:/usr/bin:$PATH"
 
+# 共有ステータスコレクタを起動（既に動いていればロックで即終了）。
+# 上段ステータスとメニューはこのスナップショットを読むだけ。
+PYTHONPATH="${AZAZEL_ROOT}/py" python3 -m azazel_zero.console.collector --detach >/dev/null 2>&1 || true
+
 # Ensure tmux server, then create or replace the session idempotently
 set +e
 tmux start-server
@@ -6,7 +6,6 @@ set -euo pipefail
 [ -f /etc/default/azazel-zero ] && . /etc/default/azazel-zero || true
 AZAZEL_ROOT="${AZAZEL_ROOT:-/home/azazel/Azazel-Zero}"
 EPD_PY="${EPD_PY:-${AZAZEL_ROOT}/py/boot_splash_epd.py}"
-LOCK="/run/azazel-epd.lock"
 
 # スクリプトが無ければ静かに撤退
 [ -f "$EPD_PY" ] || exit 0
@@ -25,23 +24,10 @@ if [ "${GRACE_S:-0}" -gt 0 ] && [ "${UP_S:-0}" -lt "${GRACE_S:-0}" ]; then
   exit 0
 fi
 
-# 4) 連打抑止（最低インターバル）。環境変数 MIN_EPD_INTERVAL（秒, デフォルト1）
-STAMP="/run/azazel-epd.stamp"
-MIN_EPD_INTERVAL="${MIN_EPD_INTERVAL:-1}"
-NOW="$(date +%s)"
-if [ -f "$STAMP" ]; then
-  LAST="$(cat "$STAMP" 2>/dev/null || echo 0)"
-  if [ $(( NOW - LAST )) -lt "${MIN_EPD_INTERVAL}" ]; then
-    exit 0
-  fi
-fi
-echo "$NOW" > "$STAMP" 2>/dev/null || true
-
-# 5) EPD 更新（排他・非特権でも失敗を許容）
-if command -v flock >/dev/null 2>&1; then
-  flock -w 0 "$LOCK" /usr/bin/python3 "$EPD_PY" --mode info --no-clear --gentle "$INFO" >/dev/null 2>&1 || true
-else
-  /usr/bin/python3 "$EPD_PY" --mode info --no-clear --gentle "$INFO" >/dev/null 2>&1 || true
-fi
+# 4) EPD 更新。常駐の azazel-epd（epd_daemon.py）へ要求を送るだけで戻る。
+#    連打は daemon 側でまとめ、MIN_EPD_INTERVAL（秒, デフォルト1）で間引く。
+#    daemon が居なければ client が flock 付きで boot_splash_epd.py を直接実行する。
+PYTHONPATH="${AZAZEL_ROOT}/py${PYTHONPATH:+:$PYTHONPATH}" \
+  /usr/bin/python3 -m azazel_zero.console.epd_client info --no-clear --gentle "$INFO" >/dev/null 2>&1 || true
 
-exit 0
\ No newline at end of file
+exit 0
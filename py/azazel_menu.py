@@ -15,90 +15,27 @@ import sys
 import time
 from typing import List, Tuple, Optional
 
-# ===== Network status helpers and header renderer =====
-import shlex
-
-def _sh(cmd: str) -> str:
-    try:
-        out = subprocess.check_output(shlex.split(cmd), stderr=subprocess.DEVNULL, timeout=1.5)
-        return out.decode().strip()
-    except Exception:
-        return ""
-
-def _ip4_addr(iface: str) -> str:
-    out = _sh(f"ip -4 addr show {iface}")
-    for line in out.splitlines():
-        line = line.strip()
-        if line.startswith("inet "):
-            return line.split()[1].split("/")[0]
-    return ""
-
-def _default_gw_iface() -> str:
-    out = _sh("ip route get 8.8.8.8")
-    parts = out.split()
-    if "dev" in parts:
-        try:
-            return parts[parts.index("dev") + 1]
-        except Exception:
-            pass
-    return ""
-
-def _ssid_and_bssid() -> Tuple[str, str]:
-    ssid = _sh("iwgetid -r")
-    if not ssid:
-        st = _sh("wpa_cli status")
-        for ln in st.splitlines():
-            if ln.startswith("ssid="):
-                ssid = ln.split("=", 1)[1].strip()
-                break
-    bssid = ""
-    st = _sh("wpa_cli status")
-    for ln in st.splitlines():
-        if ln.startswith("bssid="):
-            bssid = ln.split("=", 1)[1].strip()
-            break
-    return ssid or "—", bssid or "—"
+# ===== Network status (shared background collector) =====
+HERE = os.path.abspath(os.path.dirname(__file__))
+if HERE not in sys.path:
+    sys.path.insert(0, HERE)
 
-def _dnsmasq_leases_path() -> str:
-    for p in ("/var/lib/misc/dnsmasq.leases", "/var/lib/dnsmasq/dnsmasq.leases"):
-        if os.path.exists(p):
-            return p
-    return ""
-
-def _latest_usb_client_ip() -> str:
-    path = _dnsmasq_leases_path()
-    if not path:
-        return ""
-    try:
-        last = ""
-        with open(path, "r") as f:
-            for line in f:
-                parts = line.strip().split()
-                if len(parts) >= 3:
-                    last = parts[2]
-        return last
-    except Exception:
-        return ""
+from azazel_zero.console import epd_client
+from azazel_zero.console.collector import get_status
 
 def get_net_status() -> dict:
-    gw_if = _default_gw_iface() or "wlan0"
-    ssid, bssid = _ssid_and_bssid()
-    wlan_ip = _ip4_addr("wlan0") or "—"
-    usb_ip = _ip4_addr("usb0") or "—"
-    lap_ip = _latest_usb_client_ip() or "—"
-    rssi = _wifi_rssi_dbm()
-    net_ok = _route_alive()
-    captive = _captive_portal()
+    st = get_status()
     return {
-        "gw_if": gw_if or "—",
-        "ssid": ssid,
-        "bssid": bssid,
-        "wlan_ip": wlan_ip,
-        "usb_ip": usb_ip,
-        "laptop_ip": lap_ip,
-        "rssi_dbm": rssi,
-        "net_ok": net_ok,
-        "captive": captive,
+        "gw_if": st.get("gw_if") or "—",
+        "ssid": st.get("ssid") or "—",
+        "bssid": st.get("bssid") or "—",
+        "wlan_ip": st.get("wlan_ip") or "—",
+        "usb_ip": st.get("usb_ip") or "—",
+        "laptop_ip": st.get("laptop_ip") or "—",
+        "clients": st.get("clients") or [],
+        "rssi_dbm": st.get("rssi_dbm"),
+        "net_ok": bool(st.get("net_ok")),
+        "captive": st.get("captive"),
     }
 
 def _supports_emoji() -> bool:
@@ -111,52 +48,7 @@ def _supports_emoji() -> bool:
     s = (os.environ.get("LANG", "") + os.environ.get("LC_CTYPE", "")).upper()
     return "UTF-8" in s
 
-def _wifi_rssi_dbm() -> Optional[int]:
-    out = _sh("iw dev wlan0 link")
-    for ln in out.splitlines():
-        ln = ln.strip().lower()
-        # e.g., "signal: -43 dBm"
-        if ln.startswith("signal:") and "dbm" in ln:
-            try:
-                val = int(ln.split()[1])
-                return val
-            except Exception:
-                return None
-    return None
-
-def _route_alive() -> bool:
-    # fast ICMP probe to default route target
-    try:
-        return subprocess.call(["ping", "-c1", "-W1", "8.8.8.8"],
-                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL) == 0
-    except Exception:
-        return False
-
-def _captive_portal() -> Optional[bool]:
-    # True if captive likely, False if open internet, None if unknown
-    try:
-        if shutil.which("curl") is None:
-            return None
-        out = subprocess.check_output(
-            ["curl", "-sI", "http://connectivitycheck.gstatic.com/generate_204"],
-            stderr=subprocess.DEVNULL, timeout=1.5
-        ).decode("utf-8", "ignore").splitlines()
-        for ln in out:
-            if ln.lower().startswith("http/"):
-                parts = ln.split()
-                if len(parts) >= 2 and parts[1] == '204':
-                    return False
-                try:
-                    code = int(parts[1])
-                    return True if 300 <= code < 400 else True
-                except Exception:
-                    return None
-        return None
-    except Exception:
-        return None
-
 # Resolve repo root from this file location
-HERE = os.path.abspath(os.path.dirname(__file__))
 ROOT = os.path.abspath(os.path.join(HERE, os.pardir))
 
 # Tool commands
@@ -164,11 +56,11 @@ SSID_TOOL = ["/usr/bin/python3", os.path.join(HERE, "ssid_list.py")]
 # Placeholder for future tools
 DELAY_TOOL = ["/usr/bin/python3", os.path.join(HERE, "delay_tool.py")]  # if not present, we gray it out
 
-# Optional: e-paper refresh script (non-fatal if missing)
-EPAPER = ["/usr/bin/python3", os.path.join(HERE, "boot_splash_epd.py")]
-EPD_INFO_CMD = EPAPER + ["--mode", "info"]
-EPD_START_CMD = EPAPER + ["--mode", "start"]
-EPD_SHUT_CMD  = EPAPER + ["--mode", "shutdown"]
+# E-paper requests go to the EPD daemon; the client falls back to
+# boot_splash_epd.py when the daemon is not running (non-fatal if missing)
+EPD_CLIENT = ["/usr/bin/python3", os.path.join(HERE, "azazel_zero", "console", "epd_client.py")]
+EPD_START_CMD = EPD_CLIENT + ["start"]
+EPD_SHUT_CMD  = EPD_CLIENT + ["shutdown"]
 
 
 HELP = "↑/↓ or j/k: move   Enter: run   r: redraw   q: quit"
@@ -215,13 +107,7 @@ def _safe_run(cmd: List[str]) -> int:
 def _update_epaper() -> None:
     """Best‑effort e‑paper refresh (non‑fatal)."""
     try:
-        script_path = EPAPER[-1]
-        if os.path.exists(script_path):
-            info = _tmux_info()
-            if info:
-                subprocess.run(EPD_INFO_CMD + [info], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-            else:
-                subprocess.run(EPD_INFO_CMD, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        epd_client.update({"mode": "info", "text": _tmux_info()})
     except Exception:
         pass
 
@@ -14,100 +14,20 @@ Environment:
 import os
 import sys
 import time
-import shutil
-import subprocess
-import shlex
 from datetime import datetime
-from typing import Optional, Tuple
-
-# ---------- helpers ----------
-
-def _sh(cmd: str, timeout: float = 1.5) -> str:
-    try:
-        out = subprocess.check_output(shlex.split(cmd), stderr=subprocess.DEVNULL, timeout=timeout)
-        return out.decode('utf-8', 'ignore').strip()
-    except Exception:
-        return ""
-
-
-def _ip4_addr(iface: str) -> str:
-    out = _sh(f"ip -4 addr show {iface}")
-    for line in out.splitlines():
-        line = line.strip()
-        if line.startswith("inet "):
-            return line.split()[1].split('/')[0]
-    return "—"
-
-
-def _default_gw_iface() -> str:
-    out = _sh("ip route get 8.8.8.8")
-    parts = out.split()
-    if 'dev' in parts:
-        try:
-            return parts[parts.index('dev') + 1]
-        except Exception:
-            pass
-    return "—"
-
-
-def _ssid_and_bssid() -> Tuple[str, str]:
-    ssid = _sh("iwgetid -r")
-    if not ssid:
-        st = _sh("wpa_cli status")
-        for ln in st.splitlines():
-            if ln.startswith('ssid='):
-                ssid = ln.split('=', 1)[1].strip()
-                break
-    bssid = ""
-    st = _sh("wpa_cli status")
-    for ln in st.splitlines():
-        if ln.startswith('bssid='):
-            bssid = ln.split('=', 1)[1].strip()
-            break
-    return (ssid or "—", bssid or "—")
-
-
-def _wifi_rssi_dbm() -> Optional[int]:
-    out = _sh("iw dev wlan0 link")
-    for ln in out.splitlines():
-        ln = ln.strip().lower()
-        if ln.startswith('signal:') and 'dbm' in ln:
-            try:
-                return int(ln.split()[1])
-            except Exception:
-                return None
-    return None
-
-
-def _route_alive() -> bool:
-    try:
-        return subprocess.call(["ping", "-c1", "-W1", "8.8.8.8"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL) == 0
-    except Exception:
-        return False
+from pathlib import Path
 
+HERE = Path(__file__).resolve().parent
+if str(HERE) not in sys.path:
+    sys.path.insert(0, str(HERE))
 
-def _captive_portal() -> Optional[bool]:
-    try:
-        if shutil.which('curl') is None:
-            return None
-        hdr = subprocess.check_output(
-            ["curl", "-sI", "http://connectivitycheck.gstatic.com/generate_204"],
-            stderr=subprocess.DEVNULL, timeout=1.5
-        ).decode('utf-8', 'ignore').splitlines()
-        for ln in hdr:
-            if ln.lower().startswith('http/'):
-                parts = ln.split()
-                if len(parts) >= 2 and parts[1] == '204':
-                    return False
-                try:
-                    code = int(parts[1])
-                    return True if 300 <= code < 400 else True
-                except Exception:
-                    return None
-        return None
-    except Exception:
-        return None
+# Values come from the shared background collector (one set of probes for
+# every pane) instead of forking ip/iwgetid/wpa_cli/iw/ping/curl per redraw.
+from azazel_zero.console.collector import get_status
+from azazel_zero.console.screen import DiffScreen
+from azazel_zero.sensors.wifi_bands import band_label
 
+# ---------- helpers ----------
 
 def _supports_emoji() -> bool:
     flag = os.environ.get('AZA_EMOJI', '').strip().lower()
@@ -117,14 +37,21 @@ def _supports_emoji() -> bool:
     return 'UTF-8' in s
 
 
-# ---------- rendering ----------
+def _fmt_age(st: dict, key: str) -> str:
+    """Age of a collector field as a compact suffix ("12s", "3m"); '...' if never checked."""
+    age = (st.get('_age') or {}).get(key)
+    if age is None:
+        return '...'
+    if age < 60:
+        return f"{int(age)}s"
+    if age < 3600:
+        return f"{int(age // 60)}m"
+    return f"{int(age // 3600)}h"
 
-def _clear():
-    sys.stdout.write('\033[2J\033[H')
-    sys.stdout.flush()
 
+# ---------- rendering ----------
 
-def _print_status():
+def _status_lines() -> list:
     emoji = _supports_emoji()
 
     ap = '📶 AP' if emoji else '[AP]'
@@ -133,75 +60,74 @@ def _print_status():
     lap = '💻 Laptop' if emoji else '[Laptop]'
     arw = ' ➜ ' if emoji else ' -> '
 
-    ssid, bssid = _ssid_and_bssid()
-    wlan_ip = _ip4_addr('wlan0')
-    usb_ip = _ip4_addr('usb0')
-    lap_ip = _latest_usb_client_ip()
-    gw_if = _default_gw_iface()
-    rssi = _wifi_rssi_dbm()
-    net_ok = _route_alive()
-    captive = _captive_portal()
+    st = get_status()
+    ssid = st.get('ssid') or '—'
+    bssid = st.get('bssid') or '—'
+    band = band_label(st.get('band'), st.get('channel'))
+    if band:
+        bssid += f" ({band})"
+    wlan_ip = st.get('wlan_ip') or '—'
+    usb_ip = st.get('usb_ip') or '—'
+    lap_ip = st.get('laptop_ip') or '—'
+    if st.get('laptop_host'):
+        lap_ip += f" ({st['laptop_host']})"
+    extra = len(st.get('clients') or []) - 1
+    if extra > 0:
+        lap_ip += f" +{extra}"
+    gw_if = st.get('gw_if') or '—'
+    rssi = st.get('rssi_dbm')
+    net_ok = st.get('net_ok')
+    captive = st.get('captive')
 
     if emoji:
-        ok_sym = '🟢' if net_ok else '🔴'
+        ok_sym = '❔' if net_ok is None else ('🟢' if net_ok else '🔴')
         cap_sym = '🔓' if captive is False else ('🔒' if captive is True else '❔')
     else:
-        ok_sym = 'OK' if net_ok else 'ERR'
+        ok_sym = 'UNK' if net_ok is None else ('OK' if net_ok else 'ERR')
         cap_sym = 'OPEN' if captive is False else ('AUTH' if captive is True else 'UNK')
 
     now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
 
     # Header line
     line1 = f"{ap}{arw}{ssid}{arw}{aza}{arw}{dhcp}{arw}{lap}"
-    badges = f"  [NET {ok_sym}]  [CAP {cap_sym}]  [RSSI {rssi if rssi is not None else '—'} dBm]"
-
-    # Print
-    print(f"==== Azazel-Zero Status  |  {now} ====")
-    print(line1 + badges)
-    print(f"AP(wlan0): {wlan_ip}   |   Pi(usb0): {usb_ip}   |   Laptop: {lap_ip}")
-    print(f"GW-IF: {gw_if}    BSSID: {bssid}")
-    print("-" * 80)
-
-
-def _dnsmasq_leases_path() -> str:
-    for p in ("/var/lib/misc/dnsmasq.leases", "/var/lib/dnsmasq/dnsmasq.leases"):
-        if os.path.exists(p):
-            return p
-    return ""
-
-
-def _latest_usb_client_ip() -> str:
-    path = _dnsmasq_leases_path()
-    if not path:
-        return "—"
-    try:
-        last = "—"
-        with open(path, 'r') as f:
-            for line in f:
-                parts = line.strip().split()
-                if len(parts) >= 3:
-                    last = parts[2]
-        return last
-    except Exception:
-        return "—"
+    # Connectivity checks run in the collector with adaptive intervals; show
+    # how old each result is instead of blocking the redraw on ping/curl.
+    badges = (
+        f"  [NET {ok_sym} {_fmt_age(st, 'net_ok')}]  [CAP {cap_sym} {_fmt_age(st, 'captive')}]"
+        f"  [RSSI {rssi if rssi is not None else '—'} dBm]"
+    )
+    offline = "  |  collector offline" if st.get('_stale') else ""
+
+    return [
+        f"==== Azazel-Zero Status  |  {now}{offline} ====",
+        line1 + badges,
+        f"AP(wlan0): {wlan_ip}   |   Pi(usb0): {usb_ip}   |   Laptop: {lap_ip}",
+        f"GW-IF: {gw_if}    BSSID: {bssid}",
+        "-" * 80,
+    ]
 
 
 def main() -> int:
     try:
-        interval = float(os.environ.get('AZA_STATUS_INTERVAL', '5.0'))
+        interval = float(os.environ.get('AZA_STATUS_INTERVAL', '2.0'))
     except Exception:
         interval = 2.0
 
+    # Only changed rows are redrawn, so the pane does not flicker and a
+    # refresh over SSH is a few dozen bytes instead of the whole screen.
+    screen = DiffScreen()
     try:
         while True:
-            _clear()
-            _print_status()
+            screen.render(_status_lines())
             time.sleep(interval)
     except KeyboardInterrupt:
         return 0
     except Exception as e:
+        screen.close()
         print(f"[status] error: {e}", file=sys.stderr)
         return 1
+    finally:
+        screen.close()
 
 
 if __name__ == '__main__':
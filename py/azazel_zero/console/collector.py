@@ -0,0 +1,406 @@
+"""Background status collector shared by the tmux console panes.
+
+One long-running process gathers link/address/connectivity values, each on
+its own interval, and publishes them as a JSON snapshot on tmpfs. The status
+pane and the menu read that file instead of forking ip/iwgetid/wpa_cli/iw/
+ping/curl on every redraw.
+
+    python3 -m azazel_zero.console.collector            # run in foreground
+    python3 -m azazel_zero.console.collector --detach   # start if not running
+    python3 -m azazel_zero.console.collector --once     # collect once, print JSON
+"""
+from __future__ import annotations
+
+import argparse
+import fcntl
+import json
+import os
+import shlex
+import shutil
+import signal
+import socket
+import struct
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from azazel_zero.sensors.dhcp_leases import LeaseTracker
+from azazel_zero.sensors.wifi_bands import band_channel
+from azazel_zero.sensors.wpa_ctrl import WpaCtrl, WpaCtrlError
+
+UPSTREAM = os.environ.get("AZA_UPSTREAM_IFACE", "wlan0")
+DOWNSTREAM = os.environ.get("AZA_DOWNSTREAM_IFACE", "usb0")
+SNAPSHOT_PATH = Path(
+    os.environ.get("AZA_STATUS_SNAPSHOT")
+    or ("/dev/shm/azazel-status.json" if os.path.isdir("/dev/shm") else "/tmp/azazel-status.json")
+)
+# Rewrite the snapshot at least this often so readers can tell it is alive.
+HEARTBEAT_SEC = 10.0
+STALE_SEC = 3 * HEARTBEAT_SEC
+
+_SIOCGIFADDR = 0x8915
+
+
+def _sh(cmd: str, timeout: float = 1.5) -> str:
+    try:
+        out = subprocess.check_output(shlex.split(cmd), stderr=subprocess.DEVNULL, timeout=timeout)
+        return out.decode("utf-8", "ignore").strip()
+    except Exception:
+        return ""
+
+
+# ---------- sources: each returns a dict of fields ----------
+
+_wpa: Optional[WpaCtrl] = None
+
+
+def _wpa_status() -> Dict[str, str]:
+    # STATUS over a kept-open control socket; wpa_cli only when the socket is
+    # not accessible (collector not running as root/netdev). A socket left
+    # dead by a wpa_supplicant restart is dropped and reopened on the next call.
+    global _wpa
+    try:
+        if _wpa is None:
+            _wpa = WpaCtrl(UPSTREAM, timeout=1.0)
+        return _wpa.status()
+    except (WpaCtrlError, OSError):
+        if _wpa is not None:
+            _wpa.close()
+            _wpa = None
+    st: Dict[str, str] = {}
+    for ln in _sh(f"wpa_cli -i {UPSTREAM} status").splitlines():
+        key, sep, value = ln.partition("=")
+        if sep:
+            st[key] = value.strip()
+    return st
+
+
+def link_info() -> Dict[str, Any]:
+    # One STATUS request gives SSID, BSSID and frequency; iwgetid only as a fallback.
+    st = _wpa_status()
+    ssid = st.get("ssid", "")
+    bssid = st.get("bssid", "")
+    freq = st.get("freq", "")
+    if not ssid:
+        ssid = _sh("iwgetid -r")
+    bc = band_channel(int(freq)) if freq.isdigit() else None
+    return {"ssid": ssid, "bssid": bssid, "band": bc[0] if bc else "", "channel": bc[1] if bc else None}
+
+
+def _ip4_addr(iface: str) -> str:
+    # SIOCGIFADDR instead of forking `ip -4 addr show`.
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+        try:
+            res = fcntl.ioctl(s.fileno(), _SIOCGIFADDR, struct.pack("256s", iface.encode()[:15]))
+        except OSError:
+            return ""
+    return socket.inet_ntoa(res[20:24])
+
+
+def addresses() -> Dict[str, Any]:
+    return {"wlan_ip": _ip4_addr(UPSTREAM), "usb_ip": _ip4_addr(DOWNSTREAM)}
+
+
+def default_route() -> Dict[str, Any]:
+    best: Optional[tuple] = None
+    try:
+        with open("/proc/net/route") as fh:
+            next(fh, None)
+            for ln in fh:
+                parts = ln.split()
+                if len(parts) >= 7 and parts[1] == "00000000" and int(parts[3], 16) & 1:
+                    metric = int(parts[6])
+                    if best is None or metric < best[0]:
+                        best = (metric, parts[0])
+    except OSError:
+        pass
+    return {"gw_if": best[1] if best else ""}
+
+
+def rssi() -> Dict[str, Any]:
+    # /proc/net/wireless: "wlan0: 0000   70.  -40.  -256 ..." (level in dBm)
+    try:
+        with open("/proc/net/wireless") as fh:
+            for ln in fh:
+                name, _, rest = ln.partition(":")
+                if name.strip() == UPSTREAM:
+                    return {"rssi_dbm": int(float(rest.split()[2]))}
+    except (OSError, ValueError, IndexError):
+        pass
+    for ln in _sh(f"iw dev {UPSTREAM} link").splitlines():
+        ln = ln.strip().lower()
+        if ln.startswith("signal:") and "dbm" in ln:
+            try:
+                return {"rssi_dbm": int(ln.split()[1])}
+            except (ValueError, IndexError):
+                break
+    return {"rssi_dbm": None}
+
+
+_leases: Optional[LeaseTracker] = None
+
+
+def usb_clients() -> Dict[str, Any]:
+    # The tracker re-parses the leases file only after dnsmasq rewrites it.
+    global _leases
+    if _leases is None:
+        _leases = LeaseTracker()
+    else:
+        _leases.refresh()
+    live = _leases.active()
+    return {
+        "laptop_ip": live[0].ip if live else "",
+        "laptop_host": live[0].hostname if live else "",
+        "clients": [lease.as_dict() for lease in live],
+    }
+
+
+def route_alive() -> Dict[str, Any]:
+    try:
+        ok = subprocess.call(["ping", "-c1", "-W1", "8.8.8.8"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL) == 0
+    except Exception:
+        ok = False
+    return {"net_ok": ok}
+
+
+def captive_portal() -> Dict[str, Any]:
+    # True if captive likely, False if open internet, None if unknown
+    if shutil.which("curl") is None:
+        return {"captive": None}
+    hdr = _sh("curl -sI http://connectivitycheck.gstatic.com/generate_204", timeout=3.0)
+    for ln in hdr.splitlines():
+        if ln.lower().startswith("http/"):
+            parts = ln.split()
+            if len(parts) >= 2 and parts[1] == "204":
+                return {"captive": False}
+            return {"captive": True if len(parts) >= 2 and parts[1].isdigit() else None}
+    return {"captive": None}
+
+
+class Source:
+    """A collector function and its refresh policy.
+
+    The interval starts at `interval` and doubles (up to `max_interval`)
+    each time the source returns the same values, so stable checks back off.
+    A change in its own values, or in any field listed in `recheck_on`,
+    resets it to `interval` and (for recheck_on) runs it immediately.
+    """
+
+    __slots__ = ("name", "func", "min_interval", "max_interval", "interval", "recheck_on")
+
+    def __init__(
+        self,
+        name: str,
+        func: Callable[[], Dict[str, Any]],
+        interval: float,
+        max_interval: Optional[float] = None,
+        recheck_on: Tuple[str, ...] = (),
+    ):
+        self.name = name
+        self.func = func
+        self.min_interval = interval
+        self.max_interval = max(interval, max_interval or interval)
+        self.interval = interval
+        self.recheck_on = frozenset(recheck_on)
+
+    def backoff(self, changed: bool) -> float:
+        self.interval = self.min_interval if changed else min(self.interval * 2, self.max_interval)
+        return self.interval
+
+
+_LINK_FIELDS = ("ssid", "bssid", "gw_if", "wlan_ip")
+
+# Cheap /proc and ioctl reads refresh often; anything that forks or touches
+# the Internet backs off while nothing changes and re-runs on link changes.
+DEFAULT_SOURCES: List[Source] = [
+    Source("link", link_info, 3.0, 15.0),
+    Source("addr", addresses, 5.0),
+    Source("route", default_route, 5.0),
+    Source("rssi", rssi, 3.0),
+    Source("leases", usb_clients, 2.0),
+    Source("internet", route_alive, 5.0, 60.0, recheck_on=_LINK_FIELDS),
+    Source("captive", captive_portal, 10.0, 300.0, recheck_on=_LINK_FIELDS + ("net_ok",)),
+]
+
+
+class StatusCollector:
+    """Runs every source on its own schedule and publishes one snapshot.
+
+    Sources run concurrently on a small pool; a source still running when
+    it comes due again is not resubmitted, so a hung `curl` never piles up.
+    """
+
+    def __init__(self, sources: Optional[List[Source]] = None, path: Path = SNAPSHOT_PATH, workers: int = 3):
+        self.sources = list(sources or DEFAULT_SOURCES)
+        self.path = Path(path)
+        self.workers = workers
+        self.fields: Dict[str, Any] = {}
+        self.updated_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._completed: List[Tuple[str, List[str]]] = []
+
+    def _store(self, name: str, fut: "Future[Dict[str, Any]]") -> None:
+        try:
+            values = fut.result()
+        except Exception:
+            values = {}
+        now = time.time()
+        changed: List[str] = []
+        with self._lock:
+            for key, val in values.items():
+                if key not in self.fields or self.fields[key] != val:
+                    changed.append(key)
+                self.fields[key] = val
+                self.updated_at[key] = now
+            self._completed.append((name, changed))
+        self._wake.set()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "pid": os.getpid(),
+                "written": time.time(),
+                "fields": dict(self.fields),
+                "updated": dict(self.updated_at),
+                "intervals": {src.name: src.interval for src in self.sources},
+            }
+
+    def publish(self) -> None:
+        snap = self.snapshot()
+        tmp = self.path.with_name(f".{self.path.name}.{os.getpid()}")
+        tmp.write_text(json.dumps(snap, separators=(",", ":")))
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, self.path)
+
+    def collect_once(self) -> Dict[str, Any]:
+        with ThreadPoolExecutor(max_workers=len(self.sources)) as pool:
+            for src, fut in [(src, pool.submit(src.func)) for src in self.sources]:
+                self._store(src.name, fut)
+        return self.snapshot()
+
+    def run(self, stop: threading.Event) -> None:
+        by_name = {src.name: src for src in self.sources}
+        due = {src.name: 0.0 for src in self.sources}
+        running: Dict[str, Future] = {}
+        last_publish = 0.0
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="aza-collect") as pool:
+            while not stop.is_set():
+                self._wake.clear()
+                now = time.monotonic()
+                with self._lock:
+                    completed, self._completed = self._completed, []
+                touched: set = set()
+                for name, changed in completed:
+                    running.pop(name, None)
+                    due[name] = now + by_name[name].backoff(bool(changed))
+                    touched.update(changed)
+                for src in self.sources:
+                    if touched & src.recheck_on:
+                        src.interval = src.min_interval
+                        due[src.name] = min(due[src.name], now)
+                    if src.name not in running and now >= due[src.name]:
+                        fut = pool.submit(src.func)
+                        fut.add_done_callback(lambda f, n=src.name: self._store(n, f))
+                        running[src.name] = fut
+                if completed or now - last_publish >= HEARTBEAT_SEC:
+                    try:
+                        self.publish()
+                    except OSError:
+                        pass
+                    last_publish = now
+                pending = [due[n] for n in due if n not in running]
+                wait = min(pending + [last_publish + HEARTBEAT_SEC]) - now
+                self._wake.wait(max(0.05, wait))
+
+
+# ---------- client side ----------
+
+_last_spawn = 0.0
+
+
+def read_snapshot(path: Path = SNAPSHOT_PATH) -> Dict[str, Any]:
+    try:
+        return json.loads(Path(path).read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def spawn_collector(path: Path = SNAPSHOT_PATH) -> None:
+    """Start a detached collector; it exits at once if one already holds the lock."""
+    py_root = str(Path(__file__).resolve().parents[2])
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [py_root, os.environ.get("PYTHONPATH", "")])))
+    env["AZA_STATUS_SNAPSHOT"] = str(path)
+    subprocess.Popen(
+        [sys.executable, "-m", "azazel_zero.console.collector"],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        env=env,
+        start_new_session=True,
+    )
+
+
+def get_status(path: Path = SNAPSHOT_PATH, spawn: bool = True) -> Dict[str, Any]:
+    """Return the latest field values, starting the collector if none is alive.
+
+    The result also carries "_age" (seconds since each field was refreshed)
+    and "_stale" (True when no collector has written recently).
+    """
+    global _last_spawn
+    snap = read_snapshot(path)
+    now = time.time()
+    stale = now - float(snap.get("written", 0)) > STALE_SEC
+    if stale and spawn and time.monotonic() - _last_spawn > STALE_SEC:
+        _last_spawn = time.monotonic()
+        try:
+            spawn_collector(path)
+        except OSError:
+            pass
+    out = dict(snap.get("fields") or {})
+    out["_age"] = {k: now - float(ts) for k, ts in (snap.get("updated") or {}).items()}
+    out["_stale"] = stale
+    return out
+
+
+def _acquire_lock(path: Path) -> Optional[int]:
+    fd = os.open(str(path) + ".lock", os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        os.close(fd)
+        return None
+    return fd
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Azazel-Zero console status collector")
+    parser.add_argument("--once", action="store_true", help="collect every field once and print the snapshot")
+    parser.add_argument("--detach", action="store_true", help="start a background collector unless one is running")
+    parser.add_argument("--path", default=str(SNAPSHOT_PATH), help="snapshot file (default: %(default)s)")
+    args = parser.parse_args()
+    path = Path(args.path)
+    if args.once:
+        print(json.dumps(StatusCollector(path=path).collect_once(), indent=2))
+        return 0
+    if args.detach:
+        spawn_collector(path)
+        return 0
+    lock = _acquire_lock(path)
+    if lock is None:
+        return 0  # another collector owns the snapshot
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    try:
+        StatusCollector(path=path).run(stop)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,150 @@
+"""Client side of the e-paper daemon (py/epd_daemon.py).
+
+Render requests are single JSON datagrams on a Unix socket, so asking for a
+refresh costs a sendto() instead of a Python + PIL start and an epd.init().
+When the daemon is not running, callers fall back to launching
+boot_splash_epd.py directly under the shared lock, as before.
+
+    python3 -m azazel_zero.console.epd_client info "azazel:1 menu" --gentle
+    python3 -m azazel_zero.console.epd_client alert --severity 1 "ET SCAN ..."
+    ... | python3 -m azazel_zero.console.epd_client alert --stdin
+
+With --stdin, a line that is a JSON object (e.g. from
+`python3 -m azazel_zero.first_minute.suricata --json`) supplies the
+signature and severity; other lines are sent as the message text.
+"""
+from __future__ import annotations
+
+import argparse
+import fcntl
+import json
+import os
+import socket
+import subprocess
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+SOCKET_PATH = os.environ.get("AZA_EPD_SOCKET", "/run/azazel-epd.sock")
+LOCK_PATH = os.environ.get("EPD_LOCK", "/run/azazel-epd.lock")
+EPD_PY = os.environ.get("EPD_PY") or str(Path(__file__).resolve().parents[2] / "boot_splash_epd.py")
+
+_sock: Optional[socket.socket] = None
+
+
+def send(request: Dict[str, Any], path: str = SOCKET_PATH) -> bool:
+    """Queue a render request; False if the daemon is not reachable."""
+    global _sock
+    data = json.dumps(request, separators=(",", ":")).encode("utf-8")
+    try:
+        if _sock is None:
+            _sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM | socket.SOCK_CLOEXEC)
+            # The daemon drains its queue on a thread of its own, so a full
+            # queue frees up quickly; never block a UI longer than this on it.
+            _sock.settimeout(0.5)
+        _sock.sendto(data, path)
+        return True
+    except socket.timeout:
+        return True  # daemon alive but wedged; a later request will catch up
+    except OSError:
+        return False
+
+
+def request_for(mode: str, text: List[str], gentle: bool = False, clear: bool = True,
+                severity: Optional[int] = None) -> Dict[str, Any]:
+    req: Dict[str, Any] = {"mode": mode, "text": " ".join(text), "gentle": gentle, "clear": clear}
+    if severity is not None:
+        req["severity"] = severity
+    return req
+
+
+def request_from_line(mode: str, prefix: str, line: str, gentle: bool = False, clear: bool = True,
+                      severity: Optional[int] = None) -> Dict[str, Any]:
+    """One --stdin line: a JSON alert record or plain text."""
+    if line.startswith("{"):
+        try:
+            rec = json.loads(line)
+        except ValueError:
+            rec = None
+        if isinstance(rec, dict):
+            text = str(rec.get("signature") or rec.get("text") or "")
+            req = request_for(mode, [prefix, text] if prefix else [text], gentle, clear,
+                              rec.get("severity", severity))
+            req["signature"] = text
+            if rec.get("signature_id"):
+                req["signature_id"] = rec["signature_id"]
+            return req
+    return request_for(mode, [prefix, line] if prefix else [line], gentle, clear, severity)
+
+
+def run_direct(request: Dict[str, Any], wait: bool = True) -> bool:
+    """Fallback without the daemon: one boot_splash_epd.py run, skipped if the lock is busy."""
+    if not os.path.exists(EPD_PY):
+        return False
+    argv = [sys.executable, EPD_PY, "--mode", request["mode"]]
+    if request.get("severity") is not None:
+        argv += ["--severity", str(request["severity"])]
+    if request.get("gentle"):
+        argv.append("--gentle")
+    if not request.get("clear", True):
+        argv.append("--no-clear")
+    if request.get("text"):
+        argv.append(request["text"])
+    try:
+        lock = open(LOCK_PATH, "a")
+    except OSError:
+        lock = None
+    try:
+        if lock is not None:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                return False  # another refresh is running
+        proc = subprocess.Popen(argv, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        if wait:
+            proc.wait()
+        return True
+    finally:
+        if lock is not None:
+            lock.close()
+
+
+def update(request: Dict[str, Any], fallback: bool = True) -> bool:
+    """Send to the daemon, or render directly when it is not running."""
+    if send(request):
+        return True
+    return run_direct(request) if fallback else False
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Queue an e-paper update with the EPD daemon")
+    ap.add_argument("mode", help="panel mode (info, status, alert, start, shutdown)")
+    ap.add_argument("text", nargs="*", help="session / message text")
+    ap.add_argument("--gentle", action="store_true", help="prefer a partial refresh")
+    ap.add_argument("--no-clear", action="store_true", help="skip the full clear before drawing")
+    ap.add_argument("--severity", type=int, default=None, help="alert severity (1 = high, 3 = low)")
+    ap.add_argument("--stdin", action="store_true", help="send one request per input line (stays running)")
+    ap.add_argument("--no-fallback", action="store_true", help="exit 3 instead of running boot_splash_epd.py")
+    args = ap.parse_args()
+
+    if not args.stdin:
+        req = request_for(args.mode, args.text, args.gentle, not args.no_clear, args.severity)
+        if send(req):
+            return 0
+        if args.no_fallback:
+            return 3
+        return 0 if run_direct(req) else 1
+
+    prefix = " ".join(args.text)
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+        req = request_from_line(args.mode, prefix, line, args.gentle, not args.no_clear, args.severity)
+        if not send(req) and not args.no_fallback:
+            run_direct(req)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
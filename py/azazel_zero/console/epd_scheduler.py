@@ -0,0 +1,165 @@
+# azazel_zero/console/epd_scheduler.py
+"""What the e-paper shows next, given what was asked for.
+
+The panel can take one refresh every few seconds, but requests arrive in
+bursts and do not matter equally: a switch to CONTAIN has to reach the
+panel even while tmux window switches and low-severity IDS noise keep
+coming. Requests are sorted into slots by priority and mode (newest wins
+within a slot), and low-severity alerts are batched into one summary
+panel. There is only one status slot: a newer stage replaces an older one
+but keeps the higher priority, so a CONTAIN that is already over still
+jumps the queue with the current stage.
+
+    URGENT  start/shutdown, transitions into CONTAIN/DECEPTION, severity 1
+    HIGH    other stage transitions, alerts up to `high_severity`
+    SUMMARY the batched low-severity alerts, once per `summary_sec`
+    NORMAL  info panel, status refreshes without a stage change
+
+After an URGENT or HIGH panel has been drawn, NORMAL and SUMMARY requests
+wait `hold_sec` so the warning stays readable. Nothing is handed out
+sooner than `min_interval` after the previous refresh.
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, Optional, Tuple
+
+URGENT, HIGH, SUMMARY, NORMAL = range(4)
+PRIORITY_NAMES = ("urgent", "high", "summary", "normal")
+
+URGENT_STAGES = ("CONTAIN", "DECEPTION")
+
+
+class DisplayScheduler:
+    def __init__(
+        self,
+        min_interval: float = 1.0,
+        hold_sec: float = 60.0,
+        summary_sec: float = 60.0,
+        high_severity: int = 2,
+        urgent_stages: Tuple[str, ...] = URGENT_STAGES,
+    ):
+        self.min_interval = min_interval
+        self.hold_sec = hold_sec
+        self.summary_sec = summary_sec
+        self.high_severity = high_severity
+        self.urgent_stages = tuple(urgent_stages)
+        self.stage: Optional[str] = None
+        self.last_render = 0.0
+        self.hold_until = 0.0
+        self.coalesced = 0
+        self._slots: Dict[Tuple[int, str], Dict[str, Any]] = {}
+        # low-severity alerts waiting for the summary panel
+        self._low: Dict[str, int] = {}
+        self._low_count = 0
+        self._low_min_sev = 0
+        self._low_since = 0.0
+
+    # ---------- input ----------
+
+    def classify(self, req: Dict[str, Any]) -> Optional[int]:
+        """Priority for a request; None when it is absorbed into the summary."""
+        mode = req.get("mode")
+        if mode in ("start", "shutdown"):
+            return URGENT
+        if mode == "alert":
+            sev = _severity(req)
+            if sev <= 1:
+                return URGENT
+            if sev <= self.high_severity:
+                return HIGH
+            return None
+        if mode == "status":
+            stage = str(req.get("stage") or "")
+            if stage and stage != self.stage:
+                return URGENT if stage in self.urgent_stages else HIGH
+        return NORMAL
+
+    def submit(self, req: Dict[str, Any], now: float) -> int:
+        """Queue a request; returns its priority (SUMMARY for batched alerts)."""
+        prio = self.classify(req)
+        if req.get("mode") == "status" and req.get("stage"):
+            # Later status requests compare against the newest stage asked for,
+            # not the one on the panel, so a burst yields one transition.
+            self.stage = str(req["stage"])
+        if prio is None:
+            self._batch(req, now)
+            return SUMMARY
+        mode = str(req.get("mode"))
+        if mode == "status":
+            for key in [k for k in self._slots if k[1] == "status"]:
+                del self._slots[key]
+                self.coalesced += 1
+                prio = min(prio, key[0])
+        prev = self._slots.get((prio, mode))
+        if prev is not None:
+            self.coalesced += 1
+            if mode == "alert":
+                # Keep the newest alert but say how many it replaced.
+                req = dict(req, more=int(prev.get("more", 0)) + 1)
+        self._slots[(prio, mode)] = req
+        return prio
+
+    def _batch(self, req: Dict[str, Any], now: float) -> None:
+        sig = str(req.get("signature") or req.get("text") or "alert")
+        self._low[sig] = self._low.get(sig, 0) + 1
+        sev = _severity(req)
+        if not self._low_count:
+            self._low_since = now
+            self._low_min_sev = sev
+        self._low_count += 1
+        self._low_min_sev = min(self._low_min_sev, sev)
+
+    def pending_low(self) -> int:
+        return self._low_count
+
+    # ---------- output ----------
+
+    def _summary(self) -> Dict[str, Any]:
+        top = sorted(self._low.items(), key=lambda kv: kv[1], reverse=True)
+        req = {
+            "mode": "alert",
+            "summary": True,
+            "count": self._low_count,
+            "severity": self._low_min_sev,
+            "text": top[0][0] if top else "",
+            "signatures": len(top),
+        }
+        self._low.clear()
+        self._low_count = 0
+        return req
+
+    def next(self, now: float) -> Tuple[Optional[Dict[str, Any]], int, float]:
+        """(request, priority, 0) when one is due, else (None, -1, seconds to wait).
+
+        The wait is 0 when nothing is pending at all; the caller then blocks
+        until the next submit().
+        """
+        ready_at = self.last_render + self.min_interval
+        summary_key = (SUMMARY, "alert")
+        if self._low_count and summary_key not in self._slots and now >= self._low_since + self.summary_sec:
+            self._slots[summary_key] = self._summary()
+        waits = []
+        for key in sorted(self._slots):
+            prio = key[0]
+            due = ready_at if prio in (URGENT, HIGH) else max(ready_at, self.hold_until)
+            if now >= due:
+                return self._slots.pop(key), prio, 0.0
+            waits.append(due - now)
+        if self._low_count and summary_key not in self._slots:
+            waits.append(self._low_since + self.summary_sec - now)
+        return None, -1, max(0.01, min(waits)) if waits else 0.0
+
+    def rendered(self, prio: int, now: float) -> None:
+        self.last_render = now
+        if prio in (URGENT, HIGH):
+            self.hold_until = now + self.hold_sec
+
+    def has_pending(self) -> bool:
+        return self._low_count > 0 or bool(self._slots)
+
+
+def _severity(req: Dict[str, Any]) -> int:
+    try:
+        return int(req.get("severity", 3))
+    except (TypeError, ValueError):
+        return 3
@@ -0,0 +1,120 @@
+# azazel_zero/console/screen.py
+"""Flicker-free line renderer for plain-terminal dashboards.
+
+Clearing the screen and reprinting every frame makes tmux/SSH panes flicker
+and resends the whole dashboard over slow serial links even when only the
+clock changed. DiffScreen keeps the previous frame and writes only the rows
+that changed, starting at the first differing column, using cursor
+addressing. A resize (or invalidate()) forces one full redraw.
+"""
+from __future__ import annotations
+
+import shutil
+import sys
+from typing import Callable, List, Optional, Sequence, TextIO, Tuple
+
+CSI = "\033["
+_HOME_CLEAR = CSI + "H" + CSI + "2J"
+_ERASE_EOL = CSI + "K"
+_WRAP_OFF = CSI + "?7l"
+_WRAP_ON = CSI + "?7h"
+
+# Below this many unchanged leading columns, rewriting from column 1 is
+# about as short as addressing the column.
+_MIN_SKIP = 8
+
+
+def _terminal_size() -> Tuple[int, int]:
+    size = shutil.get_terminal_size((80, 24))
+    return size.columns, size.lines
+
+
+class DiffScreen:
+    """Render a list of lines, sending only what changed since the last frame.
+
+    Lines longer than the terminal are clipped by the terminal (autowrap is
+    turned off while the screen is active) so one row always maps to one
+    line. Column skipping is only used when the unchanged prefix is ASCII,
+    since the display width of emoji varies between terminals.
+    When the stream is not a TTY, frames are written as plain text and only
+    when they differ from the previous one.
+    """
+
+    def __init__(self, stream: Optional[TextIO] = None, size: Optional[Callable[[], Tuple[int, int]]] = None):
+        self.stream = stream or sys.stdout
+        self._size = size or _terminal_size
+        try:
+            self.tty = self.stream.isatty()
+        except (AttributeError, ValueError):
+            self.tty = False
+        self._prev: Optional[List[str]] = None
+        self._prev_size: Optional[Tuple[int, int]] = None
+        self.bytes_written = 0
+        self.full_redraws = 0
+
+    def invalidate(self) -> None:
+        """Force the next render() to repaint the whole screen."""
+        self._prev = None
+
+    def render(self, lines: Sequence[str]) -> int:
+        """Draw a frame; return the number of bytes written."""
+        if not self.tty:
+            return self._render_plain(lines)
+        size = self._size()
+        frame = [line.rstrip("\n") for line in lines[: max(1, size[1] - 1)]]
+        if self._prev is None or size != self._prev_size:
+            out = self._full(frame)
+            self.full_redraws += 1
+        else:
+            out = self._diff(self._prev, frame)
+        self._prev = frame
+        self._prev_size = size
+        return self._write(out)
+
+    def _full(self, frame: List[str]) -> str:
+        parts = [_WRAP_OFF, _HOME_CLEAR]
+        parts.append("\r\n".join(frame))
+        parts.append("\r\n")
+        return "".join(parts)
+
+    def _diff(self, prev: List[str], frame: List[str]) -> str:
+        parts: List[str] = []
+        for row in range(max(len(prev), len(frame))):
+            old = prev[row] if row < len(prev) else None
+            new = frame[row] if row < len(frame) else ""
+            if old == new:
+                continue
+            col = 0
+            if old:
+                limit = min(len(old), len(new))
+                while col < limit and old[col] == new[col]:
+                    col += 1
+                if col < _MIN_SKIP or not new[:col].isascii():
+                    col = 0
+            parts.append(f"{CSI}{row + 1};{col + 1}H{new[col:]}{_ERASE_EOL}")
+        if parts:
+            # Park the cursor below the frame, where the next full redraw ends too.
+            parts.append(f"{CSI}{len(frame) + 1};1H")
+        return "".join(parts)
+
+    def _render_plain(self, lines: Sequence[str]) -> int:
+        frame = [line.rstrip("\n") for line in lines]
+        if frame == self._prev:
+            return 0
+        self._prev = frame
+        return self._write("\n".join(frame) + "\n")
+
+    def _write(self, out: str) -> int:
+        if not out:
+            return 0
+        self.stream.write(out)
+        self.stream.flush()
+        n = len(out.encode("utf-8", "replace"))
+        self.bytes_written += n
+        return n
+
+    def close(self) -> None:
+        """Restore autowrap and leave the cursor below the last frame."""
+        if self.tty and self.full_redraws:
+            self._write(_WRAP_ON + (f"{CSI}{len(self._prev) + 1};1H" if self._prev is not None else ""))
+        self._prev = None
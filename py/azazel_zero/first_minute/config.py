@@ -1,14 +1,242 @@
 from __future__ import annotations
 
+import copy
+import hashlib
+import json
 import os
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional, Tuple
 
-try:
-    import yaml  # type: ignore
-except ImportError as exc:  # pragma: no cover - dependency notice
-    raise SystemExit("PyYAML is required: sudo apt-get install -y python3-yaml") from exc
+_FALLBACK_BASE = Path(__file__).resolve().parents[3] / ".azazel-zero"
+_CACHE_DIRS = (Path("/run/azazel-zero/config-cache"), _FALLBACK_BASE / "cache")
+
+# Bump whenever _SCHEMA changes so cached compilations are not reused.
+SCHEMA_VERSION = "2"
+
+_NUM = (int, float)
+
+
+class ConfigError(ValueError):
+    """first_minute.yaml failed to parse or does not match the schema."""
+
+
+class Field:
+    __slots__ = ("types", "default", "optional", "item")
+
+    def __init__(self, types: Any, default: Any = None, optional: bool = False, item: Any = None):
+        self.types = types if isinstance(types, tuple) else (types,)
+        self.default = default
+        self.optional = optional
+        self.item = item  # element type or section schema for lists
+
+    def check(self, value: Any, where: str, errors: List[str]) -> Any:
+        if value is None:
+            if not self.optional:
+                errors.append(f"{where}: must not be empty")
+                return copy.deepcopy(self.default)
+            return None
+        if (isinstance(value, bool) and bool not in self.types) or not isinstance(value, self.types):
+            names = "/".join(t.__name__ for t in self.types)
+            errors.append(f"{where}: expected {names}, got {type(value).__name__}")
+            return copy.deepcopy(self.default)
+        if self.item is None:
+            return value
+        out = []
+        for i, elem in enumerate(value):
+            if isinstance(self.item, dict):
+                out.append(_apply(self.item, elem, f"{where}[{i}]", errors))
+            elif not isinstance(elem, self.item):
+                errors.append(f"{where}[{i}]: expected {self.item.__name__}, got {type(elem).__name__}")
+            else:
+                out.append(elem)
+        return out
+
+
+_TLS_TARGET = {
+    "host": Field(str, ""),
+    "port": Field(int, 443),
+    "fingerprint_sha256": Field(str, ""),
+    "timeout": Field(_NUM, 4),
+}
+
+# Every key first_minute.yaml may contain, with its type and default. Nested
+# dicts are sections; Field(dict) marks free-form tables (signal weights,
+# severity weights, per-stage tc overrides) that their consumers validate
+# (tc overrides: tc.profile_errors(), also run by FirstMinuteConfig.validate()).
+_SCHEMA: Dict[str, Any] = {
+    "interfaces": {
+        "upstream": Field(str, "wlan0"),
+        "downstream": Field(str, "usb0"),
+        "mgmt_ip": Field(str, "192.168.7.1"),
+        "mgmt_subnet": Field(str, "192.168.7.0/24"),
+        "gateway_ip": Field(str, optional=True),
+    },
+    "paths": {
+        "runtime_dir": Field(str, "/run/azazel-zero"),
+        "log_dir": Field(str, "/var/log/azazel-zero"),
+        "dns_log": Field(str, "/var/log/azazel-dnsmasq.log"),
+        "nft_template": Field(str, "/etc/azazel-zero/nftables/first_minute.nft"),
+        "dnsmasq_conf": Field(str, "/etc/azazel-zero/dnsmasq-first_minute.conf"),
+        "pid_file": Field(str, "/run/azazel-zero/first_minute.pid"),
+        "flight_recorder": Field(str, optional=True),
+        "known_db": Field(str, ""),
+        "dhcp_leases": Field(str, ""),  # empty: dnsmasq default location
+    },
+    "dnsmasq": {
+        "enable": Field(bool, True),
+        "listen_addr": Field(str, optional=True),
+        "upstream_servers": Field(list, [], item=str),
+        "block_doh_sni": Field(list, [], item=str),
+        "cache_size": Field(int, 256),
+    },
+    "state_machine": {
+        "probe_window_sec": Field(_NUM, 20),
+        "decay_per_sec": Field(_NUM, 2),
+        "degrade_threshold": Field(_NUM, 30),
+        "normal_threshold": Field(_NUM, 8),
+        "contain_threshold": Field(_NUM, 65),
+        "stable_normal_sec": Field(_NUM, 20),
+        "stable_probe_sec": Field(_NUM, 10),
+        "max_suspicion": Field(_NUM, 100),
+        "signal_weights": Field(dict, {}),
+    },
+    "probes": {
+        "captive_portal": {
+            "url": Field(str, "http://connectivitycheck.gstatic.com/generate_204"),
+            "timeout": Field(_NUM, 4),
+            "retries": Field(int, 1),
+        },
+        "tls": Field(list, [], item=_TLS_TARGET),
+        "dns_compare": {
+            "enabled": Field(bool, False),
+            "reference_resolver": Field(str, "9.9.9.9"),
+            "sample_names": Field(list, ["example.com"], item=str),
+            "max_mismatch": Field(int, 2),
+            "timeout": Field(_NUM, 3),
+        },
+    },
+    "policy": {
+        "allow_ntp": Field(bool, True),
+        "allow_ocsp": Field(bool, True),
+        "probe_allow_ttl": Field(int, 120),
+        "dynamic_allow_ttl": Field(int, 300),
+        "block_quic_until": Field(str, "NORMAL"),
+        "default_tcp_ratelimit_probe": Field(str, "50 kbps"),
+        "default_tcp_ratelimit_degraded": Field(str, "1 mbps"),
+    },
+    "tc": Field(dict, {}),
+    "status_api": {
+        "host": Field(str, "192.168.7.1"),
+        "port": Field(int, 8081),
+    },
+    "suricata": {
+        "enabled": Field(bool, False),
+        "eve_path": Field(str, "/var/log/suricata/eve.json"),
+        "window_sec": Field(_NUM, 60),
+        "severity_weights": Field(dict, {1: 25, 2: 15, 3: 5}),
+        "max_score_per_tick": Field(_NUM, 40),
+    },
+    "wifi_scan": {
+        "enabled": Field(bool, True),
+        "interval_sec": Field(_NUM, 15),
+        "trigger": Field(bool, False),  # false: read cached results only (`iw scan dump`)
+        "history_sec": Field(_NUM, 600),
+    },
+    "deception": {
+        "enable_if_opencanary_present": Field(bool, True),
+        "opencanary_cfg": Field(str, "/etc/opencanaryd/opencanary.conf"),
+    },
+}
+
+
+def _apply(schema: Dict[str, Any], data: Any, where: str, errors: List[str]) -> Dict[str, Any]:
+    if data is None:
+        data = {}
+    if not isinstance(data, dict):
+        errors.append(f"{where or 'config'}: expected a mapping, got {type(data).__name__}")
+        data = {}
+    for key in data:
+        if key not in schema:
+            import difflib
+
+            hint = difflib.get_close_matches(str(key), list(schema), n=1)
+            errors.append(f"{where + '.' if where else ''}{key}: unknown key" + (f" (did you mean {hint[0]}?)" if hint else ""))
+    out: Dict[str, Any] = {}
+    for key, spec in schema.items():
+        path = f"{where}.{key}" if where else key
+        if isinstance(spec, dict):
+            out[key] = _apply(spec, data.get(key), path, errors)
+        elif key in data:
+            out[key] = spec.check(data[key], path, errors)
+        else:
+            out[key] = copy.deepcopy(spec.default)
+    return out
+
+
+def compile_config(raw: Any) -> Dict[str, Any]:
+    """Validate parsed YAML against _SCHEMA and fill nested defaults.
+
+    The result is normalised through JSON (mapping keys become strings) so a
+    fresh parse and a cached one compare equal on reload.
+    """
+    errors: List[str] = []
+    data = _apply(_SCHEMA, raw, "", errors)
+    if errors:
+        raise ConfigError("; ".join(errors))
+    return json.loads(json.dumps(data))
+
+
+def _parse_yaml(raw: bytes, path: Path) -> Any:
+    try:
+        import yaml  # type: ignore
+    except ImportError as exc:  # pragma: no cover - dependency notice
+        raise SystemExit("PyYAML is required: sudo apt-get install -y python3-yaml") from exc
+    loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+    try:
+        return yaml.load(raw, Loader=loader)
+    except yaml.YAMLError as exc:
+        raise ConfigError(f"{path}: {exc}") from exc
+
+
+def _cache_dir() -> Optional[Path]:
+    env = os.environ.get("AZAZEL_ZERO_CACHE_DIR")
+    for d in ([Path(env)] if env else _CACHE_DIRS):
+        try:
+            d.mkdir(parents=True, exist_ok=True)
+        except OSError:
+            continue
+        if os.access(d, os.W_OK):
+            return d
+    return None
+
+
+def _read_cache(name: str) -> Optional[Dict[str, Any]]:
+    d = _cache_dir()
+    if d is None:
+        return None
+    try:
+        return json.loads((d / name).read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def _write_cache(name: str, prefix: str, data: Dict[str, Any]) -> None:
+    # JSON rather than pickle: the fallback cache dir may be writable by a
+    # non-root user while the controller itself runs as root. Only entries
+    # for the same source file (same prefix) are evicted.
+    d = _cache_dir()
+    if d is None:
+        return
+    try:
+        for old in d.glob(f"{prefix}-*.json"):
+            if old.name != name:
+                old.unlink()
+        tmp = d / f".{name}.{os.getpid()}"
+        tmp.write_text(json.dumps(data, separators=(",", ":")))
+        os.replace(tmp, d / name)
+    except OSError:
+        pass
 
 
 @dataclass
@@ -22,29 +250,76 @@ class FirstMinuteConfig:
     status_api: Dict[str, Any]
     suricata: Dict[str, Any]
     deception: Dict[str, Any]
+    tc: Dict[str, Any] = field(default_factory=dict)
+    wifi_scan: Dict[str, Any] = field(default_factory=dict)
+    source: str = ""
+
+    # Sections a running controller can take over on SIGHUP; the rest need a restart.
+    RELOADABLE = ("state_machine", "probes", "policy", "suricata", "deception", "tc")
 
     @staticmethod
-    def load(path: str | Path) -> "FirstMinuteConfig":
+    def load(path: str | Path, use_cache: bool = True) -> "FirstMinuteConfig":
+        """Load and validate path, reusing a compiled copy keyed by its hash.
+
+        Only a cache miss pays for the YAML import, parse and validation;
+        status/probe-now invocations normally read one small JSON file.
+        """
         p = Path(path)
-        if not p.exists():
-            raise FileNotFoundError(f"Config not found: {p}")
-        data = yaml.safe_load(p.read_text()) or {}
-        # Provide minimal defaults for keys that may be missing to avoid KeyErrors
-        defaults = {
-            "interfaces": {"upstream": "wlan0", "downstream": "usb0", "mgmt_ip": "192.168.7.1", "mgmt_subnet": "192.168.7.0/24"},
-            "paths": {},
-            "dnsmasq": {"enable": True},
-            "state_machine": {},
-            "probes": {},
-            "policy": {},
-            "status_api": {"host": "192.168.7.1", "port": 8081},
-            "suricata": {"enabled": False},
-            "deception": {"enable_if_opencanary_present": True},
-        }
-        for key, val in defaults.items():
-            data.setdefault(key, val)
+        try:
+            raw = p.read_bytes()
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Config not found: {p}") from None
+        digest = hashlib.sha256(SCHEMA_VERSION.encode() + b"\0" + raw).hexdigest()[:32]
+        # Keyed by source path too: the packaged and /etc copies share a stem
+        # and would otherwise evict each other's entry on every load.
+        prefix = f"{p.stem}-{hashlib.sha256(str(p.resolve()).encode()).hexdigest()[:8]}"
+        name = f"{prefix}-{digest}.json"
+        data = _read_cache(name) if use_cache else None
+        if data is None:
+            try:
+                data = compile_config(_parse_yaml(raw, p))
+            except ConfigError as exc:
+                raise ConfigError(f"{p}: {exc}") from None
+            if use_cache:
+                _write_cache(name, prefix, data)
+        data["source"] = str(p)
         return FirstMinuteConfig(**data)
 
+    def validate(self) -> List[str]:
+        errors: List[str] = []
+        sm = self.state_machine or {}
+        try:
+            normal = float(sm.get("normal_threshold", 8))
+            degrade = float(sm.get("degrade_threshold", 30))
+            contain = float(sm.get("contain_threshold", 65))
+            if not normal < degrade < contain:
+                errors.append("state_machine: expected normal_threshold < degrade_threshold < contain_threshold")
+            if float(sm.get("decay_per_sec", 2)) < 0:
+                errors.append("state_machine.decay_per_sec must be >= 0")
+        except (TypeError, ValueError) as exc:
+            errors.append(f"state_machine: {exc}")
+        for key in ("probe_allow_ttl", "dynamic_allow_ttl"):
+            try:
+                if int(self.policy.get(key, 1)) <= 0:
+                    errors.append(f"policy.{key} must be > 0")
+            except (TypeError, ValueError):
+                errors.append(f"policy.{key} must be an integer")
+        from .tc import profile_errors
+
+        errors.extend(profile_errors(self.tc))
+        return errors
+
+    def diff(self, other: "FirstMinuteConfig") -> Dict[str, Tuple[Any, Any]]:
+        """Return {section: (old, new)} for every top-level section that differs."""
+        changed: Dict[str, Tuple[Any, Any]] = {}
+        for name in self.__dataclass_fields__:
+            if name == "source":
+                continue
+            old, new = getattr(self, name), getattr(other, name)
+            if old != new:
+                changed[name] = (old, new)
+        return changed
+
     @property
     def runtime_dir(self) -> Path:
         return Path(self.paths.get("runtime_dir", "/run/azazel-zero"))
@@ -61,6 +336,12 @@ class FirstMinuteConfig:
     def dns_log_path(self) -> Path:
         return Path(self.paths.get("dns_log", "/var/log/azazel-dnsmasq.log"))
 
+    @property
+    def flight_recorder_path(self) -> Path:
+        # Persistent by default: the ticks before a crash or watchdog reboot are
+        # the ones worth keeping, and /run is tmpfs.
+        return Path(self.paths.get("flight_recorder") or "/var/lib/azazel-zero/flight_recorder.bin")
+
     @property
     def nft_template_path(self) -> Path:
         return Path(self.paths.get("nft_template", "/etc/azazel-zero/nftables/first_minute.nft"))
@@ -79,7 +360,7 @@ class FirstMinuteConfig:
         except PermissionError:
             pass
 
-        fallback_base = Path(__file__).resolve().parents[3] / ".azazel-zero"
+        fallback_base = _FALLBACK_BASE
         fallback_runtime = fallback_base / "run"
         fallback_log = fallback_base / "log"
         fallback_base.mkdir(parents=True, exist_ok=True)
@@ -89,6 +370,7 @@ class FirstMinuteConfig:
         self.paths["log_dir"] = str(fallback_log)
         self.paths["pid_file"] = str(fallback_runtime / "first_minute.pid")
         self.paths["dns_log"] = str(fallback_log / "azazel-dnsmasq.log")
+        self.paths["flight_recorder"] = str(fallback_runtime / "flight_recorder.bin")
         for d in [fallback_runtime, fallback_log]:
             d.mkdir(parents=True, exist_ok=True)
 
@@ -4,47 +4,51 @@ import json
 import logging
 import os
 import signal
-import socket
 from urllib.parse import urlparse
 import subprocess
 import threading
 import time
 import shutil
-import sys
-from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from http.server import ThreadingHTTPServer
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 
+from azazel_zero.console.screen import DiffScreen
+from azazel_zero.sensors.dhcp_leases import LeaseTracker
 from azazel_zero.sensors.wifi_safety import evaluate_wifi_safety
+from azazel_zero.sensors.wifi_scan import ScanCache
 
 from .config import FirstMinuteConfig
 from .dns_observer import DNSObserver, seed_probe_ips
+from .enforcer import StageEnforcer
+from .flight_recorder import FlightRecorder
+from .metrics import REGISTRY
 from .nft import NftManager
 from .probes import ProbeOutcome, run_all
+from .sdnotify import SystemdNotifier
+from .startup import StartupPlan, Step, resolve_ipv4, write_sysctls
 from .state_machine import FirstMinuteStateMachine, Stage
+from .status_api import EventHub, StatusPublisher, make_status_server
+from .suricata import EveTailer
 from .tc import TcManager
 
+_TICK = REGISTRY.histogram("fmc_loop_tick_seconds", "Controller loop iteration time (excluding sleep)")
+_WIFI_EVAL = REGISTRY.histogram("fmc_wifi_eval_seconds", "evaluate_wifi_safety duration")
+_STAGE_APPLY = REGISTRY.histogram("fmc_stage_apply_seconds", "nft+tc stage application time")
+_STAGE_DWELL = REGISTRY.histogram(
+    "fmc_stage_dwell_seconds",
+    "Time spent in a stage before leaving it",
+    buckets=(1, 5, 10, 20, 30, 60, 120, 300, 600, 1800, 3600),
+)
+_STAGE_GAUGE = REGISTRY.gauge("fmc_stage", "Current stage (1 when active)")
+_SUSPICION = REGISTRY.gauge("fmc_suspicion", "Current suspicion score")
+_SET_SIZE = REGISTRY.gauge("fmc_nft_set_elements", "Elements added to nft sets and not yet expired")
 
-class StatusHandler(BaseHTTPRequestHandler):
-    def __init__(self, ctx: Dict[str, object], *args, **kwargs):
-        self.ctx = ctx
-        super().__init__(*args, **kwargs)
-
-    def do_GET(self):
-        self.send_response(200)
-        self.send_header("Content-Type", "application/json")
-        self.end_headers()
-        self.wfile.write(json.dumps(self.ctx, default=str).encode("utf-8"))
-
-    def log_message(self, fmt, *args):  # pragma: no cover - avoid noisy logs
-        return
-
-
-def make_status_server(host: str, port: int, ctx: Dict[str, object]) -> ThreadingHTTPServer:
-    def handler(*args, **kwargs):
-        return StatusHandler(ctx, *args, **kwargs)
-
-    return ThreadingHTTPServer((host, port), handler)
+SYSCTLS = {
+    "net.ipv4.ip_forward": "1",
+    "net.ipv4.conf.all.rp_filter": "1",
+    "net.ipv4.conf.default.rp_filter": "1",
+}
 
 
 class FirstMinuteController:
@@ -67,12 +71,53 @@ class FirstMinuteController:
             int(cfg.policy.get("probe_allow_ttl", 120)),
             int(cfg.policy.get("dynamic_allow_ttl", 300)),
         )
-        self.tc = TcManager(cfg.interfaces["downstream"], cfg.interfaces["upstream"])
+        self.tc = TcManager(cfg.interfaces["downstream"], cfg.interfaces["upstream"], cfg.tc)
         self.dns_thread: Optional[DNSObserver] = None
+        self.enforcer: Optional[StageEnforcer] = None
+        self.eve: Optional[EveTailer] = self.make_eve_tailer()
+        self.scan: Optional[ScanCache] = self.make_scan_cache()
+        self.reload_event = threading.Event()
         self.status_ctx: Dict[str, object] = {"state": "INIT", "suspicion": 0, "last_probe": None}
+        self.status = StatusPublisher(self.status_ctx)
+        self.events = EventHub()
         self.status_server: Optional[ThreadingHTTPServer] = None
         self.processes: Dict[str, subprocess.Popen] = {}
         self.last_console = 0.0
+        self.screen: Optional[DiffScreen] = DiffScreen() if pretty_console else None
+        self.stage_since = time.monotonic()
+        self.recorder: Optional[FlightRecorder] = None
+        self.last_log_line = ""
+        self.last_log_at = 0.0
+        self.log_heartbeat_sec = 300.0
+        self.probe_ips: List[str] = []
+        self.notifier = SystemdNotifier()
+        # Downstream DHCP clients (MAC -> IP/hostname/expiry) for per-client policy.
+        self.leases = LeaseTracker(cfg.paths.get("dhcp_leases", ""))
+        self.watchdog_stalled = False
+        for set_name in ("allow_probe_v4", "allow_dyn_v4"):
+            _SET_SIZE.set_function(lambda s=set_name: self.nft.set_cardinality(s), set=set_name)
+
+    def make_eve_tailer(self) -> Optional[EveTailer]:
+        suri = self.cfg.suricata
+        if not suri.get("enabled", False):
+            return None
+        return EveTailer(
+            Path(suri.get("eve_path", "/var/log/suricata/eve.json")),
+            window_sec=float(suri.get("window_sec", 60)),
+            severity_weights=suri.get("severity_weights"),
+            max_score_per_poll=float(suri.get("max_score_per_tick", 40)),
+        )
+
+    def make_scan_cache(self) -> Optional[ScanCache]:
+        ws = self.cfg.wifi_scan
+        if not ws.get("enabled", True):
+            return None
+        return ScanCache(
+            self.cfg.interfaces["upstream"],
+            interval=float(ws.get("interval_sec", 15)),
+            trigger=bool(ws.get("trigger", False)),
+            history_sec=float(ws.get("history_sec", 600)),
+        )
 
     def preflight(self) -> None:
         if os.geteuid() != 0:
@@ -82,13 +127,9 @@ class FirstMinuteController:
                 raise SystemExit(f"{bin_name} not found in PATH")
 
     def apply_sysctl(self) -> None:
-        cmds = [
-            ["sysctl", "-w", "net.ipv4.ip_forward=1"],
-            ["sysctl", "-w", "net.ipv4.conf.all.rp_filter=1"],
-            ["sysctl", "-w", "net.ipv4.conf.default.rp_filter=1"],
-        ]
-        for cmd in cmds:
-            subprocess.run(cmd, check=False)
+        failed = write_sysctls(SYSCTLS)
+        if failed:
+            self.logger.warning("sysctl: could not set %s", ",".join(failed))
 
     def start_dnsmasq(self) -> None:
         if self.no_dns_start or not self.cfg.dnsmasq.get("enable", True):
@@ -113,18 +154,30 @@ class FirstMinuteController:
     def start_status_api(self) -> None:
         host = self.cfg.status_api.get("host", "127.0.0.1")
         port = int(self.cfg.status_api.get("port", 8081))
-        self.status_server = make_status_server(host, port, self.status_ctx)
+        self.status_server = make_status_server(host, port, self.status, self.events)
         thread = threading.Thread(target=self.status_server.serve_forever, daemon=True)
         thread.start()
 
+    def start_enforcer(self) -> None:
+        self.enforcer = StageEnforcer(self.apply_stage, self.stop_event)
+        self.enforcer.start()
+
+    def request_stage(self, stage: Stage) -> None:
+        # Hand the stage to the enforcement worker so nft/tc never block sensing.
+        if self.enforcer is None:
+            self.apply_stage(stage)
+            return
+        self.enforcer.submit(stage)
+
     def apply_stage(self, stage: Stage) -> None:
         if self.dry_run:
             self.logger.info("dry-run stage change -> %s", stage.value)
             return
-        self.nft.set_stage(stage)
-        self.tc.apply(stage)
+        with _STAGE_APPLY.time(stage=stage.value):
+            self.nft.set_stage(stage)
+            self.tc.apply(stage)
 
-    def seed_probe_destinations(self) -> None:
+    def probe_hosts(self) -> List[str]:
         hosts = []
         captive = self.cfg.probes.get("captive_portal", {}) or {}
         tls_list = self.cfg.probes.get("tls", []) or []
@@ -136,64 +189,185 @@ class FirstMinuteController:
             parsed = urlparse(captive.get("url"))
             if parsed.hostname:
                 hosts.append(parsed.hostname)
-        ips = []
-        for host in hosts:
-            try:
-                info = socket.getaddrinfo(host, None)
-                ips.extend([i[4][0] for i in info if i[4]])
-            except socket.gaierror:
-                continue
-        seed_probe_ips(self.nft, ips)
+        return hosts
+
+    def resolve_probe_destinations(self) -> None:
+        self.probe_ips = resolve_ipv4(self.probe_hosts())
+
+    def seed_probe_destinations(self) -> None:
+        seed_probe_ips(self.nft, self.probe_ips)
+
+    def open_recorder(self) -> None:
+        try:
+            self.recorder = FlightRecorder(self.cfg.flight_recorder_path)
+        except OSError as exc:
+            self.logger.warning("flight recorder disabled: %s", exc)
 
     def start(self) -> None:
         self.cfg.ensure_dirs()
         self.preflight()
+        self.open_recorder()
+        if self.scan:
+            self.scan.start()
         if not self.dry_run:
-            self.apply_sysctl()
-            self.nft.apply_base()
-            self.apply_stage(Stage.PROBE)
-            self.start_dnsmasq()
-            self.start_dns_observer()
-            self.start_status_api()
-            self.seed_probe_destinations()
+            self.startup_plan().run()
+        # Base rules are loaded and PROBE is enforced: tell systemd we are up.
+        self.notifier.ready("dry-run" if self.dry_run else f"enforcing {Stage.PROBE.value}; base rules loaded")
         self.run_loop()
 
+    def startup_plan(self) -> StartupPlan:
+        # Enforcement (nft base -> PROBE) is the critical path; DNS lookups for
+        # probe targets, sysctl and the status API overlap with it. dnsmasq only
+        # starts serving once PROBE is enforced and the observer is tailing.
+        return StartupPlan(
+            [
+                Step("sysctl", self.apply_sysctl),
+                Step("resolve_probes", self.resolve_probe_destinations),
+                Step("status_api", self.start_status_api),
+                Step("nft_base", self.nft.apply_base),
+                Step("stage_probe", lambda: self.apply_stage(Stage.PROBE), deps=("nft_base",)),
+                Step("enforcer", self.start_enforcer, deps=("stage_probe",)),
+                Step("seed_probes", self.seed_probe_destinations, deps=("nft_base", "resolve_probes")),
+                Step("dns_observer", self.start_dns_observer, deps=("nft_base",)),
+                Step("dnsmasq", self.start_dnsmasq, deps=("stage_probe", "dns_observer")),
+            ],
+            logger=self.logger,
+        )
+
+    def status_line(self) -> str:
+        return "stage={} suspicion={:.1f}".format(
+            self.current_stage.value, float(self.status_ctx.get("suspicion", 0) or 0)
+        )
+
+    def watchdog_ping(self) -> None:
+        """Ping the systemd watchdog unless enforcement is wedged.
+
+        A hang inside the loop (probe, tcpdump) stops the pings by itself; a
+        stuck nft/tc call runs on the enforcer thread, so it is checked here.
+        """
+        if not self.notifier.watchdog_sec:
+            return
+        busy = self.enforcer.busy_for() if self.enforcer else 0.0
+        if busy > self.notifier.watchdog_sec / 2:
+            if not self.watchdog_stalled:
+                self.logger.error("stage apply stuck for %.0fs; withholding watchdog ping", busy)
+                self.watchdog_stalled = True
+            return
+        self.watchdog_stalled = False
+        self.notifier.watchdog()
+
     def stop(self) -> None:
+        self.notifier.stopping()
         self.stop_event.set()
+        if self.enforcer:
+            # Let an in-flight apply finish so it cannot race the flush below.
+            self.enforcer.join(timeout=5)
         self.stop_dnsmasq()
+        self.events.close()
         if self.status_server:
             self.status_server.shutdown()
+        if self.recorder:
+            self.recorder.close()
         if not self.dry_run:
             self.tc.clear()
             self.nft.clear()
+        self.leases.close()
+        if self.scan:
+            self.scan.stop()
+        if self.screen:
+            self.screen.close()
+        self.notifier.close()
 
     def handle_signals(self) -> None:
         signal.signal(signal.SIGTERM, lambda *_: self.stop_event.set())
         signal.signal(signal.SIGINT, lambda *_: self.stop_event.set())
+        signal.signal(signal.SIGHUP, lambda *_: self.reload_event.set())
 
-    def suricata_bumped(self) -> bool:
-        eve = Path(self.cfg.suricata.get("eve_path", "/var/log/suricata/eve.json"))
-        if not self.cfg.suricata.get("enabled", False) or not eve.exists():
-            return False
+    def reload_config(self) -> None:
+        """Re-read the YAML and apply only what changed, without touching
+        the nft table, tc qdiscs or dnsmasq unless their settings changed."""
+        if not self.cfg.source:
+            self.logger.warning("reload: config path unknown, ignoring SIGHUP")
+            return
         try:
-            return time.time() - eve.stat().st_mtime < 30
-        except Exception:
-            return False
+            new = FirstMinuteConfig.load(self.cfg.source)
+            new.ensure_dirs()
+        except Exception as exc:
+            self.logger.error("reload: cannot load %s: %s", self.cfg.source, exc)
+            return
+        errors = new.validate()
+        if errors:
+            self.logger.error("reload: rejected %s: %s", self.cfg.source, "; ".join(errors))
+            return
+        changes = self.cfg.diff(new)
+        if not changes:
+            self.logger.info("reload: no changes")
+            return
+        applied = [s for s in changes if s in FirstMinuteConfig.RELOADABLE]
+        restart = [s for s in changes if s not in FirstMinuteConfig.RELOADABLE]
+        for section in applied:
+            setattr(self.cfg, section, changes[section][1])
+        if "state_machine" in applied:
+            self.state_machine.update_config(self.cfg.state_machine)
+        if "policy" in applied:
+            self.nft.update_ttls(
+                int(self.cfg.policy.get("probe_allow_ttl", 120)),
+                int(self.cfg.policy.get("dynamic_allow_ttl", 300)),
+            )
+        if "suricata" in applied:
+            if self.eve:
+                self.eve.close()
+            self.eve = self.make_eve_tailer()
+        if "probes" in applied and not self.dry_run:
+            # Seed the new hosts' addresses, not the ones resolved at startup.
+            self.resolve_probe_destinations()
+            self.seed_probe_destinations()
+        if "tc" in applied:
+            self.tc.update_profile(self.cfg.tc)
+            if self.current_stage != Stage.INIT:
+                self.request_stage(self.current_stage)
+        self.logger.info("reload: applied %s", ",".join(applied) or "-")
+        if restart:
+            self.logger.warning("reload: %s changed but need a restart; keeping running values", ",".join(restart))
+        self.events.publish("config-reload", {"applied": applied, "restart_required": restart})
+
+    def poll_suricata(self) -> tuple[float, Dict[str, object]]:
+        if self.eve is None:
+            return 0.0, {}
+        try:
+            score, alerts = self.eve.poll()
+        except OSError as exc:
+            self.logger.warning("eve.json read failed: %s", exc)
+            return 0.0, {}
+        meta = self.eve.counters()
+        for alert in alerts:
+            self.events.publish("alert", {"source": "suricata", **alert})
+        if alerts:
+            meta["last_alert"] = alerts[-1]
+        return score, meta
 
     def run_loop(self) -> None:
         self.handle_signals()
         probe_done = False
         while not self.stop_event.is_set():
+            tick_start = time.perf_counter()
+            self.watchdog_ping()
+            if self.reload_event.is_set():
+                self.reload_event.clear()
+                self.notifier.reloading()
+                self.reload_config()
+                self.notifier.ready(self.status_line())
             link_state, link_meta, new_link = self.poll_wifi()
             signals: Dict[str, object] = {"link_up": link_state}
             if link_meta.get("bssid"):
                 signals["bssid"] = link_meta["bssid"]
             wifi_tags = link_meta.get("wifi_tags", [])
             if wifi_tags:
-                signals["wifi_tags"] = True
+                signals["wifi_tags"] = list(wifi_tags)
             if new_link:
                 probe_done = False
 
+            probe_ran = False
             if self.current_stage == Stage.PROBE and link_state and not probe_done:
                 self.last_probe = run_all(self.cfg.probes, self.cfg.interfaces["upstream"])
                 signals["probe_fail"] = self.last_probe.captive_portal or self.last_probe.tls_mismatch
@@ -202,9 +376,25 @@ class FirstMinuteController:
                 signals["cert_mismatch"] = self.last_probe.tls_mismatch
                 signals["route_anomaly"] = self.last_probe.route_anomaly
                 probe_done = True
+                probe_ran = True
+                self.watchdog_ping()  # probes can take tens of seconds
+                self.events.publish(
+                    "probe-complete",
+                    {
+                        "captive_portal": self.last_probe.captive_portal,
+                        "tls_mismatch": self.last_probe.tls_mismatch,
+                        "dns_mismatch": self.last_probe.dns_mismatch,
+                        "route_anomaly": self.last_probe.route_anomaly,
+                    },
+                )
 
-            if self.suricata_bumped():
+            if self.leases.refresh():
+                self.events.publish("clients", {"clients": [lease.as_dict() for lease in self.leases.active()]})
+
+            suri_score, suri_meta = self.poll_suricata()
+            if suri_score > 0:
                 signals["suricata_alert"] = True
+                signals["suricata_score"] = suri_score
 
             state, summary = self.state_machine.step(signals)
             if (
@@ -214,30 +404,82 @@ class FirstMinuteController:
             ):
                 state = Stage.DECEPTION
             if state != self.current_stage:
+                self.events.publish(
+                    "state-change",
+                    {
+                        "from": self.current_stage.value,
+                        "to": state.value,
+                        "suspicion": summary.get("suspicion", 0),
+                        "reason": summary.get("reason", ""),
+                    },
+                )
+                now_mono = time.monotonic()
+                _STAGE_DWELL.observe(now_mono - self.stage_since, stage=self.current_stage.value)
+                _STAGE_GAUGE.set(0, stage=self.current_stage.value)
+                self.stage_since = now_mono
                 self.current_stage = state
                 probe_done = state != Stage.PROBE
-                self.apply_stage(state)
+                self.request_stage(state)
             self.status_ctx.update(
                 {
                     "state": state.value,
                     "suspicion": summary.get("suspicion", 0),
                     "reason": summary.get("reason", ""),
+                    "contributions": summary.get("contributions", {}),
                     "wifi": link_meta,
                     "last_probe": self.last_probe.details if self.last_probe else None,
+                    "enforcement": self.enforcer.snapshot() if self.enforcer else None,
+                    "suricata": suri_meta or None,
+                    "clients": [lease.as_dict() for lease in self.leases.active()],
                 }
             )
+            self.status.publish(self.status_ctx)
+            self.notifier.status(self.status_line())
+            _STAGE_GAUGE.set(1, stage=state.value)
+            _SUSPICION.set(float(summary.get("suspicion", 0)))
             if self.pretty_console:
                 self.render_console(state, summary, link_meta)
-            self.logger.info(json.dumps(self.status_ctx))
+            if self.recorder:
+                self.recorder.record(time.time(), state, float(summary.get("suspicion", 0)), signals)
+            self.log_tick(probe_ran)
+            _TICK.observe(time.perf_counter() - tick_start)
             time.sleep(2.0)
         self.stop()
 
+    def log_tick(self, probe_ran: bool) -> None:
+        # Only write when something operator-visible changed: the device is idle
+        # most of the time and every line is an SD-card write. The flight
+        # recorder keeps the per-tick history.
+        wifi = self.status_ctx.get("wifi") or {}
+        enforcement = self.status_ctx.get("enforcement") or {}
+        suricata = self.status_ctx.get("suricata") or {}
+        view = {
+            "state": self.status_ctx.get("state"),
+            "suspicion": self.status_ctx.get("suspicion"),
+            "reason": self.status_ctx.get("reason"),
+            "link": wifi.get("link"),
+            "wifi_tags": wifi.get("wifi_tags"),
+            "applied_stage": enforcement.get("applied_stage"),
+            "enforce_errors": enforcement.get("errors"),
+            "suricata_last_alert": suricata.get("last_alert"),
+        }
+        line = json.dumps(view, default=str, sort_keys=True)
+        now = time.monotonic()
+        if line != self.last_log_line or now - self.last_log_at >= self.log_heartbeat_sec:
+            self.logger.info(line)
+            self.last_log_line = line
+            self.last_log_at = now
+        if probe_ran and self.last_probe:
+            self.logger.info(json.dumps({"probe": self.last_probe.details}, default=str))
+
     def poll_wifi(self) -> tuple[bool, Dict[str, object], bool]:
-        tags, meta = evaluate_wifi_safety(
-            self.cfg.interfaces["upstream"],
-            self.cfg.paths.get("known_db", ""),
-            self.cfg.interfaces.get("gateway_ip"),
-        )
+        with _WIFI_EVAL.time():
+            tags, meta = evaluate_wifi_safety(
+                self.cfg.interfaces["upstream"],
+                self.cfg.paths.get("known_db", ""),
+                self.cfg.interfaces.get("gateway_ip"),
+                self.scan,
+            )
         link = meta.get("link", {})
         connected = link.get("connected") == "1"
         bssid = link.get("bssid", "")
@@ -268,7 +510,6 @@ class FirstMinuteController:
             probe_lines.append(f"DNS mismatch: {probe.dns_mismatch}")
         tags = link_meta.get("wifi_tags", []) if link_meta else []
         out = []
-        out.append("\033[2J\033[H")  # clear screen
         out.append("Azazel-Zero First-Minute Control")
         out.append(f"State: {state.value:8}  Suspicion: {summary.get('suspicion', 0):5} [{bar}]")
         out.append(f"Reason: {summary.get('reason','')}")
@@ -278,5 +519,6 @@ class FirstMinuteController:
         if probe_lines:
             out.append("Probe: " + " | ".join(probe_lines))
         out.append("Ctrl+Cで停止 / JSONログ: first_minute.log")
-        sys.stdout.write("\n".join(out) + "\n")
-        sys.stdout.flush()
+        # Redraw only the rows that changed instead of clearing the screen.
+        if self.screen:
+            self.screen.render(out)
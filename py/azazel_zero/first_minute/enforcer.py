@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+from .state_machine import Stage
+
+
+class StageEnforcer(threading.Thread):
+    """Applies desired stages (nft/tc) off the controller loop.
+
+    Only the latest desired stage is kept: if PROBE -> DEGRADED -> CONTAIN is
+    submitted before the worker wakes up, only CONTAIN is applied. Stages are
+    applied in submission order, so an older stage never overwrites a newer one.
+    A failed apply is retried (with backoff) until it succeeds or a newer
+    stage is submitted; `applied_stage` only ever names a stage that is in place.
+    """
+
+    def __init__(self, apply_fn: Callable[[Stage], None], stop_event: threading.Event,
+                 retry_sec: float = 2.0, max_retry_sec: float = 30.0):
+        super().__init__(daemon=True, name="fmc-enforcer")
+        self.apply_fn = apply_fn
+        self.stop_event = stop_event
+        self.retry_sec = retry_sec
+        self.max_retry_sec = max_retry_sec
+        self.logger = logging.getLogger("first_minute.enforcer")
+        self._cond = threading.Condition()
+        self._desired: Optional[Stage] = None
+        self._desired_seq = 0
+        self._submitted_at = 0.0
+        self._applied_seq = 0
+        self._applied_stage: Optional[Stage] = None
+        self._applied_at = 0.0
+        self._latency_ms = 0.0
+        self._collapsed = 0
+        self._errors = 0
+        self._last_error = ""
+        self._failed_stage: Optional[Stage] = None
+        self._retries = 0
+        self._busy_since = 0.0
+
+    def submit(self, stage: Stage) -> None:
+        with self._cond:
+            if self._desired is not None:
+                self._collapsed += 1
+            self._desired = stage
+            self._desired_seq += 1
+            self._submitted_at = time.monotonic()
+            self._cond.notify()
+
+    def wait_idle(self, timeout: float = 5.0) -> bool:
+        """Block until every submitted stage has been applied (or timeout)."""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self._applied_seq < self._desired_seq:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def busy_for(self) -> float:
+        """Seconds the current nft/tc apply has been running (0 when idle)."""
+        with self._cond:
+            return time.monotonic() - self._busy_since if self._busy_since else 0.0
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._cond:
+            return {
+                "applied_stage": self._applied_stage.value if self._applied_stage else None,
+                "pending_stage": self._desired.value if self._desired else None,
+                "latency_ms": round(self._latency_ms, 1),
+                "applied_at": self._applied_at,
+                "collapsed": self._collapsed,
+                "errors": self._errors,
+                "last_error": self._last_error,
+                "failed_stage": self._failed_stage.value if self._failed_stage else None,
+                "retries": self._retries,
+            }
+
+    def run(self) -> None:
+        backoff = self.retry_sec
+        while True:
+            with self._cond:
+                while self._desired is None and not self.stop_event.is_set():
+                    self._cond.wait(0.5)
+                if self.stop_event.is_set():
+                    # stop() flushes nft/tc next; applying a pending stage would race it.
+                    self._desired = None
+                    return
+                stage = self._desired
+                seq = self._desired_seq
+                submitted_at = self._submitted_at
+                self._desired = None
+                self._busy_since = time.monotonic()
+            failed = False
+            error = ""
+            try:
+                self.apply_fn(stage)
+            except Exception as exc:  # keep enforcing later stages even if one apply fails
+                failed = True
+                error = str(exc) or repr(exc)
+                self.logger.warning("stage apply failed (%s): %s", stage.value, error)
+            done = time.monotonic()
+            with self._cond:
+                self._busy_since = 0.0
+                if not failed:
+                    self._applied_seq = seq
+                    self._applied_stage = stage
+                    self._applied_at = time.time()
+                    self._latency_ms = (done - submitted_at) * 1000.0
+                    self._failed_stage = None
+                    backoff = self.retry_sec
+                    self._cond.notify_all()
+                    continue
+                self._errors += 1
+                self._last_error = error
+                self._failed_stage = stage
+                if self._desired is None and not self.stop_event.is_set():
+                    # Nothing newer to apply: put the stage back and retry it,
+                    # unless a new stage is submitted during the backoff.
+                    self._desired = stage
+                    self._retries += 1
+                    deadline = time.monotonic() + backoff
+                    while self._desired_seq == seq and not self.stop_event.is_set():
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self._cond.wait(min(remaining, 0.5))
+                    if self.stop_event.is_set():
+                        self._desired = None
+                        return
+                    backoff = min(backoff * 2, self.max_retry_sec)
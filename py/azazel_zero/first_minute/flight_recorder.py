@@ -0,0 +1,218 @@
+from __future__ import annotations
+
+import mmap
+import os
+import struct
+from pathlib import Path
+from typing import Dict, Iterator, List, Mapping, Tuple
+
+from .state_machine import Stage
+
+# File layout: 32-byte header followed by `capacity` fixed-size records.
+#   header: magic(4) version(u16) record_size(u16) capacity(u32) pad(u32) written(u64) pad(u64)
+#   record v2: ts(f64) suspicion(f32) signal_bitmap(u32) suricata_score(f32)
+#              wifi_tag_bitmap(u32) bssid(6) stage(u8) probe_fail_count(u8)
+#              dns_mismatch(u8) pad(3)
+#   record v1: ts(f64) suspicion(f32) signal_bitmap(u32) stage(u8) pad(3)
+# v2 keeps the values scoring scales by (counts, suricata score, the tags) and
+# the BSSID, so a replay of a recorder file follows the live suspicion curve.
+MAGIC = b"AZFR"
+VERSION = 2
+_HEADER = struct.Struct("<4sHHIIQQ")
+_RECORD = struct.Struct("<dfIfI6sBBB3x")
+_RECORD_V1 = struct.Struct("<dfIB3x")
+_WRITTEN_OFFSET = 16
+
+# Bit positions are part of the on-disk format: append only.
+SIGNAL_BITS = (
+    "link_up",
+    "probe_fail",
+    "dns_mismatch",
+    "cert_mismatch",
+    "wifi_tags",
+    "route_anomaly",
+    "suricata_alert",
+    "allow_recover",
+)
+# wifi_tags values (sensors/wifi_safety.py); any other tag is stored as "other",
+# which scores like the live run as long as it has no per-tag weight.
+WIFI_TAG_BITS = ("evil_ap", "evil_twin", "mitm", "arp_spoof", "dhcp_spoof", "dns_spoof", "other")
+STAGE_CODES = {stage: i for i, stage in enumerate(Stage)}
+STAGE_BY_CODE = {i: stage for stage, i in STAGE_CODES.items()}
+
+
+def encode_signals(signals: Mapping[str, object]) -> int:
+    bitmap = 0
+    for bit, name in enumerate(SIGNAL_BITS):
+        if signals.get(name):
+            bitmap |= 1 << bit
+    return bitmap
+
+
+def decode_signals(bitmap: int) -> Dict[str, object]:
+    return {name: bool(bitmap & (1 << bit)) for bit, name in enumerate(SIGNAL_BITS)}
+
+
+def encode_tags(tags: object) -> int:
+    bitmap = 0
+    if isinstance(tags, (list, tuple, set, frozenset)):
+        for tag in tags:
+            name = tag if tag in WIFI_TAG_BITS else "other"
+            bitmap |= 1 << WIFI_TAG_BITS.index(name)
+    return bitmap
+
+
+def decode_tags(bitmap: int) -> List[str]:
+    return [name for bit, name in enumerate(WIFI_TAG_BITS) if bitmap & (1 << bit)]
+
+
+def _count(value: object) -> int:
+    try:
+        return max(0, min(255, int(value or 0)))  # type: ignore[call-overload]
+    except (TypeError, ValueError):
+        return 0
+
+
+def _bssid_bytes(bssid: object) -> bytes:
+    try:
+        raw = bytes.fromhex(str(bssid or "").replace(":", ""))
+    except ValueError:
+        return bytes(6)
+    return raw if len(raw) == 6 else bytes(6)
+
+
+def format_signals(signals: Mapping[str, object]) -> str:
+    """Active signals for one dump line: flags by name, values as name=value."""
+    out = []
+    for name, value in signals.items():
+        if not value or name == "bssid":
+            continue
+        if value is True:
+            out.append(name)
+        elif isinstance(value, list):
+            out.append(f"{name}={'+'.join(value)}")
+        else:
+            out.append(f"{name}={value}")
+    return ",".join(out)
+
+
+class FlightRecorder:
+    """Fixed-size, memory-mapped ring buffer of per-tick controller state.
+
+    Each tick costs one 36-byte store into the mapping; the kernel writes the
+    dirty page back on its own schedule, so an idle device produces no extra
+    log lines while the last `capacity` ticks stay available after a crash.
+    They survive a reboot only if the file is on persistent storage (the
+    default); a path under /run avoids the writeback but loses them.
+    """
+
+    def __init__(self, path: Path, capacity: int = 4096):
+        self.path = Path(path)
+        self.capacity = int(capacity)
+        size = _HEADER.size + self.capacity * _RECORD.size
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o640)
+        try:
+            fresh = os.fstat(fd).st_size != size  # also replaces a v1 file
+            if fresh:
+                os.ftruncate(fd, size)
+            self._mm = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+        if fresh or _HEADER.unpack_from(self._mm, 0)[:3] != (MAGIC, VERSION, _RECORD.size):
+            self._mm[: _HEADER.size] = _HEADER.pack(MAGIC, VERSION, _RECORD.size, self.capacity, 0, 0, 0)
+            self.written = 0
+        else:
+            self.written = _HEADER.unpack_from(self._mm, 0)[5]
+
+    def record(self, ts: float, stage: Stage, suspicion: float, signals: Mapping[str, object]) -> None:
+        slot = self.written % self.capacity
+        _RECORD.pack_into(
+            self._mm,
+            _HEADER.size + slot * _RECORD.size,
+            ts,
+            float(suspicion),
+            encode_signals(signals),
+            float(signals.get("suricata_score") or 0.0),  # type: ignore[arg-type]
+            encode_tags(signals.get("wifi_tags")),
+            _bssid_bytes(signals.get("bssid")),
+            STAGE_CODES.get(stage, 0),
+            _count(signals.get("probe_fail_count")),
+            _count(signals.get("dns_mismatch")),
+        )
+        self.written += 1
+        struct.pack_into("<Q", self._mm, _WRITTEN_OFFSET, self.written)
+
+    def flush(self) -> None:
+        self._mm.flush()
+
+    def close(self) -> None:
+        if not self._mm.closed:
+            self._mm.flush()
+            self._mm.close()
+
+
+def _decode_v2(fields: tuple) -> Tuple[float, float, int, Dict[str, object]]:
+    ts, suspicion, bitmap, suri_score, tag_bits, bssid, stage_code, probe_fails, dns_mismatch = fields
+    signals = decode_signals(bitmap)
+    if tag_bits:
+        signals["wifi_tags"] = decode_tags(tag_bits)
+    if probe_fails:
+        signals["probe_fail_count"] = probe_fails
+    if dns_mismatch:
+        signals["dns_mismatch"] = dns_mismatch
+    if suri_score:
+        signals["suricata_score"] = round(suri_score, 2)
+    if any(bssid):
+        signals["bssid"] = ":".join(f"{b:02x}" for b in bssid)
+    return ts, suspicion, stage_code, signals
+
+
+def _decode_v1(fields: tuple) -> Tuple[float, float, int, Dict[str, object]]:
+    ts, suspicion, bitmap, stage_code = fields
+    return ts, suspicion, stage_code, decode_signals(bitmap)
+
+
+def read_version(path: Path) -> int:
+    """Record format version of a recorder file (0 if it is not one)."""
+    with Path(path).open("rb") as fh:
+        head = fh.read(_HEADER.size)
+    if len(head) < _HEADER.size or head[:4] != MAGIC:
+        return 0
+    return _HEADER.unpack_from(head, 0)[1]
+
+
+def read_records(path: Path) -> List[Dict[str, object]]:
+    """Return the recorder contents oldest-first as trace entries.
+
+    Each entry has the shape used by the replay tool:
+    {"ts", "stage", "suspicion", "signals"}. v1 files only carry the signal
+    flags (no counts, suricata score, tags or BSSID).
+    """
+    data = Path(path).read_bytes()
+    if len(data) < _HEADER.size:
+        raise ValueError(f"{path}: too short for a flight recorder file")
+    magic, version, rec_size, capacity, _, written, _ = _HEADER.unpack_from(data, 0)
+    formats = {2: (_RECORD, _decode_v2), 1: (_RECORD_V1, _decode_v1)}
+    if magic != MAGIC or version not in formats or rec_size != formats[version][0].size:
+        raise ValueError(f"{path}: not an Azazel flight recorder file (v{version})")
+    record, decode = formats[version]
+    count = min(written, capacity)
+    start = written - count
+    out: List[Dict[str, object]] = []
+    for i in range(start, written):
+        ts, suspicion, stage_code, signals = decode(record.unpack_from(data, _HEADER.size + (i % capacity) * record.size))
+        stage = STAGE_BY_CODE.get(stage_code, Stage.INIT)
+        out.append({"ts": ts, "stage": stage.value, "suspicion": round(suspicion, 2), "signals": signals})
+    return out
+
+
+def iter_changes(records: List[Dict[str, object]]) -> Iterator[Dict[str, object]]:
+    """Yield only records whose stage, BSSID or active signals differ from the previous one."""
+    prev = None
+    for rec in records:
+        signals = rec["signals"]
+        key = (rec["stage"], signals.get("bssid"), format_signals(signals))  # type: ignore[union-attr]
+        if key != prev:
+            yield rec
+        prev = key
@@ -1,11 +1,18 @@
 from __future__ import annotations
 
 import subprocess
+import threading
+import time
 from pathlib import Path
-from typing import Optional
+from typing import Dict, Iterable, Optional
 
+from .metrics import timed
 from .state_machine import Stage
 
+_NFT_HIST = "fmc_nft_command_seconds"
+_NFT_HELP = "Latency of nft invocations"
+_PRUNE_INTERVAL = 30.0
+
 
 class NftManager:
     def __init__(
@@ -25,6 +32,14 @@ class NftManager:
         self.mgmt_subnet = mgmt_subnet
         self.probe_ttl = probe_ttl
         self.dynamic_ttl = dynamic_ttl
+        # Local mirror of set membership (ip -> expiry) for cardinality metrics.
+        # Expired entries are pruned on insert too (at most every
+        # _PRUNE_INTERVAL), so the mirror stays bounded without a scraper.
+        self._members: Dict[str, Dict[str, float]] = {}
+        self._members_lock = threading.Lock()
+        self._next_prune = 0.0
+        # Set default timeouts baked into the loaded ruleset (see apply_base).
+        self._base_ttls = {"allow_probe_v4": probe_ttl, "allow_dyn_v4": dynamic_ttl}
 
     def _render(self) -> str:
         path = Path(self.template_path)
@@ -48,10 +63,25 @@ class NftManager:
     def render_preview(self) -> str:
         return self._render()
 
+    @timed(_NFT_HIST, _NFT_HELP, op="apply_base")
     def apply_base(self) -> None:
         rendered = self._render()
         subprocess.run(["nft", "-f", "-"], input=rendered, text=True, check=True)
+        self._base_ttls = {"allow_probe_v4": self.probe_ttl, "allow_dyn_v4": self.dynamic_ttl}
+
+    def update_ttls(self, probe_ttl: int, dynamic_ttl: int) -> None:
+        """Change set TTLs without reloading the ruleset.
+
+        Elements added from now on carry an explicit timeout; elements already
+        in the sets keep the expiry they were inserted with.
+        """
+        self.probe_ttl = probe_ttl
+        self.dynamic_ttl = dynamic_ttl
 
+    def _set_ttl(self, set_name: str) -> int:
+        return self.probe_ttl if set_name == "allow_probe_v4" else self.dynamic_ttl
+
+    @timed(_NFT_HIST, _NFT_HELP, op="set_stage")
     def set_stage(self, stage: Stage) -> None:
         mark_map = {
             Stage.PROBE: 1,
@@ -68,22 +98,42 @@ class NftManager:
         )
 
     def add_ip(self, ip: str, set_name: str = "allow_dyn_v4", timeout: Optional[int] = None) -> None:
-        if ":" in ip:
-            return  # ignore IPv6 for this v4 set
-        elements = ip
-        cmd = ["nft", "add", "element", "inet", "azazel_fmc", set_name, f"{{ {elements} }}"]
-        if timeout:
-            cmd = [
-                "nft",
-                "add",
-                "element",
-                "inet",
-                "azazel_fmc",
-                set_name,
-                f"{{ {elements} timeout {timeout}s }}",
-            ]
-        subprocess.run(cmd, check=False)
+        self.add_ips([ip], set_name=set_name, timeout=timeout)
+
+    @timed(_NFT_HIST, _NFT_HELP, op="add_element")
+    def add_ips(self, ips: Iterable[str], set_name: str = "allow_dyn_v4", timeout: Optional[int] = None) -> None:
+        """Insert IPv4 addresses into set_name with a single nft invocation."""
+        addrs = list(dict.fromkeys(ip for ip in ips if ip and ":" not in ip))  # ignore IPv6 for the v4 sets
+        if not addrs:
+            return
+        if not timeout and self._base_ttls.get(set_name, self._set_ttl(set_name)) != self._set_ttl(set_name):
+            timeout = self._set_ttl(set_name)
+        suffix = f" timeout {timeout}s" if timeout else ""
+        elements = ", ".join(f"{ip}{suffix}" for ip in addrs)
+        subprocess.run(["nft", "add", "element", "inet", "azazel_fmc", set_name, f"{{ {elements} }}"], check=False)
+        now = time.time()
+        expiry = now + (timeout or self._set_ttl(set_name))
+        with self._members_lock:
+            if now >= self._next_prune:
+                self._prune_locked(now)
+            members = self._members.setdefault(set_name, {})
+            for ip in addrs:
+                members[ip] = expiry
+
+    def _prune_locked(self, now: float) -> None:
+        for members in self._members.values():
+            for ip in [ip for ip, exp in members.items() if exp <= now]:
+                del members[ip]
+        self._next_prune = now + _PRUNE_INTERVAL
+
+    def set_cardinality(self, set_name: str) -> int:
+        now = time.time()
+        with self._members_lock:
+            self._prune_locked(now)
+            return len(self._members.get(set_name, {}))
 
     def clear(self) -> None:
+        with self._members_lock:
+            self._members.clear()
         subprocess.run(["nft", "flush", "table", "inet", "azazel_fmc"], check=False)
         subprocess.run(["nft", "flush", "table", "ip", "nat_azazel_fmc"], check=False)
@@ -12,6 +12,11 @@ from dataclasses import dataclass
 from shutil import which
 from typing import Dict, List, Tuple
 
+from .metrics import timed
+
+_PROBE_HIST = "fmc_probe_duration_seconds"
+_PROBE_HELP = "Duration of First-Minute safety probes"
+
 
 @dataclass
 class ProbeOutcome:
@@ -22,6 +27,7 @@ class ProbeOutcome:
     details: Dict[str, object]
 
 
+@timed(_PROBE_HIST, _PROBE_HELP, probe="captive")
 def probe_captive_portal(url: str, timeout: int, retries: int) -> Tuple[bool, Dict[str, object]]:
     detail: Dict[str, object] = {"url": url, "status": None}
     for _ in range(max(1, retries + 1)):
@@ -43,6 +49,7 @@ def probe_captive_portal(url: str, timeout: int, retries: int) -> Tuple[bool, Di
     return True, detail
 
 
+@timed(_PROBE_HIST, _PROBE_HELP, probe="tls")
 def probe_tls_endpoint(host: str, port: int, fingerprint: str, timeout: int) -> Tuple[bool, Dict[str, object]]:
     mismatch = False
     detail: Dict[str, object] = {"host": host, "port": port}
@@ -63,6 +70,7 @@ def probe_tls_endpoint(host: str, port: int, fingerprint: str, timeout: int) ->
     return mismatch, detail
 
 
+@timed(_PROBE_HIST, _PROBE_HELP, probe="dns")
 def probe_dns_compare(sample_names: List[str], reference: str, timeout: int, max_mismatch: int) -> Tuple[int, Dict[str, object]]:
     mismatches = 0
     detail: Dict[str, object] = {"reference": reference, "results": []}
@@ -97,6 +105,7 @@ def probe_dns_compare(sample_names: List[str], reference: str, timeout: int, max
     return mismatches, detail
 
 
+@timed(_PROBE_HIST, _PROBE_HELP, probe="route")
 def probe_route(upstream: str) -> Tuple[bool, Dict[str, object]]:
     detail: Dict[str, object] = {"upstream": upstream}
     try:
@@ -113,6 +122,7 @@ def probe_route(upstream: str) -> Tuple[bool, Dict[str, object]]:
     return anomaly, detail
 
 
+@timed(_PROBE_HIST, _PROBE_HELP, probe="all")
 def run_all(cfg: Dict[str, object], upstream: str) -> ProbeOutcome:
     captive_cfg = cfg.get("captive_portal", {}) or {}
     tls_cfg = cfg.get("tls", []) or []
@@ -0,0 +1,350 @@
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import math
+import sys
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+from .flight_recorder import VERSION as RECORDER_VERSION
+from .flight_recorder import read_records, read_version
+from .scoring import ScoreTable
+from .state_machine import FirstMinuteStateMachine, Stage
+
+# Optional: batched sweeps run on arrays when NumPy is installed. Imported on
+# first use, since azazel_zero_run.py builds the replay parser on every run.
+np: Any = None
+_np_checked = False
+
+
+def _numpy() -> Any:
+    global np, _np_checked
+    if not _np_checked:
+        _np_checked = True
+        try:
+            import numpy  # type: ignore
+        except ImportError:  # pragma: no cover - dependency notice
+            numpy = None
+        np = numpy
+    return np
+
+# state_machine keys that can be swept; signal weights stay as configured.
+SWEEP_KEYS = (
+    "decay_per_sec",
+    "degrade_threshold",
+    "normal_threshold",
+    "contain_threshold",
+    "stable_normal_sec",
+    "stable_probe_sec",
+    "probe_window_sec",
+)
+_SM_DEFAULTS = {
+    "decay_per_sec": 2,
+    "degrade_threshold": 30,
+    "normal_threshold": 8,
+    "contain_threshold": 65,
+    "stable_normal_sec": 20,
+    "stable_probe_sec": 10,
+    "probe_window_sec": 20,
+}
+ESCALATED = (Stage.DEGRADED, Stage.CONTAIN, Stage.DECEPTION)
+_CODES = {s: i for i, s in enumerate(Stage)}
+
+
+class Trace:
+    """A recorded signal sequence: [(ts, signals), ...] plus a label."""
+
+    def __init__(self, name: str, steps: List[Tuple[float, Dict[str, Any]]], label: str = ""):
+        self.name = name
+        self.steps = steps
+        self.label = label
+
+    @property
+    def benign(self) -> bool:
+        return self.label == "benign"
+
+
+def load_trace(path: Path, label: str = "") -> Trace:
+    """Load a JSONL trace ({"ts", "signals"} per line) or a flight recorder file.
+
+    A JSONL line of the form {"meta": {"label": "benign"}} labels the trace.
+    """
+    path = Path(path)
+    version = read_version(path)
+    if version:
+        if version < RECORDER_VERSION:
+            print(
+                f"replay: {path}: v{version} recorder keeps only signal flags; counts, suricata scores,"
+                " wifi tags and BSSIDs are missing, so suspicion will not match the live run",
+                file=sys.stderr,
+            )
+        return Trace(path.name, [(r["ts"], r["signals"]) for r in read_records(path)], label)  # type: ignore[misc]
+    steps: List[Tuple[float, Dict[str, Any]]] = []
+    for line in path.read_text().splitlines():
+        if not line.strip():
+            continue
+        rec = json.loads(line)
+        if "meta" in rec:
+            label = label or str(rec["meta"].get("label", ""))
+            continue
+        steps.append((float(rec["ts"]), dict(rec.get("signals") or {})))
+    return Trace(path.name, steps, label)
+
+
+def replay(trace: Trace, cfg: Mapping[str, Any]) -> List[Tuple[float, Stage, float]]:
+    """Run a trace through FirstMinuteStateMachine on a simulated clock."""
+    now = [trace.steps[0][0] if trace.steps else 0.0]
+    sm = FirstMinuteStateMachine(dict(cfg), clock=lambda: now[0])
+    timeline: List[Tuple[float, Stage, float]] = []
+    for ts, signals in trace.steps:
+        now[0] = ts
+        bssid = signals.get("bssid") or ""
+        # Same new-link handling as FirstMinuteController.poll_wifi
+        if signals.get("link_up") and bssid and bssid != sm.ctx.last_link_bssid:
+            sm.reset_for_new_link(bssid)
+        state, summary = sm.step(signals)
+        timeline.append((ts, state, float(summary["suspicion"])))
+    return timeline
+
+
+def timeline_stats(timeline: Sequence[Tuple[float, Stage, float]]) -> Dict[str, Optional[float]]:
+    """time_to_contain: seconds from trace start to first CONTAIN (None if never).
+    escalated_dwell: seconds spent in DEGRADED/CONTAIN (false-positive dwell on benign traces).
+    """
+    if not timeline:
+        return {"time_to_contain": None, "escalated_dwell": 0.0}
+    t0 = timeline[0][0]
+    ttc: Optional[float] = None
+    dwell = 0.0
+    for (ts, stage, _), (nxt, _, _) in zip(timeline, list(timeline[1:]) + [timeline[-1]]):
+        if stage in ESCALATED:
+            dwell += nxt - ts
+        if ttc is None and stage in (Stage.CONTAIN, Stage.DECEPTION):
+            ttc = ts - t0
+    return {"time_to_contain": ttc, "escalated_dwell": dwell}
+
+
+def expand_grid(grid: Mapping[str, Sequence[float]]) -> List[Dict[str, float]]:
+    for key in grid:
+        if key not in SWEEP_KEYS:
+            raise ValueError(f"cannot sweep {key!r}; choose from {', '.join(SWEEP_KEYS)}")
+    keys = list(grid)
+    return [dict(zip(keys, combo)) for combo in itertools.product(*(grid[k] for k in keys))]
+
+
+def _precompute(trace: Trace, table: ScoreTable) -> Tuple[List[float], List[float], List[bool], List[bool], List[bool]]:
+    """Threshold-independent per-step inputs: ts, score added, link, new link, recover."""
+    ts, adds, link, new_link, recover = [], [], [], [], []
+    # Link handling does not depend on thresholds: every machine is in INIT
+    # after a link-down step, so last_link_bssid can be tracked once here.
+    last_bssid = ""
+    was_init = True
+    for t, signals in trace.steps:
+        ts.append(t)
+        adds.append(table.score(signals)[0])
+        up = bool(signals.get("link_up"))
+        link.append(up)
+        bssid = signals.get("bssid") or ""
+        fresh = bool(up and bssid and bssid != last_bssid)
+        new_link.append(fresh)
+        if fresh or (up and was_init):
+            last_bssid = bssid
+        was_init = not up
+        recover.append(bool(signals.get("allow_recover")))
+    return ts, adds, link, new_link, recover
+
+
+def _sweep_trace_numpy(
+    trace: Trace, table: ScoreTable, base_cfg: Mapping[str, Any], params: List[Dict[str, float]]
+) -> List[Dict[str, Optional[float]]]:
+    """Advance every parameter set through the trace at once (arrays of length P).
+
+    Mirrors FirstMinuteStateMachine.step; `replay()` is the reference.
+    """
+    np = _numpy()
+    ts, adds, link, new_link, recover = _precompute(trace, table)
+    P = len(params)
+    col = {k: np.array([float(p.get(k, base_cfg.get(k, _SM_DEFAULTS[k]))) for p in params]) for k in SWEEP_KEYS}
+    INIT, PROBE, DEGRADED, NORMAL, CONTAIN = (_CODES[s] for s in (Stage.INIT, Stage.PROBE, Stage.DEGRADED, Stage.NORMAL, Stage.CONTAIN))
+    t0 = ts[0] if ts else 0.0
+    sus = np.zeros(P)
+    st = np.full(P, INIT)
+    probe_started = np.full(P, t0)
+    stable_since = np.full(P, t0)
+    ttc = np.full(P, np.nan)
+    dwell = np.zeros(P)
+    prev_t = t0
+    prev_st = st.copy()
+    for i, now in enumerate(ts):
+        dwell += np.where((prev_st == DEGRADED) | (prev_st == CONTAIN), now - prev_t, 0.0)
+        if new_link[i]:
+            st[:] = PROBE
+            sus[:] = 0.0
+            probe_started[:] = now
+            stable_since[:] = now
+            prev_t = now
+        sus = np.maximum(0.0, sus - col["decay_per_sec"] * (now - prev_t))
+        sus = np.minimum(table.max_suspicion, sus + adds[i])
+        prev_t = now
+        if not link[i]:
+            down = st != INIT
+            st[down] = INIT
+            sus[down] = 0.0
+            prev_st = st.copy()
+            continue
+        elapsed = now - probe_started
+        old = st.copy()
+        m = old == INIT
+        st[m] = PROBE
+        sus[m] = 0.0
+        probe_started[m] = now
+        stable_since[m] = now
+
+        m = old == PROBE
+        c1 = m & (sus >= col["contain_threshold"])
+        c2 = m & ~c1 & (sus >= col["degrade_threshold"]) & (elapsed >= col["stable_probe_sec"])
+        c3 = m & ~c1 & ~c2 & (elapsed >= col["probe_window_sec"]) & (sus <= col["normal_threshold"])
+        st[c1] = CONTAIN
+        st[c2] = DEGRADED
+        st[c3] = NORMAL
+        stable_since[c2 | c3] = now
+
+        m = old == DEGRADED
+        d1 = m & (sus >= col["contain_threshold"])
+        low = m & ~d1 & (sus <= col["normal_threshold"])
+        d2 = low & (now - stable_since >= col["stable_normal_sec"])
+        st[d1] = CONTAIN
+        st[d2] = NORMAL
+        stable_since[m & ~d1 & ~low] = now
+
+        m = old == NORMAL
+        n1 = m & (sus >= col["contain_threshold"])
+        n2 = m & ~n1 & (sus >= col["degrade_threshold"])
+        st[n1] = CONTAIN
+        st[n2] = DEGRADED
+        stable_since[n2] = now
+
+        if recover[i]:
+            st[(old == CONTAIN) & (sus <= col["degrade_threshold"])] = DEGRADED
+
+        first = (st == CONTAIN) & np.isnan(ttc)
+        ttc[first] = now - t0
+        prev_st = st.copy()
+    return [
+        {"time_to_contain": None if math.isnan(v) else float(v), "escalated_dwell": float(d)}
+        for v, d in zip(ttc.tolist(), dwell.tolist())
+    ]
+
+
+def sweep(
+    traces: Sequence[Trace], base_cfg: Mapping[str, Any], grid: Mapping[str, Sequence[float]], use_numpy: Optional[bool] = None
+) -> List[Dict[str, Any]]:
+    """Evaluate every grid point over every trace and aggregate per parameter set."""
+    params = expand_grid(grid) or [{}]
+    have_np = _numpy() is not None
+    use_numpy = have_np if use_numpy is None else (use_numpy and have_np)
+    table = ScoreTable.compile(base_cfg)
+    per_trace: List[List[Dict[str, Optional[float]]]] = []
+    for trace in traces:
+        if not trace.steps:
+            per_trace.append([timeline_stats([]) for _ in params])
+        elif use_numpy:
+            per_trace.append(_sweep_trace_numpy(trace, table, base_cfg, params))
+        else:
+            per_trace.append([timeline_stats(replay(trace, {**base_cfg, **p})) for p in params])
+
+    results: List[Dict[str, Any]] = []
+    for j, p in enumerate(params):
+        ttcs: List[float] = []
+        missed = 0
+        fp_dwell = 0.0
+        fp_contain = 0
+        for trace, stats in zip(traces, per_trace):
+            s = stats[j]
+            if trace.benign:
+                fp_dwell += float(s["escalated_dwell"] or 0.0)
+                fp_contain += s["time_to_contain"] is not None
+            elif s["time_to_contain"] is None:
+                missed += 1
+            else:
+                ttcs.append(float(s["time_to_contain"]))
+        results.append(
+            {
+                "params": p,
+                "contained": len(ttcs),
+                "missed": missed,
+                "mean_time_to_contain": round(sum(ttcs) / len(ttcs), 2) if ttcs else None,
+                "max_time_to_contain": round(max(ttcs), 2) if ttcs else None,
+                "false_positive_dwell": round(fp_dwell, 2),
+                "false_contain": fp_contain,
+            }
+        )
+    results.sort(key=lambda r: (r["missed"], r["false_contain"], r["false_positive_dwell"], r["mean_time_to_contain"] or 0.0))
+    return results
+
+
+def parse_grid(items: Iterable[str]) -> Dict[str, List[float]]:
+    grid: Dict[str, List[float]] = {}
+    for item in items:
+        key, _, values = item.partition("=")
+        if not values:
+            raise ValueError(f"grid entry must look like key=v1,v2: {item!r}")
+        grid[key.strip()] = [float(v) for v in values.split(",") if v.strip()]
+    return grid
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("traces", nargs="*", help="攻撃/検証トレース (JSONL または flight recorder)")
+    parser.add_argument("--benign", nargs="*", default=[], help="良性トレース (誤検知滞在時間の計測用)")
+    parser.add_argument("--grid", nargs="*", default=[], help="しきい値グリッド 例: contain_threshold=50,65 decay_per_sec=1,3")
+    parser.add_argument("--timeline", action="store_true", help="各トレースのステージ推移を表示 (グリッドなし時)")
+    parser.add_argument("--no-numpy", action="store_true", help="NumPy があっても逐次シミュレーションを使う")
+    parser.add_argument("--top", type=int, default=10, help="表示するパラメータセット数")
+    parser.add_argument("--json", action="store_true", help="結果を JSON で出力")
+
+
+def run(args: argparse.Namespace, sm_cfg: Mapping[str, Any]) -> int:
+    traces = [load_trace(Path(p)) for p in args.traces] + [load_trace(Path(p), label="benign") for p in args.benign]
+    if not traces:
+        print("replay: no traces given", file=sys.stderr)
+        return 2
+    if args.timeline and not args.grid:
+        for trace in traces:
+            print(f"== {trace.name} ({trace.label or 'attack'})")
+            prev = None
+            for ts, stage, sus in replay(trace, sm_cfg):
+                if stage != prev:
+                    print(f"  +{ts - trace.steps[0][0]:8.1f}s  {stage.value:9} suspicion={sus:.2f}")
+                prev = stage
+    results = sweep(traces, sm_cfg, parse_grid(args.grid), use_numpy=not args.no_numpy)
+    if args.json:
+        print(json.dumps(results[: args.top], indent=2))
+        return 0
+    print(f"{len(traces)} traces, {len(results)} parameter sets (numpy={'yes' if _numpy() is not None and not args.no_numpy else 'no'})")
+    for r in results[: args.top]:
+        params = " ".join(f"{k}={v:g}" for k, v in r["params"].items()) or "(config)"
+        print(
+            f"{params:60}  contained={r['contained']} missed={r['missed']} "
+            f"ttc_mean={r['mean_time_to_contain']} ttc_max={r['max_time_to_contain']} "
+            f"fp_dwell={r['false_positive_dwell']}s fp_contain={r['false_contain']}"
+        )
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Replay First-Minute signal traces and sweep state machine thresholds")
+    parser.add_argument("--config", default="", help="first_minute.yaml (state_machine セクションを使用)")
+    add_arguments(parser)
+    args = parser.parse_args()
+    sm_cfg: Dict[str, Any] = {}
+    if args.config:
+        from .config import FirstMinuteConfig
+
+        sm_cfg = dict(FirstMinuteConfig.load(args.config).state_machine)
+    return run(args, sm_cfg)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+# Signal weights as shipped before they became configurable. `state_machine.
+# signal_weights` in first_minute.yaml overrides any of these per signal.
+#   weight:   points added when the signal is present
+#   scale_by: multiply weight by this numeric signal (e.g. probe_fail_count)
+#   value_from: use this numeric signal as the contribution instead of weight
+#   tags:     per-tag points when the signal carries a list of tags
+#   cap:      upper bound for this signal's contribution in one step
+DEFAULT_SIGNAL_WEIGHTS: Dict[str, Dict[str, Any]] = {
+    "probe_fail": {"weight": 15, "scale_by": "probe_fail_count"},
+    "dns_mismatch": {"weight": 10, "scale_by": "dns_mismatch"},
+    "cert_mismatch": {"weight": 25},
+    "wifi_tags": {"weight": 20},
+    "route_anomaly": {"weight": 10},
+    "suricata_alert": {"weight": 15, "value_from": "suricata_score"},
+}
+
+_FLAT, _SCALED, _VALUE, _TAGS = 0, 1, 2, 3
+
+# (signal, kind, weight, aux key, tag table, cap)
+_Entry = Tuple[str, int, float, str, Dict[str, float], float]
+
+
+class ScoreTable:
+    """Signal weights compiled into a flat tuple for the per-step loop.
+
+    `score()` walks the table once, looks each signal up in the step's
+    signal dict and returns the total plus each signal's contribution so the
+    state machine summary can explain where suspicion came from.
+    """
+
+    __slots__ = ("entries", "max_suspicion")
+
+    def __init__(self, entries: Tuple[_Entry, ...], max_suspicion: float = 100.0):
+        self.entries = entries
+        self.max_suspicion = max_suspicion
+
+    @classmethod
+    def compile(cls, cfg: Optional[Mapping[str, Any]] = None) -> "ScoreTable":
+        cfg = cfg or {}
+        table: Dict[str, Dict[str, Any]] = {k: dict(v) for k, v in DEFAULT_SIGNAL_WEIGHTS.items()}
+        for name, spec in (cfg.get("signal_weights") or {}).items():
+            if isinstance(spec, (int, float)):
+                spec = {"weight": spec}
+            table.setdefault(name, {}).update(spec or {})
+        entries: List[_Entry] = []
+        for name, spec in table.items():
+            weight = float(spec.get("weight", 0))
+            tags = {str(k): float(v) for k, v in (spec.get("tags") or {}).items()}
+            if tags:
+                kind, aux = _TAGS, ""
+            elif spec.get("value_from"):
+                kind, aux = _VALUE, str(spec["value_from"])
+            elif spec.get("scale_by"):
+                kind, aux = _SCALED, str(spec["scale_by"])
+            else:
+                kind, aux = _FLAT, ""
+            default_cap = max([weight] + list(tags.values())) if kind == _TAGS else float("inf")
+            cap = float(spec.get("cap", default_cap))
+            entries.append((name, kind, weight, aux, tags, cap))
+        return cls(tuple(entries), float(cfg.get("max_suspicion", 100.0)))
+
+    def score(self, signals: Mapping[str, Any]) -> Tuple[float, Dict[str, float]]:
+        total = 0.0
+        contrib: Dict[str, float] = {}
+        for name, kind, weight, aux, tags, cap in self.entries:
+            val = signals.get(name)
+            if not val:
+                continue
+            if kind == _FLAT:
+                add = weight
+            elif kind == _SCALED:
+                add = weight * float(signals.get(aux, 1))
+            elif kind == _VALUE:
+                add = float(signals.get(aux, weight))
+            elif isinstance(val, (list, tuple, set, frozenset)):
+                add = sum(tags.get(t, weight) for t in val)
+            else:
+                add = weight
+            if add > cap:
+                add = cap
+            contrib[name] = add
+            total += add
+        return total, contrib
@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import os
+import socket
+import time
+from typing import Mapping, Optional
+
+
+class SystemdNotifier:
+    """Minimal sd_notify(3) client: one datagram per message to $NOTIFY_SOCKET.
+
+    Every method is a no-op when the controller is not started by systemd
+    (no NOTIFY_SOCKET), and send errors are swallowed: notification must never
+    take enforcement down with it.
+    """
+
+    def __init__(self, env: Optional[Mapping[str, str]] = None):
+        env = os.environ if env is None else env
+        addr = env.get("NOTIFY_SOCKET", "")
+        if addr.startswith("@"):
+            addr = "\0" + addr[1:]  # abstract namespace
+        self.address = addr
+        self._sock: Optional[socket.socket] = None
+        # WATCHDOG_PID guards against a forked child inheriting the watchdog.
+        usec = env.get("WATCHDOG_USEC", "")
+        wd_pid = env.get("WATCHDOG_PID", "")
+        valid = usec.isdigit() and (not wd_pid or wd_pid == str(os.getpid()))
+        self.watchdog_sec = int(usec) / 1_000_000 if valid else 0.0
+        self._last_status = ""
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.address)
+
+    def send(self, **fields: object) -> bool:
+        """Send KEY=value lines, e.g. send(READY=1, STATUS="...")."""
+        if not self.address:
+            return False
+        msg = "\n".join(f"{k}={v}" for k, v in fields.items()).encode("utf-8")
+        try:
+            if self._sock is None:
+                self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM | socket.SOCK_CLOEXEC)
+            self._sock.sendto(msg, self.address)
+            return True
+        except OSError:
+            return False
+
+    def ready(self, status: str = "") -> bool:
+        return self.send(READY=1, STATUS=status) if status else self.send(READY=1)
+
+    def reloading(self) -> bool:
+        return self.send(RELOADING=1, MONOTONIC_USEC=int(time.monotonic() * 1_000_000))
+
+    def stopping(self) -> bool:
+        return self.send(STOPPING=1)
+
+    def watchdog(self) -> bool:
+        return self.send(WATCHDOG=1) if self.watchdog_sec else False
+
+    def status(self, text: str) -> bool:
+        """Update the `systemctl status` line; unchanged text is not resent."""
+        if text == self._last_status:
+            return False
+        self._last_status = text
+        return self.send(STATUS=text)
+
+    def close(self) -> None:
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .metrics import REGISTRY
+
+_STEP_SECONDS = REGISTRY.gauge("fmc_startup_step_seconds", "Duration of each controller startup step")
+_STARTUP_SECONDS = REGISTRY.gauge("fmc_startup_seconds", "Controller startup wall time")
+
+
+class StartupError(RuntimeError):
+    """A startup step failed; steps depending on it were skipped."""
+
+
+class Step:
+    __slots__ = ("name", "func", "deps")
+
+    def __init__(self, name: str, func: Callable[[], object], deps: Sequence[str] = ()):
+        self.name = name
+        self.func = func
+        self.deps = tuple(deps)
+
+
+class StartupPlan:
+    """Run startup steps as a dependency graph on a small thread pool.
+
+    A step starts as soon as everything it depends on has finished, so slow
+    independent work (DNS resolution, binding the status API, sysctl) overlaps
+    with loading the nft ruleset. A failing step skips its dependents and the
+    first error is raised once the in-flight steps have finished.
+    """
+
+    def __init__(self, steps: Iterable[Step], max_workers: int = 4, logger: Optional[logging.Logger] = None):
+        self.steps: Dict[str, Step] = {}
+        for step in steps:
+            self.steps[step.name] = step
+        for step in self.steps.values():
+            missing = [d for d in step.deps if d not in self.steps]
+            if missing:
+                raise ValueError(f"startup step {step.name} depends on unknown {', '.join(missing)}")
+        self.max_workers = max_workers
+        self.logger = logger or logging.getLogger("first_minute.startup")
+        # name -> (start offset, duration) relative to run() start
+        self.timings: Dict[str, Tuple[float, float]] = {}
+        self.skipped: List[str] = []
+
+    def _timed(self, step: Step, t0: float) -> None:
+        start = time.monotonic()
+        try:
+            step.func()
+        finally:
+            end = time.monotonic()
+            self.timings[step.name] = (start - t0, end - start)
+            _STEP_SECONDS.set(end - start, step=step.name)
+
+    def run(self) -> float:
+        t0 = time.monotonic()
+        pending = dict(self.steps)
+        done: set = set()
+        failed: set = set()
+        errors: List[Tuple[str, BaseException]] = []
+        running: Dict[Future, str] = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="fmc-startup") as pool:
+            while pending or running:
+                for name, step in list(pending.items()):
+                    if any(d in failed for d in step.deps):
+                        del pending[name]
+                        failed.add(name)
+                        self.skipped.append(name)
+                    elif all(d in done for d in step.deps):
+                        del pending[name]
+                        running[pool.submit(self._timed, step, t0)] = name
+                if not running:
+                    if pending:
+                        raise StartupError(f"startup steps form a cycle: {', '.join(sorted(pending))}")
+                    break
+                finished, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    name = running.pop(fut)
+                    exc = fut.exception()
+                    if exc is None:
+                        done.add(name)
+                    else:
+                        failed.add(name)
+                        errors.append((name, exc))
+        total = time.monotonic() - t0
+        _STARTUP_SECONDS.set(total)
+        self.log_breakdown(total)
+        if errors:
+            name, exc = errors[0]
+            raise StartupError(f"startup step {name} failed: {exc}") from exc
+        return total
+
+    def log_breakdown(self, total: float) -> None:
+        parts = [
+            f"{name}@{start * 1000:.0f}ms+{dur * 1000:.0f}ms"
+            for name, (start, dur) in sorted(self.timings.items(), key=lambda kv: kv[1][0])
+        ]
+        if self.skipped:
+            parts.append("skipped=" + ",".join(self.skipped))
+        self.logger.info("startup: %.0fms total; %s", total * 1000, " ".join(parts))
+
+
+def write_sysctls(values: Dict[str, str], root: Path = Path("/proc/sys")) -> List[str]:
+    """Set sysctls by writing /proc/sys directly instead of forking sysctl(8).
+
+    Returns the keys that could not be written.
+    """
+    failed: List[str] = []
+    for key, value in values.items():
+        path = root / key.replace(".", "/")
+        try:
+            if path.read_text().strip() == value:
+                continue
+            path.write_text(value)
+        except OSError:
+            failed.append(key)
+    return failed
+
+
+def resolve_ipv4(hosts: Iterable[str], timeout: float = 5.0) -> List[str]:
+    """Resolve hosts concurrently (A records only); unresolvable hosts are skipped."""
+    import socket
+
+    unique = list(dict.fromkeys(h for h in hosts if h))
+    results: Dict[str, List[str]] = {}
+
+    def lookup(host: str) -> None:
+        try:
+            infos = socket.getaddrinfo(host, None, socket.AF_INET, socket.SOCK_STREAM)
+        except (socket.gaierror, UnicodeError):
+            return
+        results[host] = [info[4][0] for info in infos if info[4]]
+
+    threads = [threading.Thread(target=lookup, args=(h,), daemon=True) for h in unique]
+    for t in threads:
+        t.start()
+    deadline = time.monotonic() + timeout
+    for t in threads:
+        t.join(max(0.0, deadline - time.monotonic()))
+    ips: List[str] = []
+    for host in unique:
+        ips.extend(results.get(host, []))
+    return list(dict.fromkeys(ips))
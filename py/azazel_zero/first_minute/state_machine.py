@@ -3,7 +3,9 @@ from __future__ import annotations
 import time
 from dataclasses import dataclass, field
 from enum import Enum
-from typing import Dict, List, Tuple
+from typing import Any, Callable, Dict, List, Tuple
+
+from .scoring import ScoreTable
 
 
 class Stage(str, Enum):
@@ -27,24 +29,35 @@ class StageContext:
 
 
 class FirstMinuteStateMachine:
-    def __init__(self, cfg: Dict[str, float]):
-        self.ctx = StageContext()
+    def __init__(self, cfg: Dict[str, Any], clock: Callable[[], float] = time.time):
+        # clock is injectable so recorded traces can be replayed faster than real time
+        self.clock = clock
+        now = clock()
+        self.ctx = StageContext(last_transition=now, probe_started=now, stable_since=now)
+        self.cfg = cfg
+        self.scores = ScoreTable.compile(cfg)
+
+    def update_config(self, cfg: Dict[str, Any]) -> None:
+        """Swap thresholds and signal weights in place (SIGHUP reload); keeps current state."""
         self.cfg = cfg
+        self.scores = ScoreTable.compile(cfg)
 
     def reset_for_new_link(self, bssid: str) -> None:
+        now = self.clock()
         self.ctx.state = Stage.PROBE
         self.ctx.suspicion = 0.0
-        self.ctx.last_transition = time.time()
-        self.ctx.probe_started = time.time()
-        self.ctx.stable_since = time.time()
+        self.ctx.last_transition = now
+        self.ctx.probe_started = now
+        self.ctx.stable_since = now
         self.ctx.last_link_bssid = bssid
         self.ctx.last_reason = "new_link"
 
     def force_state(self, stage: Stage, reason: str = "manual") -> Stage:
+        now = self.clock()
         self.ctx.state = stage
-        self.ctx.last_transition = time.time()
+        self.ctx.last_transition = now
         self.ctx.last_reason = reason
-        self.ctx.stable_since = time.time()
+        self.ctx.stable_since = now
         return stage
 
     def _decay(self, now: float) -> None:
@@ -53,34 +66,18 @@ class FirstMinuteStateMachine:
         self.ctx.suspicion = max(0.0, self.ctx.suspicion - decay * dt)
         self.ctx.last_transition = now
 
-    def _apply_signals(self, signals: Dict[str, float | int | bool], reasons: List[str]) -> None:
-        add = 0.0
-        if signals.get("probe_fail"):
-            add += 15 * float(signals.get("probe_fail_count", 1))
-            reasons.append("probe_fail")
-        if signals.get("dns_mismatch"):
-            add += 10 * float(signals.get("dns_mismatch", 1))
-            reasons.append("dns_mismatch")
-        if signals.get("cert_mismatch"):
-            add += 25
-            reasons.append("cert_mismatch")
-        if signals.get("wifi_tags"):
-            add += 20
-            reasons.append("wifi_tags")
-        if signals.get("route_anomaly"):
-            add += 10
-            reasons.append("route_anomaly")
-        if signals.get("suricata_alert"):
-            add += 15
-            reasons.append("suricata_alert")
-        self.ctx.suspicion = min(100.0, self.ctx.suspicion + add)
-
-    def step(self, signals: Dict[str, float | int | bool]) -> Tuple[Stage, Dict[str, float | str]]:
-        now = time.time()
+    def _apply_signals(self, signals: Dict[str, Any], reasons: List[str]) -> Dict[str, float]:
+        add, contrib = self.scores.score(signals)
+        reasons.extend(contrib)
+        self.ctx.suspicion = min(self.scores.max_suspicion, self.ctx.suspicion + add)
+        return contrib
+
+    def step(self, signals: Dict[str, Any]) -> Tuple[Stage, Dict[str, Any]]:
+        now = self.clock()
         reasons: List[str] = []
         # Passive decay
         self._decay(now)
-        self._apply_signals(signals, reasons)
+        contrib = self._apply_signals(signals, reasons)
 
         elapsed_probe = now - self.ctx.probe_started
         state = self.ctx.state
@@ -91,7 +88,7 @@ class FirstMinuteStateMachine:
             self.ctx.suspicion = 0.0
             self.ctx.last_reason = "link_down"
             self.ctx.last_transition = now
-            return self.ctx.state, {"state": self.ctx.state.value, "suspicion": 0.0, "reason": "link_down"}
+            return self.ctx.state, {"state": self.ctx.state.value, "suspicion": 0.0, "reason": "link_down", "contributions": {}}
 
         degrade_threshold = self.cfg.get("degrade_threshold", 30)
         normal_threshold = self.cfg.get("normal_threshold", 8)
@@ -154,5 +151,6 @@ class FirstMinuteStateMachine:
             "state": self.ctx.state.value,
             "suspicion": round(self.ctx.suspicion, 2),
             "reason": self.ctx.last_reason if reasons == [] else ",".join(reasons),
+            "contributions": contrib,
         }
         return self.ctx.state, summary
@@ -0,0 +1,225 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import queue
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Mapping, Optional, Tuple
+
+from .metrics import REGISTRY
+
+# path -> keys of the status context served on that path ("" = whole document)
+ROUTES: Dict[str, Tuple[str, ...]] = {
+    "/": (),
+    "/state": ("state", "suspicion", "reason", "contributions", "enforcement"),
+    "/probe": ("last_probe",),
+    "/wifi": ("wifi",),
+    "/suricata": ("suricata",),
+    "/enforcement": ("enforcement",),
+    "/clients": ("clients",),
+}
+
+
+def _encode(obj: object) -> bytes:
+    return json.dumps(obj, default=str, sort_keys=True, separators=(",", ":")).encode("utf-8")
+
+
+def _etag(body: bytes) -> str:
+    return '"' + hashlib.blake2s(body, digest_size=8).hexdigest() + '"'
+
+
+class StatusSnapshot:
+    """Immutable, pre-serialized view of the controller status.
+
+    Every route body and its ETag is computed once when the snapshot is
+    published, so request handlers only copy bytes.
+    """
+
+    __slots__ = ("version", "bodies", "etags")
+
+    def __init__(self, version: int, ctx: Mapping[str, object]):
+        bodies: Dict[str, bytes] = {}
+        for path, keys in ROUTES.items():
+            view = dict(ctx) if not keys else {k: ctx.get(k) for k in keys}
+            bodies[path] = _encode(view)
+        self.version = version
+        self.bodies = bodies
+        self.etags = {path: _etag(body) for path, body in bodies.items()}
+
+    def get(self, path: str) -> Optional[Tuple[bytes, str]]:
+        body = self.bodies.get(path)
+        if body is None:
+            return None
+        return body, self.etags[path]
+
+
+class StatusPublisher:
+    """Holds the latest StatusSnapshot; the controller publishes, handlers read.
+
+    Readers grab `current` (a single attribute read), so they never observe a
+    half-updated document.
+    """
+
+    def __init__(self, ctx: Optional[Mapping[str, object]] = None):
+        self._lock = threading.Lock()
+        self.current = StatusSnapshot(0, ctx or {})
+
+    def publish(self, ctx: Mapping[str, object]) -> bool:
+        """Publish ctx; returns True if it differs from the current snapshot."""
+        with self._lock:
+            cur = self.current
+            snap = StatusSnapshot(cur.version + 1, ctx)
+            if snap.bodies["/"] == cur.bodies["/"]:
+                return False
+            self.current = snap
+            return True
+
+
+class EventClient:
+    __slots__ = ("queue", "dropped")
+
+    def __init__(self, maxsize: int):
+        self.queue: "queue.Queue[Optional[bytes]]" = queue.Queue(maxsize=maxsize)
+        self.dropped = False
+
+
+class EventHub:
+    """Fan-out of Server-Sent Events to /events subscribers.
+
+    Each client has a bounded queue; a client that falls behind by more than
+    `client_buffer` events is dropped instead of growing memory or blocking
+    the controller loop.
+    """
+
+    def __init__(self, client_buffer: int = 64, max_clients: int = 8):
+        self.client_buffer = client_buffer
+        self.max_clients = max_clients
+        self._lock = threading.Lock()
+        self._clients: List[EventClient] = []
+        self._seq = 0
+
+    def subscribe(self) -> Optional[EventClient]:
+        with self._lock:
+            if len(self._clients) >= self.max_clients:
+                return None
+            client = EventClient(self.client_buffer)
+            self._clients.append(client)
+            return client
+
+    def unsubscribe(self, client: EventClient) -> None:
+        with self._lock:
+            if client in self._clients:
+                self._clients.remove(client)
+
+    def publish(self, event: str, data: object) -> None:
+        with self._lock:
+            self._seq += 1
+            frame = f"id: {self._seq}\nevent: {event}\ndata: ".encode("utf-8") + _encode(data) + b"\n\n"
+            for client in list(self._clients):
+                try:
+                    client.queue.put_nowait(frame)
+                except queue.Full:
+                    client.dropped = True
+                    self._clients.remove(client)
+
+    def close(self) -> None:
+        with self._lock:
+            clients, self._clients = self._clients, []
+        for client in clients:
+            client.dropped = True
+            try:
+                client.queue.put_nowait(None)
+            except queue.Full:
+                pass
+
+
+class StatusHandler(BaseHTTPRequestHandler):
+    keepalive_sec = 15.0
+
+    def __init__(self, publisher: StatusPublisher, events: Optional[EventHub], *args, **kwargs):
+        self.publisher = publisher
+        self.events = events
+        super().__init__(*args, **kwargs)
+
+    def _send_json(self, code: int, body: bytes, etag: str = "") -> None:
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Cache-Control", "no-cache")
+        if etag:
+            self.send_header("ETag", etag)
+        if code != 304:
+            self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def _stream_events(self) -> None:
+        client = self.events.subscribe() if self.events else None
+        if client is None:
+            self._send_json(503, _encode({"error": "too many event subscribers"}))
+            return
+        try:
+            # A client that stops reading would otherwise block this thread in
+            # wfile.write() forever, after the hub has already dropped it.
+            self.connection.settimeout(2 * self.keepalive_sec)
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.end_headers()
+            # Start every stream with the current state so clients need no extra GET.
+            self.wfile.write(b"event: snapshot\ndata: " + self.publisher.current.bodies["/state"] + b"\n\n")
+            self.wfile.flush()
+            while not client.dropped:
+                try:
+                    frame = client.queue.get(timeout=self.keepalive_sec)
+                except queue.Empty:
+                    frame = b": keepalive\n\n"
+                if frame is None:
+                    break
+                self.wfile.write(frame)
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError, socket.timeout, OSError):
+            pass  # disconnected, or not reading for 2x keepalive
+        finally:
+            self.events.unsubscribe(client)
+            self.close_connection = True
+
+    def do_GET(self):
+        path = self.path.split("?", 1)[0].rstrip("/") or "/"
+        if path == "/events":
+            self._stream_events()
+            return
+        if path == "/metrics":
+            body = REGISTRY.render()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        snap = self.publisher.current
+        found = snap.get(path)
+        if found is None:
+            self._send_json(404, _encode({"error": "not found", "paths": sorted(ROUTES) + ["/events", "/metrics"]}))
+            return
+        body, etag = found
+        if etag in (self.headers.get("If-None-Match") or ""):
+            self._send_json(304, b"", etag)
+            return
+        self._send_json(200, body, etag)
+
+    def log_message(self, fmt, *args):  # pragma: no cover - avoid noisy logs
+        return
+
+
+def make_status_server(
+    host: str, port: int, publisher: StatusPublisher, events: Optional[EventHub] = None
+) -> ThreadingHTTPServer:
+    def handler(*args, **kwargs):
+        return StatusHandler(publisher, events, *args, **kwargs)
+
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
@@ -0,0 +1,224 @@
+from __future__ import annotations
+
+import json
+import os
+import sys
+import time
+from collections import deque
+from pathlib import Path
+from typing import Deque, Dict, List, Optional, Tuple
+
+# Suricata writes compact JSON, so this substring is a cheap pre-filter that
+# lets flow/stats/dns records skip json.loads entirely.
+_ALERT_MARK = b'"event_type":"alert"'
+_DEFAULT_SEVERITY_WEIGHTS = {1: 25.0, 2: 15.0, 3: 5.0}
+# Leading bytes kept as the file's identity: eve lines start with a
+# microsecond timestamp, so a truncated and rewritten file differs here.
+_HEAD_BYTES = 64
+
+
+class EveTailer:
+    """Incremental eve.json reader that only looks at alert records.
+
+    `poll()` reads whatever was appended since the last call (in `max_read`
+    chunks until EOF or `read_budget_sec`, so a busy file is caught up over
+    a few polls), follows logrotate (inode change, or truncation detected by
+    size or by the first bytes changing, so a copytruncate followed by
+    enough new data to pass the old offset is still caught) and keeps
+    alerts in a sliding window for per-signature/severity counters.
+
+    On rotation the old handle is drained to its end before the new file
+    is read from offset 0; only the very first open honours `from_start`.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        window_sec: float = 60.0,
+        severity_weights: Optional[Dict[int, float]] = None,
+        max_score_per_poll: float = 40.0,
+        max_read: int = 256 * 1024,
+        from_start: bool = False,
+        read_budget_sec: float = 0.25,
+    ):
+        self.path = Path(path)
+        self.window_sec = float(window_sec)
+        self.severity_weights = {int(k): float(v) for k, v in (severity_weights or _DEFAULT_SEVERITY_WEIGHTS).items()}
+        self.max_score_per_poll = float(max_score_per_poll)
+        self.max_read = int(max_read)
+        self.from_start = from_start
+        self.read_budget_sec = float(read_budget_sec)
+        self._followed = False
+        self._fh = None
+        self._inode: Optional[int] = None
+        self._offset = 0
+        self._head = b""
+        self._partial = b""
+        # (ts, signature_id, signature, severity)
+        self._window: Deque[Tuple[float, int, str, int]] = deque()
+        self.total_alerts = 0
+        self.total_lines = 0
+
+    def close(self) -> None:
+        if self._fh:
+            self._fh.close()
+        self._fh = None
+        self._inode = None
+
+    def _open(self, st: os.stat_result, at_end: bool) -> None:
+        self.close()
+        self._fh = self.path.open("rb")
+        self._inode = st.st_ino
+        self._offset = st.st_size if at_end else 0
+        self._fh.seek(self._offset)
+        self._head = b""
+        self._partial = b""
+        self._followed = True
+        self._remember_head()
+
+    def _truncated(self, st: os.stat_result) -> bool:
+        if st.st_size < self._offset:
+            return True
+        return bool(self._head) and os.pread(self._fh.fileno(), len(self._head), 0) != self._head
+
+    def _remember_head(self) -> None:
+        if not self._head and self._offset >= _HEAD_BYTES:
+            self._head = os.pread(self._fh.fileno(), _HEAD_BYTES, 0)
+
+    def _drain(self, deadline: float) -> bytes:
+        chunks: List[bytes] = []
+        while True:
+            chunk = self._fh.read(self.max_read)
+            if not chunk:
+                break
+            chunks.append(chunk)
+            if time.monotonic() >= deadline:
+                break
+        data = b"".join(chunks)
+        self._offset += len(data)
+        self._remember_head()
+        return data
+
+    def _split(self, data: bytes) -> List[bytes]:
+        lines = (self._partial + data).split(b"\n")
+        self._partial = lines.pop()
+        return lines
+
+    def _read_new(self) -> List[bytes]:
+        deadline = time.monotonic() + self.read_budget_sec
+        try:
+            st: Optional[os.stat_result] = self.path.stat()
+        except OSError:
+            st = None
+        lines: List[bytes] = []
+        if self._fh is not None and (st is None or st.st_ino != self._inode):
+            # Rotated away: the old handle still sees everything written to it.
+            lines = self._split(self._drain(float("inf")))
+            if st is None:
+                return lines  # replacement not created yet; keep following the old file
+            if self._partial:
+                lines.append(self._partial)
+            self._open(st, at_end=False)
+        elif self._fh is None:
+            if st is None:
+                return []
+            # A file that appears after we were already following one is new
+            # data from its first byte.
+            self._open(st, at_end=not (self.from_start or self._followed))
+        elif self._truncated(st):
+            # Truncated in place (copytruncate), possibly already regrown.
+            self._fh.seek(0)
+            self._offset = 0
+            self._head = b""
+            self._partial = b""
+        if st is not None and st.st_size == self._offset:
+            return lines
+        return lines + self._split(self._drain(deadline))
+
+    def _parse_alert(self, line: bytes) -> Optional[Tuple[int, str, int]]:
+        if _ALERT_MARK not in line:
+            return None
+        try:
+            rec = json.loads(line)
+        except ValueError:
+            return None
+        alert = rec.get("alert") or {}
+        try:
+            severity = int(alert.get("severity", 3))
+        except (TypeError, ValueError):
+            severity = 3
+        return int(alert.get("signature_id") or 0), str(alert.get("signature", "")), severity
+
+    def _expire(self, now: float) -> None:
+        cutoff = now - self.window_sec
+        while self._window and self._window[0][0] < cutoff:
+            self._window.popleft()
+
+    def poll(self, now: Optional[float] = None) -> Tuple[float, List[Dict[str, object]]]:
+        """Consume new eve.json data; return (score, new_alerts).
+
+        A signature contributes its severity weight once per window, so a
+        noisy rule firing every second does not pin suspicion at the cap.
+        """
+        now = time.time() if now is None else now
+        self._expire(now)
+        seen = {sid for _, sid, _, _ in self._window}
+        score = 0.0
+        new_alerts: List[Dict[str, object]] = []
+        for line in self._read_new():
+            self.total_lines += 1
+            parsed = self._parse_alert(line)
+            if parsed is None:
+                continue
+            sid, signature, severity = parsed
+            self.total_alerts += 1
+            self._window.append((now, sid, signature, severity))
+            new_alerts.append({"signature_id": sid, "signature": signature, "severity": severity})
+            if sid not in seen:
+                seen.add(sid)
+                score += self.severity_weights.get(severity, min(self.severity_weights.values(), default=0.0))
+        return min(score, self.max_score_per_poll), new_alerts
+
+    def counters(self) -> Dict[str, object]:
+        by_sig: Dict[str, int] = {}
+        by_sev: Dict[str, int] = {}
+        for _, _, signature, severity in self._window:
+            by_sig[signature] = by_sig.get(signature, 0) + 1
+            by_sev[str(severity)] = by_sev.get(str(severity), 0) + 1
+        top = sorted(by_sig.items(), key=lambda kv: kv[1], reverse=True)[:5]
+        return {
+            "window_sec": self.window_sec,
+            "alerts_in_window": len(self._window),
+            "by_severity": by_sev,
+            "top_signatures": [{"signature": s, "count": c} for s, c in top],
+            "total_alerts": self.total_alerts,
+        }
+
+
+def main() -> int:
+    """Print alert signatures as they arrive (replacement for `tail | jq`).
+
+    With --json, each alert is printed as one JSON object (signature,
+    signature_id, severity) for consumers that rank alerts.
+    """
+    args = [a for a in sys.argv[1:] if a != "--json"]
+    as_json = len(args) != len(sys.argv) - 1
+    path = Path(args[0] if args else "/var/log/suricata/eve.json")
+    tailer = EveTailer(path)
+    try:
+        while True:
+            _, alerts = tailer.poll()
+            for alert in alerts:
+                if as_json:
+                    sys.stdout.write(json.dumps(alert, ensure_ascii=False) + "\n")
+                else:
+                    sys.stdout.write(f"{alert['signature']}\n")
+            if alerts:
+                sys.stdout.flush()
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
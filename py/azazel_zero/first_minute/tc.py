@@ -1,32 +1,111 @@
 from __future__ import annotations
 
 import subprocess
+from typing import Any, Dict, List, Mapping, Optional
 
+from .metrics import timed
 from .state_machine import Stage
 
+_TC_HIST = "fmc_tc_command_seconds"
+_TC_HELP = "Latency of tc qdisc updates"
+
+# Keep lightweight shaping; Pi Zero 2 W cannot handle heavy queuing.
+# downstream: netem delay/jitter/loss, upstream: tbf rate/burst/latency.
+# The `tc` section of first_minute.yaml overrides these per stage.
+DEFAULT_PROFILE: Dict[str, Dict[str, Any]] = {
+    "PROBE": {"delay": "220ms", "jitter": "100ms", "rate": "1mbit", "burst": "16kbit", "latency": "400ms"},
+    "DEGRADED": {"delay": "150ms", "jitter": "50ms", "distribution": "normal", "rate": "2mbit", "burst": "32kbit", "latency": "400ms"},
+    "CONTAIN": {"delay": "400ms", "jitter": "200ms", "loss": "5%", "rate": "512kbit", "burst": "8kbit", "latency": "600ms"},
+}
+
+
+# Keys commands() needs for every shaped stage (after merging with the defaults).
+REQUIRED_KEYS = ("delay", "rate", "burst", "latency")
+OPTIONAL_KEYS = ("jitter", "distribution", "loss")
+
+
+def profile_errors(overrides: Optional[Mapping[str, Mapping[str, Any]]]) -> List[str]:
+    """Problems with a `tc` override table; empty when it can be applied."""
+    if not overrides:
+        return []
+    if not isinstance(overrides, Mapping):
+        return [f"tc: expected a mapping of stage -> settings, got {type(overrides).__name__}"]
+    stages = {s.value for s in Stage}
+    errors: List[str] = []
+    for stage, vals in overrides.items():
+        name = str(stage).upper()
+        if name not in stages:
+            errors.append(f"tc.{stage}: unknown stage (expected one of {', '.join(sorted(stages))})")
+            continue
+        if vals is None:
+            continue
+        if not isinstance(vals, Mapping):
+            errors.append(f"tc.{stage}: expected a mapping, got {type(vals).__name__}")
+            continue
+        unknown = [k for k in vals if k not in REQUIRED_KEYS + OPTIONAL_KEYS]
+        if unknown:
+            errors.append(f"tc.{stage}: unknown key(s) {', '.join(map(str, unknown))}")
+        merged = dict(DEFAULT_PROFILE.get(name, {}), **vals)
+        missing = [k for k in REQUIRED_KEYS if not merged.get(k)]
+        if missing:
+            errors.append(f"tc.{stage}: missing {', '.join(missing)} (no default for this stage)")
+    return errors
+
+
+def merge_profile(overrides: Optional[Mapping[str, Mapping[str, Any]]]) -> Dict[str, Dict[str, Any]]:
+    errors = profile_errors(overrides)
+    if errors:
+        raise ValueError("; ".join(errors))
+    profile = {stage: dict(vals) for stage, vals in DEFAULT_PROFILE.items()}
+    for stage, vals in (overrides or {}).items():
+        profile.setdefault(str(stage).upper(), {}).update(vals or {})
+    return profile
+
 
 class TcManager:
-    def __init__(self, downstream: str, upstream: str):
+    def __init__(self, downstream: str, upstream: str, profile: Optional[Mapping[str, Mapping[str, Any]]] = None):
         self.downstream = downstream
         self.upstream = upstream
+        self.profile = merge_profile(profile)
+
+    def update_profile(self, profile: Optional[Mapping[str, Mapping[str, Any]]]) -> None:
+        self.profile = merge_profile(profile)
 
     def _run(self, args: list[str]) -> None:
         subprocess.run(["tc"] + args, check=False)
 
+    def commands(self, stage: Stage) -> List[List[str]]:
+        p = self.profile.get(stage.value)
+        if not p:
+            return []
+        netem = ["qdisc", "replace", "dev", self.downstream, "root", "handle", "1:", "netem", "delay", str(p["delay"])]
+        if p.get("jitter"):
+            netem.append(str(p["jitter"]))
+        if p.get("distribution"):
+            netem += ["distribution", str(p["distribution"])]
+        if p.get("loss"):
+            netem += ["loss", str(p["loss"])]
+        tbf = ["qdisc", "replace", "dev", self.upstream, "root", "handle", "2:", "tbf", "rate", str(p["rate"]), "burst", str(p["burst"]), "latency", str(p["latency"])]
+        return [netem, tbf]
+
+    def describe(self) -> str:
+        lines = []
+        for stage in (Stage.PROBE, Stage.DEGRADED, Stage.CONTAIN):
+            p = self.profile.get(stage.value, {})
+            extra = f" loss {p['loss']}" if p.get("loss") else ""
+            lines.append(f"{stage.value}: netem {p.get('delay')}/{p.get('jitter', '0ms')}{extra}; tbf {p.get('rate')}")
+        return "\n".join(lines)
+
+    @timed(_TC_HIST, _TC_HELP, op="apply")
     def apply(self, stage: Stage) -> None:
-        # Keep lightweight shaping; Pi Zero 2 W cannot handle heavy queuing
-        if stage == Stage.DEGRADED:
-            self._run(["qdisc", "replace", "dev", self.downstream, "root", "handle", "1:", "netem", "delay", "150ms", "50ms", "distribution", "normal"])
-            self._run(["qdisc", "replace", "dev", self.upstream, "root", "handle", "2:", "tbf", "rate", "2mbit", "burst", "32kbit", "latency", "400ms"])
-        elif stage == Stage.PROBE:
-            self._run(["qdisc", "replace", "dev", self.downstream, "root", "handle", "1:", "netem", "delay", "220ms", "100ms"])
-            self._run(["qdisc", "replace", "dev", self.upstream, "root", "handle", "2:", "tbf", "rate", "1mbit", "burst", "16kbit", "latency", "400ms"])
-        elif stage == Stage.CONTAIN:
-            self._run(["qdisc", "replace", "dev", self.downstream, "root", "handle", "1:", "netem", "delay", "400ms", "200ms", "loss", "5%"])
-            self._run(["qdisc", "replace", "dev", self.upstream, "root", "handle", "2:", "tbf", "rate", "512kbit", "burst", "8kbit", "latency", "600ms"])
-        else:
+        cmds = self.commands(stage)
+        if not cmds:
             self.clear()
+            return
+        for args in cmds:
+            self._run(args)
 
+    @timed(_TC_HIST, _TC_HELP, op="clear")
     def clear(self) -> None:
         self._run(["qdisc", "del", "dev", self.downstream, "root"])
         self._run(["qdisc", "del", "dev", self.upstream, "root"])
@@ -0,0 +1,188 @@
+# azazel_zero/sensors/dhcp_leases.py
+"""Incremental dnsmasq lease table.
+
+dnsmasq rewrites its leases file in place (rewind, truncate, write; the
+file stays open) on every grant, renewal and release. LeaseTracker watches
+the directory with inotify for modifications, and for creates/renames in
+case another tool replaces the file, and re-parses only after such an
+event; without inotify it falls back to one stat() per refresh. Expired
+leases are filtered out, so a laptop that left an hour ago is no longer
+shown as the connected client.
+"""
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+LEASE_PATHS = ("/var/lib/misc/dnsmasq.leases", "/var/lib/dnsmasq/dnsmasq.leases")
+
+_IN_MODIFY = 0x002
+_IN_CLOSE_WRITE = 0x008
+_IN_MOVED_TO = 0x080
+_IN_CREATE = 0x100
+_IN_DELETE = 0x200
+_IN_Q_OVERFLOW = 0x4000
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+_EVENT = struct.Struct("iIII")
+
+
+def default_leases_path() -> str:
+    for p in LEASE_PATHS:
+        if os.path.exists(p):
+            return p
+    return LEASE_PATHS[0]
+
+
+class Lease:
+    __slots__ = ("mac", "ip", "hostname", "expiry", "client_id")
+
+    def __init__(self, mac: str, ip: str, hostname: str, expiry: int, client_id: str = ""):
+        self.mac = mac
+        self.ip = ip
+        self.hostname = hostname
+        self.expiry = expiry  # epoch seconds; 0 = infinite lease
+        self.client_id = client_id
+
+    def active(self, now: float) -> bool:
+        return self.expiry == 0 or self.expiry > now
+
+    def as_dict(self) -> Dict[str, object]:
+        # Absolute expiry only, so snapshots built from it stay stable between renewals.
+        return {"mac": self.mac, "ip": self.ip, "hostname": self.hostname, "expiry": self.expiry}
+
+
+def parse_leases(text: str) -> Dict[str, Lease]:
+    """Parse dnsmasq's "<expiry> <mac> <ip> <hostname|*> <client-id|*>" lines (IPv4 only)."""
+    table: Dict[str, Lease] = {}
+    for line in text.splitlines():
+        parts = line.split()
+        if len(parts) < 3 or parts[0] == "duid" or ":" in parts[2]:
+            continue
+        try:
+            expiry = int(parts[0])
+        except ValueError:
+            continue
+        mac = parts[1].lower()
+        hostname = parts[3] if len(parts) > 3 and parts[3] != "*" else ""
+        client_id = parts[4] if len(parts) > 4 and parts[4] != "*" else ""
+        table[mac] = Lease(mac, parts[2], hostname, expiry, client_id)
+    return table
+
+
+class _Inotify:
+    def __init__(self, directory: str):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        mask = _IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE
+        if libc.inotify_add_watch(fd, directory.encode(), mask) < 0:
+            err = ctypes.get_errno()
+            os.close(fd)
+            raise OSError(err, f"inotify_add_watch {directory} failed")
+        self.fd = fd
+
+    def names(self) -> List[str]:
+        """Drain pending events and return the file names they refer to.
+
+        A queue overflow is returned as "*": events were lost, so any file
+        may have changed.
+        """
+        out: List[str] = []
+        while True:
+            try:
+                buf = os.read(self.fd, 4096)
+            except BlockingIOError:
+                return out
+            if not buf:
+                return out
+            pos = 0
+            while pos + _EVENT.size <= len(buf):
+                _, mask, _, length = _EVENT.unpack_from(buf, pos)
+                name = buf[pos + _EVENT.size : pos + _EVENT.size + length].rstrip(b"\0")
+                out.append("*" if mask & _IN_Q_OVERFLOW else name.decode("utf-8", "replace"))
+                pos += _EVENT.size + length
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class LeaseTracker:
+    """MAC-indexed view of the active DHCP leases, refreshed only on change."""
+
+    def __init__(self, path: str = ""):
+        self.path = Path(path or default_leases_path())
+        self.leases: Dict[str, Lease] = {}
+        self._by_ip: Dict[str, str] = {}
+        self._sig: Optional[Tuple[int, int, int]] = None
+        self._inotify: Optional[_Inotify] = None
+        try:
+            self._inotify = _Inotify(str(self.path.parent))
+        except (OSError, AttributeError):
+            self._inotify = None  # not Linux / dir missing: stat polling
+        self._load()
+
+    def _signature(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            st = self.path.stat()
+        except OSError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def _load(self) -> None:
+        self._sig = self._signature()
+        try:
+            text = self.path.read_text(errors="replace")
+        except OSError:
+            text = ""
+        self.leases = parse_leases(text)
+        self._by_ip = {lease.ip: mac for mac, lease in self.leases.items()}
+
+    def refresh(self) -> bool:
+        """Re-parse if the file changed since the last call; return True if it did."""
+        if self._inotify is not None:
+            names = self._inotify.names()
+            if self.path.name not in names and "*" not in names:
+                return False
+        elif self._signature() == self._sig:
+            return False
+        self._load()
+        return True
+
+    def wait(self, timeout: float) -> bool:
+        """Block up to timeout for a change (for a dedicated thread), then refresh."""
+        if self._inotify is not None:
+            select.select([self._inotify.fd], [], [], timeout)
+        else:
+            time.sleep(timeout)
+        return self.refresh()
+
+    def active(self, now: Optional[float] = None) -> List[Lease]:
+        """Active leases, most recently granted/renewed first."""
+        now = time.time() if now is None else now
+        live = [lease for lease in self.leases.values() if lease.active(now)]
+        live.sort(key=lambda lease: lease.expiry or float("inf"), reverse=True)
+        return live
+
+    def latest(self, now: Optional[float] = None) -> Optional[Lease]:
+        live = self.active(now)
+        return live[0] if live else None
+
+    def by_mac(self, mac: str) -> Optional[Lease]:
+        return self.leases.get(mac.lower())
+
+    def by_ip(self, ip: str) -> Optional[Lease]:
+        mac = self._by_ip.get(ip)
+        return self.leases.get(mac) if mac else None
+
+    def close(self) -> None:
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
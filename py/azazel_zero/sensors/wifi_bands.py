@@ -0,0 +1,60 @@
+# azazel_zero/sensors/wifi_bands.py
+"""Wi-Fi frequency -> (band, channel) lookup.
+
+The table is built once at import from the IEEE 802.11 channel plans, so
+every scan entry and link read is a single dict lookup instead of a chain
+of range checks (which also got 6 GHz wrong: 5955 MHz is 6 GHz channel 1,
+not 5 GHz channel 191).
+"""
+from __future__ import annotations
+
+from typing import Dict, Optional, Tuple
+
+BAND_2G = "2.4"
+BAND_5G = "5"
+BAND_6G = "6"
+BAND_60G = "60"
+
+# Display/sort order, lowest band first.
+BANDS = (BAND_2G, BAND_5G, BAND_6G, BAND_60G)
+
+
+def _build() -> Dict[int, Tuple[str, int]]:
+    table: Dict[int, Tuple[str, int]] = {}
+    for ch in range(1, 14):
+        table[2407 + 5 * ch] = (BAND_2G, ch)
+    table[2484] = (BAND_2G, 14)
+    # 5 GHz: channel n is at 5000 + 5n MHz; 183-196 are the 4.9 GHz Japan plan.
+    for ch in range(32, 178):
+        table[5000 + 5 * ch] = (BAND_5G, ch)
+    for ch in range(183, 197):
+        table[4000 + 5 * ch] = (BAND_5G, ch)
+    # 6 GHz: 20 MHz primaries 1, 5, ... 233 at 5950 + 5n MHz, plus channel 2 at 5935.
+    for ch in range(1, 234, 4):
+        table[5950 + 5 * ch] = (BAND_6G, ch)
+    table[5935] = (BAND_6G, 2)
+    # 60 GHz (802.11ad/ay)
+    for ch in range(1, 7):
+        table[58320 + 2160 * (ch - 1)] = (BAND_60G, ch)
+    return table
+
+
+FREQ_TABLE: Dict[int, Tuple[str, int]] = _build()
+
+
+def band_channel(freq: Optional[float]) -> Optional[Tuple[str, int]]:
+    """(band, channel) for a centre frequency in MHz, or None if unknown."""
+    if not freq:
+        return None
+    return FREQ_TABLE.get(int(freq))
+
+
+def band_rank(band: Optional[str]) -> int:
+    return BANDS.index(band) if band in BANDS else len(BANDS)
+
+
+def band_label(band: Optional[str], channel: Optional[int] = None) -> str:
+    """Short display form: "5G ch36", "6G ch37", "" when unknown."""
+    if not band:
+        return ""
+    return f"{band}G ch{channel}" if channel else f"{band}G"
@@ -1,9 +1,14 @@
 # azazel_zero/sensors/wifi_safety.py
 from __future__ import annotations
-from typing import Dict, Any, List, Optional, Tuple
+from typing import TYPE_CHECKING, Dict, Any, List, Optional, Tuple
 import json, subprocess, time, re, shutil
 from pathlib import Path
 
+from .wifi_bands import band_channel
+
+if TYPE_CHECKING:
+    from .wifi_scan import ScanCache
+
 _MAC_RE = re.compile(r"([0-9a-f]{2}:){5}[0-9a-f]{2}", re.I)
 
 def _run(cmd: List[str], timeout: float = 2.5) -> str:
@@ -15,6 +20,7 @@ def get_link_state(iface: str) -> Dict[str, str]:
     out = _run(["iw", "dev", iface, "link"])
     bssid = ""
     ssid = ""
+    freq = ""
     if "Not connected" in out:
         return {"connected": "0"}
     for line in out.splitlines():
@@ -24,7 +30,13 @@ def get_link_state(iface: str) -> Dict[str, str]:
             if m: bssid = m.group(0).lower()
         elif line.startswith("SSID:"):
             ssid = line.split("SSID:", 1)[1].strip()
-    return {"connected": "1", "ssid": ssid, "bssid": bssid}
+        elif line.startswith("freq:"):
+            freq = line.split("freq:", 1)[1].strip().split(".")[0]
+    link = {"connected": "1", "ssid": ssid, "bssid": bssid}
+    bc = band_channel(int(freq)) if freq.isdigit() else None
+    if bc:
+        link.update(freq=freq, band=bc[0], channel=str(bc[1]))
+    return link
 
 def load_known_db(path: str) -> Dict[str, Any]:
     if not path:
@@ -52,6 +64,42 @@ def check_ap_fingerprint(link: Dict[str, str], known_db: Dict[str, Any]) -> List
         tags.append("evil_ap")  # known SSID but unexpected BSSID
     return tags
 
+# (ssid, bssid) -> when it was last louder_new evidence. Tags add suspicion on
+# every step they are present, so this weak hint is tagged once per pair;
+# otherwise an ordinary new mesh AP reached CONTAIN within its "new" window.
+# Pairs not seen as evidence for TWIN_REPORT_TTL can be tagged again.
+TWIN_REPORT_TTL = 600.0
+_twin_reported: Dict[Tuple[str, str], float] = {}
+
+def _first_report(ssid: str, bssids: List[str], now: float) -> bool:
+    fresh = False
+    for bssid in bssids:
+        fresh = fresh or (ssid, bssid) not in _twin_reported
+        _twin_reported[(ssid, bssid)] = now
+    return fresh
+
+def check_evil_twin(
+    link: Dict[str, str], scan: Optional["ScanCache"], now: Optional[float] = None
+) -> Tuple[List[str], Dict[str, Any]]:
+    # Uses the background scan history: the same SSID advertised both open and
+    # protected is a classic twin (evil_ap); a BSSID for our SSID that appeared
+    # after the table settled and is at least as loud as ours is a weaker hint.
+    # evil_ap is tagged while the mismatch lasts (like check_ap_fingerprint);
+    # evil_twin only for newly seen pairs. The evidence is always returned.
+    if scan is None or link.get("connected") != "1" or not link.get("ssid"):
+        return [], {}
+    now = time.time() if now is None else now
+    for key in [k for k, ts in _twin_reported.items() if now - ts > TWIN_REPORT_TTL]:
+        del _twin_reported[key]
+    ssid = link["ssid"]
+    ev = scan.evidence(ssid, link.get("bssid") or "")
+    tags: List[str] = []
+    if ev["security_mismatch"]:
+        tags.append("evil_ap")
+    elif _first_report(ssid, ev["louder_new"], now):
+        tags.append("evil_twin")
+    return tags, ev
+
 def tcpdump_watch(iface: str, duration_sec: int = 3) -> str:
     # Capture minimal: ARP + DHCP + DNS
     if shutil.which("tcpdump") is None:
@@ -119,11 +167,15 @@ def detect_dns_anomaly(tcpdump_text: str) -> List[str]:
         tags.append("dns_spoof")
     return tags
 
-def evaluate_wifi_safety(iface: str, known_db_path: str, gateway_ip: Optional[str]) -> Tuple[List[str], Dict[str, Any]]:
+def evaluate_wifi_safety(
+    iface: str, known_db_path: str, gateway_ip: Optional[str], scan: Optional["ScanCache"] = None
+) -> Tuple[List[str], Dict[str, Any]]:
     known_db = load_known_db(known_db_path)
     link = get_link_state(iface)
     tags = []
     tags.extend(check_ap_fingerprint(link, known_db))
+    twin_tags, twin = check_evil_twin(link, scan)
+    tags.extend(twin_tags)
 
     cap = tcpdump_watch(iface, duration_sec=3)
     tags.extend(detect_arp_spoof(cap, gateway_ip))
@@ -133,4 +185,6 @@ def evaluate_wifi_safety(iface: str, known_db_path: str, gateway_ip: Optional[st
     # de-dup
     uniq = sorted(set(tags))
     meta = {"link": link, "capture_len": len(cap)}
+    if twin:
+        meta["twin"] = twin
     return uniq, meta
@@ -0,0 +1,433 @@
+# azazel_zero/sensors/wifi_scan.py
+"""Background Wi-Fi scanning with a rolling per-BSSID history.
+
+`iw dev <if> scan` blocks for 2-5 s, so callers should not run it inline.
+ScanCache runs it on a thread and folds every result into a ScanTable that
+keeps *all* BSSIDs (not just the strongest per SSID) with a short signal
+history. The selector UI renders from the table immediately; wifi_safety
+uses the per-SSID BSSID multiplicity and signal trends as evil-twin
+evidence.
+"""
+from __future__ import annotations
+
+import shutil
+import subprocess
+import threading
+import time
+from collections import deque
+from typing import Any, Collection, Deque, Dict, List, Optional, Tuple
+
+from .wifi_bands import band_channel, band_rank
+
+IW = shutil.which("iw") or "/sbin/iw"
+
+class ScanEntry:
+    """One BSS from `iw scan` output."""
+
+    __slots__ = ("bssid", "ssid", "freq", "band", "chan", "signal", "seen_ms", "rsn", "wpa", "akm", "pairwise")
+
+    def __init__(self, bssid: str):
+        self.bssid = bssid
+        self.ssid = ""
+        self.freq: Optional[int] = None
+        self.band = ""
+        self.chan: Optional[int] = None
+        self.signal: Optional[float] = None
+        self.seen_ms: Optional[int] = None  # "last seen: N ms" (age of the observation)
+        self.rsn = False
+        self.wpa = False
+        self.akm: Tuple[str, ...] = ()  # RSN and WPA authentication suites, iw names
+        self.pairwise: Tuple[str, ...] = ()
+
+    @property
+    def wpa3(self) -> bool:
+        return has_sae(self.akm)
+
+    def as_dict(self) -> Dict[str, Any]:
+        d = {name: getattr(self, name) for name in self.__slots__}
+        d["wpa3"] = self.wpa3
+        return d
+
+
+def _suites(value: str) -> Tuple[str, ...]:
+    # iw prints suites space-separated, but "IEEE 802.1X" (and its
+    # FT/.../SHA variants) contain a space themselves.
+    out: List[str] = []
+    toks = value.split()
+    i = 0
+    while i < len(toks):
+        tok = toks[i]
+        if tok.endswith("IEEE") and i + 1 < len(toks):
+            tok = tok + " " + toks[i + 1]
+            i += 1
+        out.append(tok)
+        i += 1
+    return tuple(out)
+
+
+def parse_scan(text: str) -> List[ScanEntry]:
+    """Parse `iw dev <if> scan [dump]` output in a single pass.
+
+    Each line is stripped once and dispatched on its leading key; RSN/WPA
+    sub-items ("* Authentication suites: ...") are only looked at while
+    inside those blocks.
+    """
+    nets: List[ScanEntry] = []
+    cur: Optional[ScanEntry] = None
+    block = 0  # 1 = inside RSN:, 2 = inside WPA:
+    for line in text.split("\n"):
+        if line.startswith("BSS "):
+            cur = ScanEntry(line[4:21].lower())
+            nets.append(cur)
+            block = 0
+            continue
+        if cur is None:
+            continue
+        item = line.lstrip()
+        if item.startswith("* "):
+            if not block:
+                continue
+            key, _, value = item[2:].partition(":")
+            if key == "Authentication suites":
+                cur.akm = tuple(dict.fromkeys(cur.akm + _suites(value)))
+            elif key == "Pairwise ciphers":
+                cur.pairwise = tuple(dict.fromkeys(cur.pairwise + tuple(value.split())))
+            continue
+        key, _, value = item.partition(":")
+        # A new top-level key ends any RSN/WPA block.
+        block = 0
+        if key == "signal":
+            # e.g. "signal: -51.00 dBm"
+            try:
+                cur.signal = float(value.split()[0])
+            except (ValueError, IndexError):
+                pass
+        elif key == "freq":
+            try:
+                cur.freq = int(float(value))
+            except ValueError:
+                pass
+            else:
+                bc = band_channel(cur.freq)
+                if bc:
+                    cur.band, cur.chan = bc
+        elif key == "SSID":
+            cur.ssid = value.strip()
+        elif key == "last seen":
+            # e.g. "last seen: 320 ms ago" / "last seen: 320 ms [boottime]"
+            try:
+                cur.seen_ms = int(value.split()[0])
+            except (ValueError, IndexError):
+                pass
+        elif key == "RSN":
+            cur.rsn = True
+            block = 1
+        elif key == "WPA":
+            cur.wpa = True
+            block = 2
+    return nets
+
+
+def has_sae(akm: Tuple[str, ...]) -> bool:
+    return any("SAE" in a for a in akm)
+
+
+def security_label(rsn: bool, wpa: bool, akm: Tuple[str, ...] = ()) -> str:
+    """Short label from the advertised AKM suites (OPEN, OWE, WPA3, WPA3/WPA2, WPA2, WPA2-EAP, ...)."""
+    if not (rsn or wpa):
+        return "OPEN"
+    if "OWE" in akm:
+        return "OWE"
+    if any("802.1X" in a for a in akm):
+        return "WPA3-EAP" if any("SUITE-B" in a for a in akm) else "WPA2-EAP"
+    if has_sae(akm):
+        return "WPA3/WPA2" if any(a.endswith("PSK") or a == "PSK/SHA-256" for a in akm) else "WPA3"
+    if rsn and wpa:
+        return "WPA2/WPA"
+    return "WPA2" if rsn else "WPA"
+
+
+def sec_label(n: Dict[str, Any]) -> str:
+    # 表示用のセキュリティ簡易判定
+    return security_label(n["rsn"], n["wpa"], tuple(n.get("akm") or ()))
+
+
+class BssRecord:
+    """Everything known about one BSSID, with a bounded signal history."""
+
+    __slots__ = ("bssid", "ssid", "freq", "band", "chan", "rsn", "wpa", "akm", "first_seen", "last_seen", "samples")
+
+    def __init__(self, bssid: str, max_samples: int = 32):
+        self.bssid = bssid
+        self.ssid = ""
+        self.freq: Optional[int] = None
+        self.band = ""
+        self.chan: Optional[int] = None
+        self.rsn = False
+        self.wpa = False
+        self.akm: Tuple[str, ...] = ()
+        self.first_seen = 0.0
+        self.last_seen = 0.0
+        self.samples: Deque[Tuple[float, float]] = deque(maxlen=max_samples)  # (seen, dBm)
+
+    def update(self, net: ScanEntry, seen: float) -> bool:
+        """Fold one scan entry in; False if it is the same observation again."""
+        if self.last_seen and seen <= self.last_seen + 0.5:
+            return False  # scan dump re-reporting a cached result
+        if not self.first_seen:
+            self.first_seen = seen
+        self.last_seen = seen
+        self.ssid = net.ssid or self.ssid
+        self.freq = net.freq or self.freq
+        self.band = net.band or self.band
+        self.chan = net.chan or self.chan
+        self.rsn = net.rsn
+        self.wpa = net.wpa
+        self.akm = net.akm
+        if net.signal is not None:
+            self.samples.append((seen, net.signal))
+        return True
+
+    @property
+    def signal(self) -> Optional[float]:
+        return self.samples[-1][1] if self.samples else None
+
+    @property
+    def protected(self) -> bool:
+        return self.rsn or self.wpa
+
+    @property
+    def wpa3(self) -> bool:
+        return has_sae(self.akm)
+
+    def trend(self, window: float = 120.0) -> Optional[float]:
+        """Least-squares signal slope in dB per minute over the last window seconds."""
+        if not self.samples:
+            return None
+        since = self.samples[-1][0] - window
+        pts = [(t, s) for t, s in self.samples if t >= since]
+        if len(pts) < 3:
+            return None
+        n = len(pts)
+        mt = sum(t for t, _ in pts) / n
+        ms = sum(s for _, s in pts) / n
+        var = sum((t - mt) ** 2 for t, _ in pts)
+        if var <= 0:
+            return None
+        return sum((t - mt) * (s - ms) for t, s in pts) / var * 60.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        # ScanEntry fields the UI uses, plus history fields.
+        return {
+            "bssid": self.bssid,
+            "ssid": self.ssid,
+            "freq": self.freq,
+            "band": self.band,
+            "chan": self.chan,
+            "signal": self.signal,
+            "rsn": self.rsn,
+            "wpa": self.wpa,
+            "wpa3": self.wpa3,
+            "akm": list(self.akm),
+            "first_seen": self.first_seen,
+            "last_seen": self.last_seen,
+            "trend": self.trend(),
+        }
+
+
+class ScanTable:
+    """Rolling table of every BSSID seen in the last history_sec seconds."""
+
+    def __init__(self, history_sec: float = 600.0, max_samples: int = 32):
+        self.history_sec = history_sec
+        self.max_samples = max_samples
+        self.records: Dict[str, BssRecord] = {}
+
+    def ingest(self, nets: List[ScanEntry], now: Optional[float] = None) -> int:
+        """Add parse_scan() results; return how many carried a new observation."""
+        now = time.time() if now is None else now
+        fresh = 0
+        for net in nets:
+            rec = self.records.get(net.bssid)
+            if rec is None:
+                rec = self.records[net.bssid] = BssRecord(net.bssid, self.max_samples)
+            seen = now - (net.seen_ms or 0) / 1000.0
+            if rec.update(net, seen):
+                fresh += 1
+        self.expire(now)
+        return fresh
+
+    def expire(self, now: float) -> None:
+        cutoff = now - self.history_sec
+        for bssid in [b for b, r in self.records.items() if r.last_seen < cutoff]:
+            del self.records[bssid]
+
+    def by_ssid(self) -> Dict[str, List[BssRecord]]:
+        groups: Dict[str, List[BssRecord]] = {}
+        for rec in self.records.values():
+            if rec.ssid:
+                groups.setdefault(rec.ssid, []).append(rec)
+        return groups
+
+    def networks(
+        self,
+        max_age: Optional[float] = None,
+        now: Optional[float] = None,
+        bands: Optional[Collection[str]] = None,
+        by_band: bool = False,
+    ) -> List[Dict[str, Any]]:
+        """Strongest BSSID per SSID (hidden SSIDs per BSSID), strongest first.
+
+        bands limits the result to those bands (records outside them are
+        skipped before any grouping); by_band sorts lowest band first, then
+        by signal. Each entry also carries "bssid_count" and "bands" for its
+        SSID within the selection.
+        """
+        now = time.time() if now is None else now
+        best: Dict[str, Tuple[BssRecord, int]] = {}
+        seen_bands: Dict[str, set] = {}
+        for rec in self.records.values():
+            if bands is not None and rec.band not in bands:
+                continue
+            if max_age is not None and now - rec.last_seen > max_age:
+                continue
+            key = rec.ssid or f"<hidden:{rec.bssid}>"
+            if rec.band:
+                seen_bands.setdefault(key, set()).add(rec.band)
+            prev = best.get(key)
+            count = prev[1] + 1 if prev else 1
+            if prev is None or (rec.signal is not None and (prev[0].signal is None or rec.signal > prev[0].signal)):
+                best[key] = (rec, count)
+            else:
+                best[key] = (prev[0], count)
+        out = []
+        for key, (rec, count) in best.items():
+            d = rec.as_dict()
+            d["bssid_count"] = count
+            d["bands"] = sorted(seen_bands.get(key, ()), key=band_rank)
+            out.append(d)
+        if by_band:
+            out.sort(key=lambda x: (band_rank(x["band"]), -(x["signal"] if x["signal"] is not None else -9999)))
+        else:
+            out.sort(key=lambda x: x["signal"] if x["signal"] is not None else -9999, reverse=True)
+        return out
+
+    def evidence(self, ssid: str, bssid: str, new_within: float = 120.0, now: Optional[float] = None) -> Dict[str, Any]:
+        """Evil-twin indicators for the SSID we are associated with.
+
+        - security_mismatch: the SSID is advertised both open and protected
+        - mismatched_bssids: BSSIDs whose protection differs from ours (the
+          open ones when ours is not in the table)
+        - new_bssids: BSSIDs that appeared within new_within seconds while
+          the SSID already had older ones (ignored while the table is young)
+        - louder_new: new BSSIDs at least as strong as the one we use
+        - sae_mismatch: some protected BSSIDs offer SAE (WPA3) and others do
+          not, as a WPA3-to-WPA2 downgrade twin would (also seen in mixed
+          deployments, so it is reported but not tagged)
+        """
+        now = time.time() if now is None else now
+        recs = [r for r in self.records.values() if r.ssid == ssid]
+        cur = self.records.get(bssid.lower()) if bssid else None
+        established = [r for r in recs if now - r.first_seen > new_within]
+        new = [r for r in recs if now - r.first_seen <= new_within] if established else []
+        cur_sig = cur.signal if cur else None
+        louder = [
+            r.bssid
+            for r in new
+            if r is not cur and r.signal is not None and (cur_sig is None or r.signal >= cur_sig)
+        ]
+        mismatch = len({r.protected for r in recs}) > 1
+        ours = cur.protected if cur else True
+        return {
+            "bssids": len(recs),
+            "security_mismatch": mismatch,
+            "mismatched_bssids": [r.bssid for r in recs if r.protected != ours] if mismatch else [],
+            "sae_mismatch": len({r.wpa3 for r in recs if r.protected}) > 1,
+            "new_bssids": [r.bssid for r in new if r is not cur],
+            "louder_new": louder,
+            "trends": {r.bssid: round(t, 1) for r in recs for t in [r.trend()] if t is not None},
+        }
+
+
+class ScanCache:
+    """Scan on a background thread and keep a ScanTable current.
+
+    trigger=True runs a real scan (root, radio off-channel for a few
+    seconds); trigger=False only reads the kernel's cached results
+    (`scan dump`), which is cheap enough for a connected uplink.
+    """
+
+    def __init__(self, iface: str, interval: float = 15.0, trigger: bool = True, history_sec: float = 600.0):
+        self.iface = iface
+        self.interval = interval
+        self.trigger = trigger
+        self.table = ScanTable(history_sec)
+        self.version = 0
+        self.last_error = ""
+        self.scanning = False
+        self._cond = threading.Condition()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "ScanCache":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name=f"wifi-scan-{self.iface}", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+
+    def rescan(self) -> None:
+        """Scan now instead of waiting for the next interval."""
+        self._wake.set()
+
+    def _scan_once(self) -> Tuple[Optional[str], str]:
+        """Return (iw output or None, error text)."""
+        argv = [IW, "dev", self.iface, "scan"]
+        error = ""
+        if self.trigger:
+            p = subprocess.run(argv, capture_output=True, text=True, timeout=30, check=False)
+            if p.returncode == 0:
+                return p.stdout, ""
+            # EBUSY (wpa_supplicant is scanning) or no root: use cached results.
+            error = p.stderr.strip() or "iw scan failed"
+        p = subprocess.run(argv + ["dump"], capture_output=True, text=True, timeout=10, check=False)
+        if p.returncode != 0:
+            return None, error or p.stderr.strip() or "iw scan dump failed"
+        return p.stdout, error
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.clear()
+            self.scanning = True
+            try:
+                text, error = self._scan_once()
+            except (OSError, subprocess.SubprocessError) as exc:
+                text, error = None, str(exc)
+            self.scanning = False
+            with self._cond:
+                if text is not None:
+                    self.table.ingest(parse_scan(text))
+                self.last_error = error
+                self.version += 1
+                self._cond.notify_all()
+            self._wake.wait(self.interval)
+
+    def wait_update(self, seen_version: int, timeout: float) -> int:
+        """Block until version moves past seen_version (or timeout); return it."""
+        with self._cond:
+            self._cond.wait_for(lambda: self.version != seen_version, timeout)
+            return self.version
+
+    def networks(
+        self, max_age: Optional[float] = None, bands: Optional[Collection[str]] = None, by_band: bool = False
+    ) -> List[Dict[str, Any]]:
+        with self._cond:
+            return self.table.networks(max_age, bands=bands, by_band=by_band)
+
+    def evidence(self, ssid: str, bssid: str) -> Dict[str, Any]:
+        with self._cond:
+            return self.table.evidence(ssid, bssid)
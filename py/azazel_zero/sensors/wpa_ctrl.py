@@ -0,0 +1,265 @@
+# azazel_zero/sensors/wpa_ctrl.py
+"""wpa_supplicant control-interface client (the protocol wpa_cli speaks).
+
+Requests go over a datagram socket to /var/run/wpa_supplicant/<iface>; a
+second socket is ATTACHed for unsolicited events, so an association result
+(CTRL-EVENT-CONNECTED, ASSOC-REJECT, WRONG_KEY) arrives as it happens
+instead of being polled with `wpa_cli status`, and nothing is forked.
+"""
+from __future__ import annotations
+
+import itertools
+import os
+import select
+import socket
+import tempfile
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+CTRL_DIRS = ("/var/run/wpa_supplicant", "/run/wpa_supplicant")
+
+EV_CONNECTED = "CTRL-EVENT-CONNECTED"
+EV_DISCONNECTED = "CTRL-EVENT-DISCONNECTED"
+EV_ASSOC_REJECT = "CTRL-EVENT-ASSOC-REJECT"
+EV_AUTH_REJECT = "CTRL-EVENT-AUTH-REJECT"
+EV_TEMP_DISABLED = "CTRL-EVENT-SSID-TEMP-DISABLED"
+EV_NOT_FOUND = "CTRL-EVENT-NETWORK-NOT-FOUND"
+
+_REJECTS = {EV_ASSOC_REJECT: "assoc-reject", EV_AUTH_REJECT: "auth-reject"}
+
+_counter = itertools.count()
+
+
+class WpaCtrlError(OSError):
+    """The control socket is missing, timed out or a command returned FAIL."""
+
+
+def ctrl_path(iface: str, ctrl_dir: Optional[str] = None) -> str:
+    if ctrl_dir:
+        return os.path.join(ctrl_dir, iface)
+    for d in CTRL_DIRS:
+        p = os.path.join(d, iface)
+        if os.path.exists(p):
+            return p
+    return os.path.join(CTRL_DIRS[0], iface)
+
+
+def quote_ssid(ssid: str) -> str:
+    """SSID argument for SET_NETWORK: quoted when plain ASCII, hex otherwise."""
+    if ssid.isascii() and ssid.isprintable() and '"' not in ssid:
+        return f'"{ssid}"'
+    return ssid.encode("utf-8").hex()
+
+
+def _parse_event(msg: str) -> Tuple[str, str]:
+    # "<3>CTRL-EVENT-CONNECTED - Connection to ..." -> ("CTRL-EVENT-CONNECTED", full text)
+    if msg.startswith("<") and ">" in msg[:4]:
+        msg = msg.split(">", 1)[1]
+    return msg.split(" ", 1)[0], msg
+
+
+class _Channel:
+    """One bound client socket talking to the supplicant's control socket."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.local = os.path.join(tempfile.gettempdir(), f"wpa_ctrl_{os.getpid()}-{next(_counter)}")
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM | socket.SOCK_CLOEXEC)
+        try:
+            if os.path.exists(self.local):
+                os.unlink(self.local)
+            # wpa_supplicant replies to the sender's address, so it must be bound.
+            self.sock.bind(self.local)
+            self.sock.connect(path)
+        except OSError as exc:
+            self.close()
+            raise WpaCtrlError(exc.errno, f"wpa_supplicant control socket {path}: {exc.strerror}") from None
+
+    def send(self, cmd: str) -> None:
+        try:
+            self.sock.send(cmd.encode("utf-8"))
+        except OSError as exc:
+            # e.g. ECONNREFUSED/ENOENT once wpa_supplicant restarted: this
+            # channel is dead and the caller has to reconnect.
+            raise WpaCtrlError(exc.errno, f"wpa_supplicant control socket {self.path}: {exc.strerror}") from None
+
+    def recv(self, timeout: float) -> Optional[str]:
+        try:
+            r, _, _ = select.select([self.sock], [], [], max(0.0, timeout))
+            if not r:
+                return None
+            return self.sock.recv(8192).decode("utf-8", "replace")
+        except OSError as exc:
+            raise WpaCtrlError(exc.errno, f"wpa_supplicant control socket {self.path}: {exc.strerror}") from None
+
+    def close(self) -> None:
+        self.sock.close()
+        try:
+            os.unlink(self.local)
+        except OSError:
+            pass
+
+
+class WpaCtrl:
+    """Persistent control connection for one interface.
+
+        with WpaCtrl("wlan0") as ctrl:
+            ctrl.attach()
+            nid = ctrl.add_network()
+            ...
+            ok, reason = ctrl.wait_connected(nid, timeout=10)
+    """
+
+    def __init__(self, iface: str, ctrl_dir: Optional[str] = None, timeout: float = 2.0):
+        self.iface = iface
+        self.path = ctrl_path(iface, ctrl_dir)
+        self.timeout = timeout
+        self._req = _Channel(self.path)
+        self._mon: Optional[_Channel] = None
+
+    def __enter__(self) -> "WpaCtrl":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    # ---------- requests ----------
+
+    def request(self, cmd: str) -> str:
+        self._req.send(cmd)
+        deadline = time.monotonic() + self.timeout
+        while True:
+            reply = self._req.recv(deadline - time.monotonic())
+            if reply is None:
+                raise WpaCtrlError(f"wpa_supplicant: no reply to {cmd.split()[0]}")
+            # An unsolicited event can land here if this socket was ever attached.
+            if not reply.startswith("<"):
+                return reply
+
+    def command(self, cmd: str) -> None:
+        reply = self.request(cmd).strip()
+        if reply != "OK":
+            raise WpaCtrlError(f"wpa_supplicant: {cmd.split()[0]} failed: {reply or 'empty reply'}")
+
+    def status(self) -> Dict[str, str]:
+        out: Dict[str, str] = {}
+        for line in self.request("STATUS").splitlines():
+            key, sep, value = line.partition("=")
+            if sep:
+                out[key] = value
+        return out
+
+    def list_networks(self) -> List[Dict[str, str]]:
+        rows = self.request("LIST_NETWORKS").splitlines()[1:]  # skip header
+        out = []
+        for line in rows:
+            cols = line.split("\t")
+            if len(cols) >= 2:
+                cols += [""] * (4 - len(cols))
+                out.append({"id": cols[0], "ssid": cols[1], "bssid": cols[2], "flags": cols[3]})
+        return out
+
+    def add_network(self) -> str:
+        nid = self.request("ADD_NETWORK").strip()
+        if not nid.isdigit():
+            raise WpaCtrlError(f"wpa_supplicant: ADD_NETWORK failed: {nid}")
+        return nid
+
+    def set_network(self, nid: str, key: str, value: str) -> None:
+        self.command(f"SET_NETWORK {nid} {key} {value}")
+
+    def get_network(self, nid: str, key: str) -> str:
+        reply = self.request(f"GET_NETWORK {nid} {key}").strip()
+        return "" if reply == "FAIL" else reply
+
+    def select_network(self, nid: str) -> None:
+        self.command(f"SELECT_NETWORK {nid}")
+
+    def enable_network(self, nid: str) -> None:
+        self.command(f"ENABLE_NETWORK {nid}")
+
+    def disable_network(self, nid: str) -> None:
+        self.command(f"DISABLE_NETWORK {nid}")
+
+    def remove_network(self, nid: str) -> None:
+        self.command(f"REMOVE_NETWORK {nid}")
+
+    def reassociate(self) -> None:
+        self.command("REASSOCIATE")
+
+    def save_config(self) -> None:
+        self.command("SAVE_CONFIG")
+
+    # ---------- events ----------
+
+    def attach(self) -> None:
+        """Open the event channel; events queue from here on."""
+        if self._mon is not None:
+            return
+        self._mon = _Channel(self.path)
+        self._mon.send("ATTACH")
+        reply = self._mon.recv(self.timeout)
+        if reply is None or reply.strip() != "OK":
+            self._mon.close()
+            self._mon = None
+            raise WpaCtrlError("wpa_supplicant: ATTACH failed")
+
+    def drain(self) -> None:
+        """Drop events already queued (e.g. before selecting a network)."""
+        while self._mon is not None and self._mon.recv(0) is not None:
+            pass
+
+    def next_event(self, timeout: float) -> Optional[Tuple[str, str]]:
+        """Return (event name, text) or None on timeout."""
+        if self._mon is None:
+            raise WpaCtrlError("wpa_supplicant: not attached")
+        deadline = time.monotonic() + timeout
+        while True:
+            msg = self._mon.recv(deadline - time.monotonic())
+            if msg is None:
+                return None
+            if msg.startswith("<"):
+                return _parse_event(msg)
+
+    def wait_event(self, names: Iterable[str], timeout: float) -> Optional[Tuple[str, str]]:
+        wanted = set(names)
+        deadline = time.monotonic() + timeout
+        while True:
+            ev = self.next_event(deadline - time.monotonic())
+            if ev is None or ev[0] in wanted:
+                return ev
+
+    def wait_connected(self, nid: str, timeout: float = 10.0) -> Tuple[bool, str]:
+        """Wait for the association started by SELECT_NETWORK nid.
+
+        Returns (True, "") on CTRL-EVENT-CONNECTED to that network, or
+        (False, reason) on rejection, wrong key or timeout. NETWORK-NOT-FOUND
+        keeps waiting, since the next scan may still find the AP.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            ev = self.next_event(deadline - time.monotonic())
+            if ev is None:
+                return False, "timeout"
+            name, text = ev
+            if name == EV_CONNECTED:
+                st = self.status()
+                # Match on the network id only: STATUS prints the SSID escaped
+                # (\xNN, \", \\), so it differs for the SSIDs quote_ssid hex-encodes.
+                if st.get("wpa_state") == "COMPLETED" and st.get("id") == nid:
+                    return True, ""
+            elif name == EV_TEMP_DISABLED:
+                if f"id={nid} " in text:
+                    return False, "WRONG_KEY" if "reason=WRONG_KEY" in text else "auth"
+            elif name in _REJECTS:
+                return False, _REJECTS[name]
+
+    def close(self) -> None:
+        if self._mon is not None:
+            try:
+                self._mon.send("DETACH")
+            except OSError:
+                pass
+            self._mon.close()
+            self._mon = None
+        self._req.close()
@@ -1,9 +1,11 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import os, re, subprocess, time, sys, argparse, traceback
-from PIL import Image, ImageDraw, ImageFont
-from typing import Optional, List, Tuple
+import os, re, subprocess, time, sys, argparse, traceback, inspect
+import hashlib, json, mmap, struct, tempfile, urllib.request
+from functools import lru_cache
+from PIL import Image, ImageChops, ImageDraw, ImageFont
+from typing import Dict, Optional, List, Tuple
 
 # === Config / Constants ===
 ASSET_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
@@ -26,6 +28,23 @@ WS_LIB  = "/opt/waveshare-epd/RaspberryPi_JetsonNano/python/lib"
 
 DEFAULT_IFACE = "wlan0"
 DEFAULT_TIMEOUT = 30
+# first-minute コントローラの status API（status モード用）
+STATUS_URL = os.getenv("AZA_STATUS_URL", "http://127.0.0.1:8081")
+# 反転帯で強調するステージ
+ALARM_STAGES = ("CONTAIN", "DECEPTION")
+
+# 部分更新を N 回続けたら 1 回フル更新して残像を掃く
+FULL_EVERY = int(os.getenv("EPD_FULL_EVERY", "10"))
+# 変化領域がパネル面積のこの割合以下なら gentle 指定なしでも部分更新にする
+PARTIAL_MAX_AREA = float(os.getenv("EPD_PARTIAL_MAX_AREA", "0.5"))
+
+# 起動アニメの描画済みフレーム（ドライバ形式の 1bit バッファ）の置き場所
+FRAME_CACHE_DIR = os.getenv("EPD_FRAME_CACHE", "/var/cache/azazel-epd")
+FRAME_MAGIC = b"AZEPDFR1"
+# magic, パネル幅, パネル高さ, フレーム数, 1フレームのバイト数
+FRAME_HEADER = struct.Struct("<8sHHHI")
+# 描画コードを変えたら上げる（古いキャッシュを無効にする）
+FRAME_CACHE_VERSION = 1
 
 def run_cmd(args: List[str], timeout: int = 5, capture_stderr: bool = False) -> str:
     try:
@@ -59,7 +78,9 @@ def wait_network(timeout_sec: int, iface: str) -> Tuple[str, str]:
         time.sleep(1.2)
     return get_ssid(), (get_ipv4(iface) or "0.0.0.0")
 
+@lru_cache(maxsize=8)
 def load_icon_1bit(path:str, target_h:int):
+    # 読み込み・リサイズ・二値化は一度だけ。返す画像は paste 元としてのみ使う（変更しない）
     icon = Image.open(path).convert("RGBA")
     w, h = icon.size
     new_w = max(1, int(w * (target_h / h)))
@@ -69,7 +90,8 @@ def load_icon_1bit(path:str, target_h:int):
     icon = icon.point(lambda p: 0 if p < 160 else 255, mode="1")
     return icon
 
-def pick_font(paths, size):
+@lru_cache(maxsize=16)
+def _load_font(paths: Tuple[str, ...], size: int):
     for p in paths:
         try:
             if os.path.exists(p):
@@ -78,18 +100,51 @@ def pick_font(paths, size):
             continue
     return ImageFont.load_default()
 
-def fit_text(draw, text, font, max_w):
+def pick_font(paths, size):
+    # 存在確認と TrueType 読み込みは (候補, サイズ) ごとに一度だけ
+    return _load_font(tuple(paths), size)
+
+def _measure(draw, font):
     tl = draw.textlength if hasattr(draw, "textlength") else (lambda s, font: draw.textsize(s, font=font)[0])
-    measure = (lambda s: tl(s, font)) if tl is not draw.textlength else (lambda s: tl(s, font=font))
+    return (lambda s: tl(s, font)) if tl is not draw.textlength else (lambda s: tl(s, font=font))
+
+def fit_text(draw, text, font, max_w):
+    measure = _measure(draw, font)
     if measure(text) <= max_w:
         return text
-    base = text
-    while base and measure(base + "…") > max_w:
-        base = base[:-1]
+    # 収まる最長の接頭辞を二分探索（1文字ずつ削ると長い SSID で数十回計測する）
+    lo, hi = 0, len(text) - 1
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if measure(text[:mid] + "…") <= max_w:
+            lo = mid
+        else:
+            hi = mid - 1
+    base = text[:lo]
     return base + ("…" if base else "")
 
+def wrap_text(draw, text, font, max_w, max_lines):
+    """単語単位で折り返し、max_lines を超える分は最終行に詰めて … で切る。"""
+    measure = _measure(draw, font)
+    words = text.split()
+    lines: List[str] = []
+    cur = ""
+    for i, word in enumerate(words):
+        cand = f"{cur} {word}" if cur else word
+        if not cur or measure(cand) <= max_w:
+            cur = cand
+            continue
+        lines.append(cur)
+        if len(lines) == max_lines - 1:
+            cur = " ".join(words[i:])
+            break
+        cur = word
+    if cur:
+        lines.append(cur)
+    return [fit_text(draw, ln, font, max_w) for ln in lines[:max_lines]]
+
 # ---------- EPD ----------
-def init_epd(debug=False):
+def init_epd(debug=False, init=True):
     for p in (WS_ROOT, WS_LIB):
         if p not in sys.path:
             sys.path.append(p)
@@ -105,7 +160,8 @@ def init_epd(debug=False):
                 traceback.print_exc()
             raise RuntimeError(f"EPD driver not found: {e}")
     epd = drv.EPD()
-    epd.init()
+    if init:
+        epd.init()
     return epd, bic
 
 def epd_dims(epd):
@@ -121,6 +177,7 @@ def epd_full_clear(epd, bicolor):
     try:
         # 一部実装では Clear がないため例外で分岐
         epd.init()
+        panel_reset(epd, cleared=True)
         try:
             epd.Clear(0xFF)
         except AttributeError:
@@ -137,38 +194,121 @@ def epd_full_clear(epd, bicolor):
         # ここで失敗しても致命ではない
         pass
 
-def show_on_epd(img, epd, bicolor, gentle: bool = False):
+class PanelState:
     """
-    gentle=True の場合、ドライバが部分更新APIを提供していればそれを使用して
-    反転（フルリフレッシュ）頻度を下げる。未対応なら通常表示にフォールバック。
+    パネルに最後に送った 1bit フレームと、直近フル更新からの部分更新回数。
+    ガラス上の表示はスリープ・再 init 後も残るので重複判定には使い続け、
+    部分更新の基準（コントローラ RAM）だけは再 init で無効扱いにする。
     """
+    __slots__ = ("last", "base_ok", "partials")
+
+    def __init__(self):
+        self.last: Optional[Image.Image] = None
+        self.base_ok = False
+        self.partials = 0
+
+_PANELS: Dict[int, PanelState] = {}
+
+def panel_state(epd) -> PanelState:
+    st = _PANELS.get(id(epd))
+    if st is None:
+        st = _PANELS[id(epd)] = PanelState()
+    return st
+
+def panel_reset(epd, cleared: bool = False):
+    """epd.init() 後に呼ぶ。cleared=True は全面クリア済み（表示内容も不明扱い）。"""
+    st = panel_state(epd)
+    st.base_ok = False
+    if cleared:
+        st.last = None
+        st.partials = 0
+
+def frame_changed(epd, img) -> bool:
+    last = panel_state(epd).last
+    return last is None or last.size != img.size or last.tobytes() != img.convert("1").tobytes()
+
+def _partial_api(epd):
     # 一部実装では displayPartial / display_Partial など表記ゆれがある
-    partial_api = None
     for name in ("displayPartial", "display_Partial", "DisplayPartial", "display_Fast"):
         if hasattr(epd, name):
-            partial_api = getattr(epd, name)
-            break
+            return getattr(epd, name)
+    return None
 
-    if gentle and partial_api:
-        try:
-            # bicolor デバイスでも多くの実装は単一バッファの部分更新を受け付ける
-            partial_api(epd.getbuffer(img))
-            return
-        except Exception:
-            # 失敗したら通常描画にフォールバック
-            pass
+def _is_windowed(api) -> bool:
+    # display_Partial(Image, Xstart, Ystart, Xend, Yend) 形式の窓指定 API か
+    try:
+        return len(inspect.signature(api).parameters) >= 5
+    except (TypeError, ValueError):
+        return False
+
+def _window_buffer(epd, img, bbox):
+    """
+    変化矩形をパネル本来の向きの座標に直し、X を 8px 境界に揃えて切り出す。
+    getbuffer() と同じく横長画像は 90° 回転して縦長パネルに合わせる。
+    """
+    pw = getattr(epd, "width", img.size[0]); ph = getattr(epd, "height", img.size[1])
+    l, t, r, b = bbox
+    if img.size == (pw, ph):
+        native = img
+    else:
+        native = img.rotate(90, expand=True)
+        w = img.size[0]
+        l, t, r, b = t, w - r, b, w - l
+    x0 = (l // 8) * 8
+    x1 = min(native.size[0], ((r + 7) // 8) * 8)
+    region = native.crop((x0, t, x1, b))
+    return bytearray(region.tobytes("raw")), (x0, t, x1, b)
+
+def show_on_epd(img, epd, bicolor, gentle: bool = False, force_full: bool = False) -> str:
+    """
+    最後に送ったフレームと比較して、同一なら何もしない（"skip"）。
+    変化があれば差分の外接矩形を求め、部分更新 API があり、前フレームが
+    パネル RAM に載っていて、gentle 指定または変化が小さい場合は部分更新
+    （窓指定 API なら変化矩形だけ）する（"partial"）。部分更新が FULL_EVERY
+    回続いた場合・force_full・未対応ドライバではフル更新する（"full"）。
+    """
+    img = img.convert("1")
+    st = panel_state(epd)
+    last = st.last if st.last is not None and st.last.size == img.size else None
+    bbox = ImageChops.logical_xor(last, img).getbbox() if last is not None else (0, 0) + img.size
+    if bbox is None and not force_full:
+        return "skip"
+
+    partial_api = _partial_api(epd)
+    if bbox is not None and partial_api and last is not None and st.base_ok and not force_full \
+            and st.partials < FULL_EVERY:
+        area = (bbox[2] - bbox[0]) * (bbox[3] - bbox[1])
+        if gentle or area <= PARTIAL_MAX_AREA * img.size[0] * img.size[1]:
+            try:
+                if _is_windowed(partial_api):
+                    buf, (x0, y0, x1, y1) = _window_buffer(epd, img, bbox)
+                    partial_api(buf, x0, y0, x1, y1)
+                else:
+                    # bicolor デバイスでも多くの実装は単一バッファの部分更新を受け付ける
+                    partial_api(epd.getbuffer(img))
+                st.last = img
+                st.partials += 1
+                return "partial"
+            except Exception:
+                # 失敗したら通常描画にフォールバック
+                pass
 
     if bicolor:
         red = Image.new("1", img.size, 255)
         epd.display(epd.getbuffer(img), epd.getbuffer(red))
     else:
-        epd.display(epd.getbuffer(img))
+        # 部分更新の基準画像も同時に書ける実装ならそちらでフル更新する
+        getattr(epd, "displayPartBaseImage", epd.display)(epd.getbuffer(img))
+    st.last = img
+    st.base_ok = True
+    st.partials = 0
+    return "full"
 
 # ---------- Drawing primitives ----------
-def draw_logo_panel(width, height, title_font, invert=True, subtitle: Optional[str] = None):
-    """
-    上2/3をロゴ領域にする。invert=True で反転背景に白抜き。
-    """
+# 静的なレイヤ（反転ロゴ帯、バー枠とラベル、情報パネルのタイトル帯）は
+# サイズ・フォントごとに一度だけ描き、各フレームはその copy() に動く部分だけ描く。
+@lru_cache(maxsize=8)
+def _logo_layer(width, height, title_font, invert=True):
     img = Image.new("1", (width, height), 255)
     d = ImageDraw.Draw(img)
     logo_h = (height * 2) // 3
@@ -177,28 +317,34 @@ def draw_logo_panel(width, height, title_font, invert=True, subtitle: Optional[s
     title = "Azazel-Zero"
     tw, th = d.textsize(title, font=title_font)
     d.text(((width - tw)//2, (logo_h - th)//2), title, font=title_font, fill=(255 if invert else 0))
+    return img
+
+def draw_logo_panel(width, height, title_font, invert=True, subtitle: Optional[str] = None):
+    """
+    上2/3をロゴ領域にする。invert=True で反転背景に白抜き。
+    """
+    img = _logo_layer(width, height, title_font, invert).copy()
     if subtitle:
+        d = ImageDraw.Draw(img)
+        logo_h = (height * 2) // 3
         mono = pick_font(MONO_FONT_CANDIDATES, 14)
         sub = fit_text(d, subtitle, mono, width - 12)
         sw, sh = d.textsize(sub, font=mono)
         d.text(((width - sw)//2, logo_h + ((height - logo_h - sh)//2)), sub, font=mono, fill=0)
     return img
 
-def draw_progress_frame(width, height, title_font, ratio:float, label:str):
-    """
-    上2/3反転ロゴ + 下1/3プログレスバー
-    """
-    img = draw_logo_panel(width, height, title_font, invert=True)
-    d = ImageDraw.Draw(img)
+def _progress_geometry(width, height):
     bar_top = (height * 2)//3 + 6
     bar_h   = max(10, height//12)
-    bar_left, bar_right = 8, width - 8
+    return bar_top, bar_h, 8, width - 8
+
+@lru_cache(maxsize=8)
+def _progress_layer(width, height, title_font, label:str):
+    img = _logo_layer(width, height, title_font, True).copy()
+    d = ImageDraw.Draw(img)
+    bar_top, bar_h, bar_left, bar_right = _progress_geometry(width, height)
     # 枠
     d.rectangle([bar_left, bar_top, bar_right, bar_top + bar_h], outline=0, width=1)
-    # 充填
-    fill_w = int((bar_right - bar_left - 2) * max(0.0, min(1.0, ratio)))
-    if fill_w > 0:
-        d.rectangle([bar_left+1, bar_top+1, bar_left+1 + fill_w, bar_top + bar_h -1], fill=0)
     # ラベル
     mono = pick_font(MONO_FONT_CANDIDATES, 14)
     txt = fit_text(d, label, mono, width - 16)
@@ -206,21 +352,147 @@ def draw_progress_frame(width, height, title_font, ratio:float, label:str):
     d.text(((width - tw)//2, bar_top + bar_h + 4), txt, font=mono, fill=0)
     return img
 
+def draw_progress_frame(width, height, title_font, ratio:float, label:str):
+    """
+    上2/3反転ロゴ + 下1/3プログレスバー
+    """
+    img = _progress_layer(width, height, title_font, label).copy()
+    d = ImageDraw.Draw(img)
+    bar_top, bar_h, bar_left, bar_right = _progress_geometry(width, height)
+    # 充填
+    fill_w = int((bar_right - bar_left - 2) * max(0.0, min(1.0, ratio)))
+    if fill_w > 0:
+        d.rectangle([bar_left+1, bar_top+1, bar_left+1 + fill_w, bar_top + bar_h -1], fill=0)
+    return img
+
 # ---------- Animations ----------
-def animate_start(epd, bicolor, steps:int=10, min_frame_sec:float=0.25, label="Booting…", gentle: bool = False):
+def start_frames_path(epd, steps:int, label:str) -> str:
+    """パネル形状・ステップ数・ラベル・フォントで決まるキャッシュファイル名。"""
+    pw = getattr(epd, "width", 250); ph = getattr(epd, "height", 122)
+    font = pick_font(TITLE_FONT_CANDIDATES, 26)
+    key = f"{FRAME_CACHE_VERSION}|{steps}|{label}|{getattr(font, 'path', '')}|{type(epd).__module__}"
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:12]
+    return os.path.join(FRAME_CACHE_DIR, f"start-{pw}x{ph}-{steps}-{digest}.frames")
+
+def render_start_frames(epd, steps:int, label:str) -> List[bytes]:
+    """ロゴ + 各プログレスフレームを描き、getbuffer() 済みのバイト列で返す。"""
     w, h = epd_dims(epd)
     title_font = pick_font(TITLE_FONT_CANDIDATES, 26)
+    frames = [draw_logo_panel(w, h, title_font, invert=True)]
+    frames += [draw_progress_frame(w, h, title_font, i/steps, label) for i in range(steps+1)]
+    return [bytes(epd.getbuffer(f)) for f in frames]
+
+def save_start_frames(path:str, epd, buffers:List[bytes]) -> bool:
+    """一時ファイルに書いてから rename（途中で電源が落ちても壊れたキャッシュを残さない）。"""
+    if not buffers or len({len(b) for b in buffers}) != 1:
+        return False
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".frames-")
+        with os.fdopen(fd, "wb") as f:
+            f.write(FRAME_HEADER.pack(FRAME_MAGIC, getattr(epd, "width", 250), getattr(epd, "height", 122),
+                                      len(buffers), len(buffers[0])))
+            for b in buffers:
+                f.write(b)
+        os.replace(tmp, path)
+        return True
+    except OSError:
+        return False
+
+def load_start_frames(path:str, epd, count:int) -> Optional[Tuple[mmap.mmap, List[memoryview]]]:
+    """キャッシュを mmap し、各フレームのゼロコピー view を返す。形状が合わなければ None。"""
+    try:
+        with open(path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    try:
+        magic, pw, ph, n, size = FRAME_HEADER.unpack_from(mm, 0)
+    except struct.error:
+        mm.close()
+        return None
+    if (magic != FRAME_MAGIC or (pw, ph) != (getattr(epd, "width", 250), getattr(epd, "height", 122))
+            or n != count or len(mm) != FRAME_HEADER.size + n * size):
+        mm.close()
+        return None
+    view = memoryview(mm)
+    off = FRAME_HEADER.size
+    return mm, [view[off + i*size: off + (i+1)*size] for i in range(n)]
+
+def prerender_start(epd, steps:int, label:str="Booting…") -> str:
+    path = start_frames_path(epd, steps, label)
+    if not save_start_frames(path, epd, render_start_frames(epd, steps, label)):
+        raise RuntimeError(f"cannot write {path}")
+    return path
+
+def _stream_frames(epd, bicolor, frames, min_frame_sec:float):
+    """
+    描画済みバッファをそのまま送る。先頭（ロゴ）はフル更新、以降は部分更新API
+    があれば部分更新（FULL_EVERY 回ごとにフル）、同一フレームは送らない。
+    """
+    partial_api = _partial_api(epd)
+    if partial_api is not None and _is_windowed(partial_api):
+        pw = getattr(epd, "width", 250); ph = getattr(epd, "height", 122)
+        partial_api = (lambda buf, api=partial_api: api(buf, 0, 0, pw, ph))
+    full = getattr(epd, "displayPartBaseImage", epd.display)
+    red = epd.getbuffer(Image.new("1", epd_dims(epd), 255)) if bicolor else None
+    prev = None; partials = 0
+    for i, buf in enumerate(frames):
+        if prev is not None and buf == prev:
+            time.sleep(min_frame_sec)
+            continue
+        if i > 0 and partial_api is not None and partials < FULL_EVERY:
+            partial_api(buf)
+            partials += 1
+        else:
+            if bicolor:
+                epd.display(buf, red)
+            else:
+                full(buf)
+            partials = 0
+        prev = buf
+        if i > 0:
+            time.sleep(min_frame_sec)
+
+def animate_start(epd, bicolor, steps:int=10, min_frame_sec:float=0.25, label="Booting…", gentle: bool = False,
+                  cache: bool = True):
+    """
+    cache=True なら描画済みフレーム（start_frames_path）を mmap して流すだけにする。
+    無ければ従来どおり PIL で描き、送ったバッファを後でキャッシュに書く。
+    """
     # 1) 起動時はまず一度だけフルリフレッシュで残像を掃く
     epd_full_clear(epd, bicolor)
+    path = start_frames_path(epd, steps, label) if cache else ""
+    cached = load_start_frames(path, epd, steps + 2) if cache else None
+    if cached is not None:
+        mm, frames = cached
+        try:
+            _stream_frames(epd, bicolor, frames, min_frame_sec)
+        finally:
+            for v in frames:
+                v.release()
+            mm.close()
+        # パネル上の内容は PIL 画像として持っていないので重複判定の基準を捨てる
+        panel_reset(epd, cleared=True)
+        epd.sleep()
+        return
+
+    w, h = epd_dims(epd)
+    title_font = pick_font(TITLE_FONT_CANDIDATES, 26)
     # 2) 反転ロゴをフル更新で安定表示（以降のバー更新は部分更新で控えめに）
     base = draw_logo_panel(w, h, title_font, invert=True)
     show_on_epd(base, epd, bicolor, gentle=False)
+    images = [base]
     for i in range(steps+1):
         ratio = i/steps
         frame = draw_progress_frame(w, h, title_font, ratio, label)
         show_on_epd(frame, epd, bicolor, gentle=gentle)
+        images.append(frame)
         time.sleep(min_frame_sec)
     epd.sleep()
+    if cache:
+        # アニメ表示後（パネルはスリープ済み）に次回起動用のキャッシュを書く
+        save_start_frames(path, epd, [bytes(epd.getbuffer(f)) for f in images])
 
 def animate_shutdown(epd, bicolor, hold_sec:float=1.0):
     w, h = epd_dims(epd)
@@ -232,29 +504,34 @@ def animate_shutdown(epd, bicolor, hold_sec:float=1.0):
     try:
         # 多くのWaveshareドライバに Clear(0xFF) がある
         epd.init()
+        panel_reset(epd, cleared=True)
         try:
             epd.Clear(0xFF)
         except AttributeError:
             # ない場合は全面白のバッファを送る
             blank = Image.new("1", (w, h), 255)
-            show_on_epd(blank, epd, bicolor)
+            show_on_epd(blank, epd, bicolor, force_full=True)
         epd.sleep()
     except Exception:
         # 失敗しても沈黙。終了処理だ、静粛に。
         pass
 
 # ---------- Legacy splash (情報パネル) ----------
-def draw_info_panel(ssid: str, ip: str, session: Optional[str], width: int, height: int, debug: bool = False):
+@lru_cache(maxsize=8)
+def _info_layer(width, height, font_b):
+    """タイトル帯（反転）だけ描いた下地と、本文の開始 y。"""
     img = Image.new("1", (width, height), 255); d = ImageDraw.Draw(img)
-    font_b = pick_font(TITLE_FONT_CANDIDATES, 18)
-    font_m = pick_font(MONO_FONT_CANDIDATES, 16)
-
-    # タイトル帯（反転）
     t="Azazel-Zero"; tw,th=d.textsize(t,font=font_b); margin=6
     d.rectangle([(0,0),(width,th+margin*2)],fill=0)
     d.text(((width-tw)//2,margin),t,font=font_b,fill=255)
+    return img, th + margin * 2 + 12
+
+def draw_info_panel(ssid: str, ip: str, session: Optional[str], width: int, height: int, debug: bool = False):
+    font_b = pick_font(TITLE_FONT_CANDIDATES, 18)
+    font_m = pick_font(MONO_FONT_CANDIDATES, 16)
+    base, y = _info_layer(width, height, font_b)
+    img = base.copy(); d = ImageDraw.Draw(img)
 
-    y = th + margin * 2 + 12
     # SSID
     ssid_text = fit_text(d, f"SSID: {ssid}", font_m, width-16)
     d.text((8,y), ssid_text, font=font_m, fill=0); y += 20
@@ -276,6 +553,88 @@ def draw_info_panel(ssid: str, ip: str, session: Optional[str], width: int, heig
     d.text((x_text, y), ip_text, font=font_m, fill=0)
     return img
 
+# ---------- Alert / status panels ----------
+def _header_band(d, width, text, font, invert=True, right: str = ""):
+    """上部の帯（invert=True で反転）に見出しと右寄せの補足。帯の下端 y を返す。"""
+    tw, th = d.textsize(text, font=font); margin = 4
+    bottom = th + margin * 2
+    if invert:
+        d.rectangle([(0, 0), (width, bottom)], fill=0)
+    else:
+        d.line([(0, bottom), (width, bottom)], fill=0, width=2)
+    fg = 255 if invert else 0
+    d.text((6, margin), text, font=font, fill=fg)
+    if right:
+        mono = pick_font(MONO_FONT_CANDIDATES, 14)
+        rw, rh = d.textsize(right, font=mono)
+        d.text((width - rw - 6, margin + max(0, (th - rh)//2)), right, font=mono, fill=fg)
+    return bottom
+
+def draw_alert_panel(message: str, severity: int, width: int, height: int, count: int = 0,
+                     more: int = 0, summary: bool = False, signatures: int = 0):
+    """
+    IDS アラート。summary=True は低重大度アラートのまとめ（件数と最多シグネチャ）。
+    """
+    img = Image.new("1", (width, height), 255); d = ImageDraw.Draw(img)
+    font_b = pick_font(TITLE_FONT_CANDIDATES, 18)
+    font_m = pick_font(MONO_FONT_CANDIDATES, 14)
+    head = f"IDS x{count}" if summary else f"ALERT sev{severity}"
+    # 高重大度だけ反転帯で目立たせる
+    y = _header_band(d, width, head, font_b, invert=not summary, right=time.strftime("%H:%M")) + 6
+    lines = wrap_text(d, message or "-", font_m, width - 12, 3 if summary else 4)
+    for ln in lines:
+        d.text((6, y), ln, font=font_m, fill=0); y += 17
+    if summary:
+        foot = f"{count} low-sev alert(s), {signatures} rule(s)"
+    elif more:
+        foot = f"+{more} more"
+    else:
+        foot = ""
+    if foot:
+        foot = fit_text(d, foot, font_m, width - 12)
+        fw, fh = d.textsize(foot, font=font_m)
+        d.text((width - fw - 6, height - fh - 4), foot, font=font_m, fill=0)
+    return img
+
+def draw_status_panel(stage: str, suspicion: float, reason: str, width: int, height: int,
+                      max_suspicion: float = 100.0, queued_alerts: int = 0, ssid: Optional[str] = None):
+    """
+    first-minute のステージと疑わしさ。CONTAIN/DECEPTION は反転帯。
+    """
+    img = Image.new("1", (width, height), 255); d = ImageDraw.Draw(img)
+    font_b = pick_font(TITLE_FONT_CANDIDATES, 18)
+    font_m = pick_font(MONO_FONT_CANDIDATES, 14)
+    y = _header_band(d, width, stage or "UNKNOWN", font_b, invert=(stage in ALARM_STAGES),
+                     right=time.strftime("%H:%M")) + 6
+    # 疑わしさ: 数値 + バー
+    label = f"SUS {suspicion:5.1f}"
+    lw, lh = d.textsize(label, font=font_m)
+    d.text((6, y), label, font=font_m, fill=0)
+    bar_left, bar_right = 6 + lw + 6, width - 8
+    bar_top, bar_h = y + max(0, (lh - 10)//2), 10
+    d.rectangle([bar_left, bar_top, bar_right, bar_top + bar_h], outline=0, width=1)
+    ratio = max(0.0, min(1.0, suspicion / max_suspicion if max_suspicion else 0.0))
+    fill_w = int((bar_right - bar_left - 2) * ratio)
+    if fill_w > 0:
+        d.rectangle([bar_left+1, bar_top+1, bar_left+1 + fill_w, bar_top + bar_h - 1], fill=0)
+    y += 20
+    if reason:
+        d.text((6, y), fit_text(d, f"Why: {reason}", font_m, width - 12), font=font_m, fill=0); y += 17
+    foot = f"IDS: {queued_alerts} queued" if queued_alerts else (f"SSID: {ssid}" if ssid else "")
+    if foot:
+        foot = fit_text(d, foot, font_m, width - 12)
+        fw, fh = d.textsize(foot, font=font_m)
+        d.text((6, height - fh - 4), foot, font=font_m, fill=0)
+    return img
+
+def fetch_status(url: str = STATUS_URL, timeout: float = 3.0) -> dict:
+    """status API の /state（state, suspicion, reason ...）。取れなければ空 dict。"""
+    try:
+        with urllib.request.urlopen(url.rstrip("/") + "/state", timeout=timeout) as r:
+            return json.loads(r.read().decode("utf-8"))
+    except Exception:
+        return {}
+
 def show_info_panel(epd, bicolor, ssid, ip, session: Optional[str], debug: bool = False):
     w,h = epd_dims(epd)
     # 情報表示の前に一度だけフルリフレッシュして文字のエッジを安定させる
@@ -288,37 +647,59 @@ def show_info_panel(epd, bicolor, ssid, ip, session: Optional[str], debug: bool
 # ---------- CLI ----------
 def main():
     ap = argparse.ArgumentParser(description="Azazel-Zero EPD splash & animations")
-    ap.add_argument("--mode", choices=["start","info","shutdown"], default="info",
-                    help="start: 起動アニメ, info: 情報パネル, shutdown: 終了アニメ")
+    ap.add_argument("--mode", choices=["start","info","shutdown","alert","status","prerender"], default="info",
+                    help="start: 起動アニメ, info: 情報パネル, shutdown: 終了アニメ, "
+                         "alert: IDSアラート, status: first-minute のステージ, "
+                         "prerender: 起動アニメのフレームを描画してキャッシュ（パネルは更新しない）")
     ap.add_argument("--steps", type=int, default=int(os.getenv("STEPS", "10")),
                     help="startアニメのステップ数")
     ap.add_argument("--frame-sec", type=float, default=float(os.getenv("FRAME_SEC","0.25")),
                     help="startアニメのフレーム間隔秒")
     ap.add_argument("--gentle", action="store_true", help="部分更新が可能なら使用して反転演出を抑制")
     ap.add_argument("--no-clear", action="store_true", help="info表示の初回フルクリアを省略（連続更新向け）")
+    ap.add_argument("--no-frame-cache", action="store_true", help="startアニメで描画済みフレームを使わない")
+    ap.add_argument("--severity", type=int, default=2, help="alertモードの重大度（1=高, 3=低）")
+    ap.add_argument("--status-url", type=str, default=STATUS_URL, help="statusモードで読む status API")
     ap.add_argument("--timeout", type=int, default=int(os.getenv("TIMEOUT", DEFAULT_TIMEOUT)))
     ap.add_argument("--iface", type=str, default=os.getenv("IFACE",""))
     ap.add_argument("--debug", action="store_true", default=(os.getenv("DEBUG","0")=="1"))
-    ap.add_argument("session", nargs="*", help="infoモードのTMUX表示用")
+    ap.add_argument("session", nargs="*", help="infoモードのTMUX表示用 / alertモードのメッセージ")
     args = ap.parse_args()
 
-    # EPD 初期化
+    # EPD 初期化（prerender は getbuffer() のためにドライバだけ使い、パネルには触れない）
     try:
-        epd, bic = init_epd(debug=args.debug)
+        epd, bic = init_epd(debug=args.debug, init=(args.mode != "prerender"))
     except Exception as e:
         if args.debug:
             print("EPD init failed:", repr(e))
             traceback.print_exc()
         sys.exit(1)
 
+    if args.mode == "prerender":
+        print(prerender_start(epd, args.steps, label="Booting…"))
+        return
+
     if args.mode == "start":
-        animate_start(epd, bic, steps=args.steps, min_frame_sec=args.frame_sec, label="Booting…", gentle=args.gentle)
+        animate_start(epd, bic, steps=args.steps, min_frame_sec=args.frame_sec, label="Booting…", gentle=args.gentle,
+                      cache=not args.no_frame_cache)
         return
 
     if args.mode == "shutdown":
         animate_shutdown(epd, bic, hold_sec=1.0)
         return
 
+    if args.mode in ("alert", "status"):
+        w, h = epd_dims(epd)
+        if args.mode == "alert":
+            img = draw_alert_panel(" ".join(args.session), args.severity, w, h)
+        else:
+            st = fetch_status(args.status_url)
+            img = draw_status_panel(str(st.get("state") or "UNKNOWN"), float(st.get("suspicion") or 0.0),
+                                    str(st.get("reason") or ""), w, h, ssid=get_ssid())
+        show_on_epd(img, epd, bic, gentle=args.gentle)
+        epd.sleep()
+        return
+
     # info: 既存の情報スプラッシュ（--no-clear指定時は初回フルクリアを省略）
     iface = args.iface if args.iface else get_default_iface()
     ssid, ip = wait_network(args.timeout, iface)
@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Azazel-Zero: e-paper display daemon
+- Owns the EPD for the lifetime of the service: Python, PIL and the driver
+  are loaded once and epd.init() only runs again after the panel slept
+- Accepts JSON render requests on a Unix datagram socket
+  (client: azazel_zero/console/epd_client.py)
+- Coalesces bursts and orders them by priority (DisplayScheduler): stage
+  transitions into CONTAIN/DECEPTION and high-severity alerts first, the
+  info panel last; low-severity alerts are batched into a summary panel
+- Follows the first-minute status API (/events) for stage changes
+- Rate-limits refreshes (--min-interval) and full refreshes
+  (--min-full-interval); a full refresh asked for too soon becomes partial
+- Frames identical to what is on the panel are skipped, and small changes
+  go out as (windowed) partial refreshes; see show_on_epd()
+
+Environment:
+  AZA_EPD_SOCKET=path   request socket (default: /run/azazel-epd.sock)
+  AZA_STATUS_URL=url    first-minute status API (default: http://127.0.0.1:8081)
+  EPD_LOCK=path         lock shared with direct boot_splash_epd.py runs
+"""
+
+import argparse
+import fcntl
+import http.client
+import json
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+import traceback
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+HERE = os.path.abspath(os.path.dirname(__file__))
+if HERE not in sys.path:
+    sys.path.insert(0, HERE)
+
+import boot_splash_epd as splash
+from azazel_zero.console.epd_client import LOCK_PATH, SOCKET_PATH
+from azazel_zero.console.epd_scheduler import URGENT, DisplayScheduler
+from azazel_zero.first_minute.sdnotify import SystemdNotifier
+
+MODES = ("info", "start", "shutdown", "alert", "status")
+
+
+class EpdDaemon:
+    def __init__(self, epd, bicolor: bool, sock_path: str, scheduler: Optional[DisplayScheduler] = None,
+                 min_full_interval: float = 180.0, idle_sleep: float = 30.0,
+                 iface: str = "", debug: bool = False):
+        self.epd = epd
+        self.bicolor = bicolor
+        self.sock_path = sock_path
+        self.sched = scheduler or DisplayScheduler()
+        self.min_full_interval = min_full_interval
+        self.idle_sleep = idle_sleep
+        self.iface = iface
+        self.debug = debug
+        self.awake = True  # init_epd() leaves the panel initialised
+        self.started = time.monotonic()
+        self.last_render = 0.0
+        self.last_full = 0.0
+        self.rendered = 0
+        self.skipped = 0
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._sock: Optional[socket.socket] = None
+
+    # ---------- requests ----------
+
+    def bind(self) -> None:
+        try:
+            os.unlink(self.sock_path)
+        except FileNotFoundError:
+            pass
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM | socket.SOCK_CLOEXEC)
+        sock.bind(self.sock_path)
+        # The console tools run as the login user, the daemon as root.
+        os.chmod(self.sock_path, 0o666)
+        sock.settimeout(1.0)
+        self._sock = sock
+
+    @property
+    def coalesced(self) -> int:
+        return self.sched.coalesced
+
+    def submit(self, req: Dict[str, Any]) -> None:
+        with self._cond:
+            self.sched.submit(req, time.monotonic())
+            self._cond.notify()
+
+    def receive_loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                data = self._sock.recv(65536)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            try:
+                req = json.loads(data.decode("utf-8"))
+            except ValueError:
+                continue
+            if not isinstance(req, dict) or req.get("mode") not in MODES:
+                if self.debug:
+                    print(f"[epd] ignored request: {data[:80]!r}", file=sys.stderr)
+                continue
+            self.submit(req)
+
+    # ---------- rendering ----------
+
+    def _take(self) -> Optional[Tuple[Dict[str, Any], int]]:
+        """Wait until the scheduler hands out a request; return it with its priority."""
+        with self._cond:
+            idle_deadline = max(self.last_render, self.started) + self.idle_sleep
+            while not self._stop.is_set():
+                now = time.monotonic()
+                # Requests arriving while we wait are coalesced by the scheduler.
+                req, prio, wait = self.sched.next(now)
+                if req is not None:
+                    return req, prio
+                if self.awake and now >= idle_deadline:
+                    return None  # idle: let the caller put the panel to sleep
+                self._cond.wait(min(wait, 0.5) if wait else 0.5)
+            return None
+
+    def ensure_awake(self) -> None:
+        if not self.awake:
+            self.epd.init()
+            splash.panel_reset(self.epd)
+            self.awake = True
+
+    def sleep_panel(self) -> None:
+        if self.awake:
+            try:
+                self.epd.sleep()
+            except Exception:
+                if self.debug:
+                    traceback.print_exc()
+            self.awake = False
+
+    def _show(self, img, prio: int, now: float) -> None:
+        # Urgent panels get a clean full refresh when the full-refresh budget allows.
+        full = (prio == URGENT and now - self.last_full >= self.min_full_interval
+                and splash.frame_changed(self.epd, img))
+        result = splash.show_on_epd(img, self.epd, self.bicolor, force_full=full)
+        if result == "skip":
+            self.skipped += 1
+        elif result == "full":
+            self.last_full = now
+
+    def render(self, req: Dict[str, Any], prio: int = URGENT) -> None:
+        mode = req["mode"]
+        now = time.monotonic()
+        if mode == "start":
+            splash.animate_start(self.epd, self.bicolor, steps=int(req.get("steps", 10)),
+                                 min_frame_sec=float(req.get("frame_sec", 0.25)),
+                                 label=req.get("text") or "Booting…", gentle=bool(req.get("gentle")))
+            self.awake = False  # animate_start() puts the panel to sleep
+            self.last_full = now
+        elif mode == "shutdown":
+            splash.animate_shutdown(self.epd, self.bicolor, hold_sec=1.0)
+            self.awake = False
+        elif mode == "alert":
+            self.ensure_awake()
+            w, h = splash.epd_dims(self.epd)
+            img = splash.draw_alert_panel(req.get("text") or "", _int(req.get("severity"), 3), w, h,
+                                          count=_int(req.get("count"), 0), more=_int(req.get("more"), 0),
+                                          summary=bool(req.get("summary")),
+                                          signatures=_int(req.get("signatures"), 0))
+            self._show(img, prio, now)
+        elif mode == "status":
+            self.ensure_awake()
+            w, h = splash.epd_dims(self.epd)
+            try:
+                suspicion = float(req.get("suspicion") or 0.0)
+            except (TypeError, ValueError):
+                suspicion = 0.0
+            img = splash.draw_status_panel(str(req.get("stage") or "UNKNOWN"), suspicion,
+                                           str(req.get("reason") or ""), w, h,
+                                           queued_alerts=self.sched.pending_low(), ssid=splash.get_ssid())
+            self._show(img, prio, now)
+        else:
+            self.ensure_awake()
+            w, h = splash.epd_dims(self.epd)
+            iface = self.iface or splash.get_default_iface()
+            ssid = req.get("ssid") or splash.get_ssid()
+            ip = req.get("ip") or splash.get_ipv4(iface) or "0.0.0.0"
+            img = splash.draw_info_panel(ssid, ip, req.get("text") or "", w, h, debug=self.debug)
+            # A full clear is the slow, flashing part; allow one per min_full_interval,
+            # and never for a frame that is already on the panel.
+            full = (bool(req.get("clear", True)) and now - self.last_full >= self.min_full_interval
+                    and splash.frame_changed(self.epd, img))
+            if full:
+                splash.epd_full_clear(self.epd, self.bicolor)
+                self.last_full = now
+            result = splash.show_on_epd(img, self.epd, self.bicolor, gentle=not full)
+            if result == "skip":
+                self.skipped += 1
+            elif result == "full":
+                self.last_full = now
+        self.rendered += 1
+
+    def render_loop(self) -> None:
+        while not self._stop.is_set():
+            taken = self._take()
+            if taken is None:
+                if not self._stop.is_set():
+                    self.sleep_panel()
+                continue
+            req, prio = taken
+            try:
+                self.render(req, prio)
+            except Exception as e:
+                print(f"[epd] render {req.get('mode')} failed: {e}", file=sys.stderr)
+                if self.debug:
+                    traceback.print_exc()
+                self.awake = False  # re-init before the next attempt
+            self.last_render = time.monotonic()
+            with self._cond:
+                self.sched.rendered(prio, self.last_render)
+
+    def follow_status(self, url: str) -> None:
+        """Turn the controller's stage snapshots/changes (SSE /events) into status requests."""
+        parts = urlsplit(url)
+        backoff = 2.0
+        while not self._stop.is_set():
+            conn = http.client.HTTPConnection(parts.hostname or "127.0.0.1", parts.port or 80, timeout=60)
+            try:
+                conn.request("GET", parts.path.rstrip("/") + "/events")
+                resp = conn.getresponse()
+                if resp.status != 200:
+                    raise OSError(f"HTTP {resp.status}")
+                backoff = 2.0
+                event, data = "", ""
+                while not self._stop.is_set():
+                    line = resp.readline()
+                    if not line:
+                        break
+                    line = line.decode("utf-8", "replace").rstrip("\r\n")
+                    if line.startswith("event:"):
+                        event = line[6:].strip()
+                    elif line.startswith("data:"):
+                        data += line[5:].strip()
+                    elif not line:
+                        self._status_event(event, data)
+                        event, data = "", ""
+            except (OSError, http.client.HTTPException) as e:
+                if self.debug:
+                    print(f"[epd] status feed: {e}", file=sys.stderr)
+            finally:
+                conn.close()
+            self._stop.wait(backoff)
+            backoff = min(backoff * 2, 30.0)
+
+    def _status_event(self, event: str, data: str) -> None:
+        if event not in ("snapshot", "state-change"):
+            return
+        try:
+            doc = json.loads(data)
+        except ValueError:
+            return
+        stage = doc.get("to") if event == "state-change" else doc.get("state")
+        if stage:
+            self.submit({"mode": "status", "stage": stage, "suspicion": doc.get("suspicion", 0),
+                         "reason": doc.get("reason", "")})
+
+    def stop(self) -> None:
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+
+    def close(self) -> None:
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+        try:
+            os.unlink(self.sock_path)
+        except OSError:
+            pass
+
+
+def _int(value: Any, default: int) -> int:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Azazel-Zero EPD daemon")
+    ap.add_argument("--socket", default=SOCKET_PATH, help="要求を受け付ける Unix ソケット")
+    ap.add_argument("--min-interval", type=float, default=float(os.getenv("MIN_EPD_INTERVAL", "1")),
+                    help="描画の最小間隔（秒）。間に届いた要求は最新の1件にまとめる")
+    ap.add_argument("--min-full-interval", type=float, default=float(os.getenv("MIN_EPD_FULL_INTERVAL", "180")),
+                    help="フルリフレッシュの最小間隔（秒）。これより早い要求は部分更新にする")
+    ap.add_argument("--idle-sleep", type=float, default=30.0, help="この秒数描画がなければパネルをスリープ")
+    ap.add_argument("--alert-hold", type=float, default=60.0,
+                    help="高優先度パネル（CONTAIN 遷移・高重大度アラート）を info 等で上書きしない秒数")
+    ap.add_argument("--summary-sec", type=float, default=60.0, help="低重大度アラートをまとめて表示する間隔（秒）")
+    ap.add_argument("--high-severity", type=int, default=2, help="この重大度以下（1=高）のアラートは個別に表示")
+    ap.add_argument("--status-url", type=str, default=os.getenv("AZA_STATUS_URL", "http://127.0.0.1:8081"),
+                    help="first-minute の status API（/events でステージ変化を受け取る）")
+    ap.add_argument("--no-status", action="store_true", help="status API を購読しない")
+    ap.add_argument("--boot-animation", action="store_true", help="起動時に start アニメを表示")
+    ap.add_argument("--steps", type=int, default=int(os.getenv("STEPS", "10")), help="startアニメのステップ数")
+    ap.add_argument("--frame-sec", type=float, default=float(os.getenv("FRAME_SEC", "0.25")),
+                    help="startアニメのフレーム間隔秒")
+    ap.add_argument("--no-shutdown-animation", action="store_true", help="停止時の終了アニメを省略")
+    ap.add_argument("--iface", type=str, default=os.getenv("IFACE", ""))
+    ap.add_argument("--debug", action="store_true", default=(os.getenv("DEBUG", "0") == "1"))
+    args = ap.parse_args()
+
+    # Hold the shared lock for our lifetime so direct boot_splash_epd.py runs
+    # (flock -w 0 in the shell helpers) back off instead of fighting over SPI.
+    lock = open(LOCK_PATH, "a")
+    fcntl.flock(lock, fcntl.LOCK_EX)
+
+    try:
+        epd, bic = splash.init_epd(debug=args.debug)
+    except Exception as e:
+        print(f"[epd] EPD init failed: {e}", file=sys.stderr)
+        return 1
+
+    notifier = SystemdNotifier()
+    sched = DisplayScheduler(min_interval=args.min_interval, hold_sec=args.alert_hold,
+                             summary_sec=args.summary_sec, high_severity=args.high_severity)
+    daemon = EpdDaemon(epd, bic, args.socket, scheduler=sched,
+                       min_full_interval=args.min_full_interval, idle_sleep=args.idle_sleep,
+                       iface=args.iface, debug=args.debug)
+    daemon.bind()
+    signal.signal(signal.SIGTERM, lambda *_: daemon.stop())
+    signal.signal(signal.SIGINT, lambda *_: daemon.stop())
+    if args.boot_animation:
+        daemon.submit({"mode": "start", "steps": args.steps, "frame_sec": args.frame_sec})
+
+    receiver = threading.Thread(target=daemon.receive_loop, name="epd-recv", daemon=True)
+    receiver.start()
+    if not args.no_status:
+        threading.Thread(target=daemon.follow_status, args=(args.status_url,), name="epd-status",
+                         daemon=True).start()
+    # Requests are accepted (and queued) from here on, even during the boot animation.
+    notifier.ready(f"listening on {args.socket}")
+    try:
+        daemon.render_loop()
+    finally:
+        notifier.stopping()
+        daemon.close()
+        if not args.no_shutdown_animation:
+            try:
+                splash.animate_shutdown(epd, bic, hold_sec=1.0)
+            except Exception:
+                pass
+        else:
+            daemon.sleep_panel()
+        print(f"[epd] rendered {daemon.rendered}, coalesced {daemon.coalesced}, "
+              f"unchanged {daemon.skipped}", file=sys.stderr)
+        lock.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""Startup benchmark for azazel_zero_run.py subcommands.
+
+Runs each side-effect-free subcommand under `python -X importtime` against a
+throwaway config (no daemon, status API on a closed local port), then reports
+wall time, total import time and the heaviest top-level imports. Exits 1 when
+a command does not finish the way it should (e.g. an argparse error), a
+budget is exceeded or a fast-path command pulls in a module it should not,
+so it can guard against import regressions:
+
+    python3 tools/cli_startup_bench.py
+    python3 tools/cli_startup_bench.py --runs 10 --budget-ms 150 --json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+RUNNER = REPO_ROOT / "azazel_zero_run.py"
+
+# Subcommand -> extra argv. All of these finish without root or network.
+COMMANDS: Dict[str, List[str]] = {
+    "help": [],
+    "stop": [],
+    "reload": [],
+    "status": [],
+    "dry-run": [],
+    "flight-dump": ["--file", "/nonexistent"],
+}
+
+# Expected (exit code, output marker) when it is not (0, ""): without a daemon,
+# stop/reload end at the missing PID file and flight-dump at the missing
+# recorder file, all after the config has been loaded.
+EXPECTED: Dict[str, Tuple[int, str]] = {
+    "stop": (1, "No PID file"),
+    "reload": (1, "No PID file"),
+    "flight-dump": (1, "flight-dump: "),
+}
+
+# Modules that must not be imported on the fast paths.
+HEAVY = ("ssl", "http.server", "yaml", "numpy", "logging", "azazel_zero.first_minute.controller")
+FAST_PATH = ("help", "stop", "reload", "status")
+
+CONFIG = """\
+paths:
+  runtime_dir: {tmp}/run
+  log_dir: {tmp}/log
+  pid_file: {tmp}/run/first_minute.pid
+  flight_recorder: {tmp}/run/flight_recorder.bin
+  nft_template: {nft}
+status_api:
+  host: 127.0.0.1
+  port: 9
+"""
+
+
+def parse_importtime(stderr: str) -> Tuple[int, List[Tuple[int, str]]]:
+    """Return (sum of self times in us, [(cumulative us, name)] for top-level imports)."""
+    total = 0
+    top: List[Tuple[int, str]] = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cum_us, name = line[len("import time:") :].split("|")
+        total += int(self_us)
+        if not name[1:].startswith(" "):  # nested imports are indented
+            top.append((int(cum_us), name.strip()))
+    return total, sorted(top, reverse=True)
+
+
+def run_once(cmd: str, config: Path, env: Dict[str, str]) -> Tuple[float, str, str]:
+    """Return (wall ms, stderr, error); error is "" when the command ended as expected."""
+    argv = [sys.executable, "-X", "importtime", str(RUNNER), cmd, "--config", str(config)] + COMMANDS.get(cmd, [])
+    start = time.perf_counter()
+    proc = subprocess.run(argv, cwd=REPO_ROOT, env=env, capture_output=True, text=True, timeout=60)
+    wall = (time.perf_counter() - start) * 1000.0
+    code, marker = EXPECTED.get(cmd, (0, ""))
+    error = ""
+    output = "\n".join(
+        ln for ln in (proc.stdout + proc.stderr).splitlines() if not ln.startswith("import time:")
+    )
+    if proc.returncode != code or marker not in output:
+        error = f"exit {proc.returncode} (expected {code}): {output.strip() or '(no output)'}"
+    return wall, proc.stderr, error
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("commands", nargs="*", default=list(COMMANDS), help="subcommands to measure")
+    parser.add_argument("--runs", type=int, default=5, help="runs per command (median reported)")
+    parser.add_argument("--top", type=int, default=5, help="heaviest imports to list per command")
+    parser.add_argument("--budget-ms", type=float, default=0.0, help="fail if a fast-path median exceeds this")
+    parser.add_argument("--json", action="store_true", help="machine-readable output")
+    args = parser.parse_args()
+
+    failures: List[str] = []
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        config = Path(tmp) / "first_minute.yaml"
+        config.write_text(CONFIG.format(tmp=tmp, nft=REPO_ROOT / "nftables" / "first_minute.nft"))
+        env = dict(os.environ, AZAZEL_ZERO_CACHE_DIR=str(Path(tmp) / "cache"))
+        # Warm the compiled config cache and .pyc files ("help" exits before loading the config).
+        _, _, error = run_once("dry-run", config, env)
+        if error:
+            failures.append(f"warm-up dry-run: {error}")
+        for cmd in args.commands:
+            walls, imports = [], []
+            stderr = ""
+            errors = []
+            for _ in range(max(1, args.runs)):
+                wall, stderr, error = run_once(cmd, config, env)
+                if error:
+                    errors.append(error)  # an invalid sample: not timed
+                    continue
+                walls.append(wall)
+                imports.append(parse_importtime(stderr)[0] / 1000.0)
+            if errors:
+                failures.append(f"{cmd}: {errors[0]}")
+            if not walls:
+                results.append({"command": cmd, "error": errors[0]})
+                continue
+            _, top = parse_importtime(stderr)
+            names = {n for _, n in top} | {
+                line.rsplit("|", 1)[-1].strip() for line in stderr.splitlines() if line.startswith("import time:")
+            }
+            heavy = [m for m in HEAVY if m in names]
+            res = {
+                "command": cmd,
+                "wall_ms": round(statistics.median(walls), 1),
+                "import_ms": round(statistics.median(imports), 1),
+                "top": [{"module": n, "cumulative_ms": round(us / 1000.0, 1)} for us, n in top[: args.top]],
+                "heavy": heavy,
+            }
+            results.append(res)
+            if cmd in FAST_PATH and heavy:
+                failures.append(f"{cmd}: imports {', '.join(heavy)}")
+            if cmd in FAST_PATH and args.budget_ms and res["wall_ms"] > args.budget_ms:
+                failures.append(f"{cmd}: {res['wall_ms']} ms > budget {args.budget_ms} ms")
+
+    if args.json:
+        print(json.dumps({"results": results, "failures": failures}, indent=2))
+    else:
+        for res in results:
+            if "error" in res:
+                print(f"{res['command']:12} INVALID  {res['error']}")
+                continue
+            top = ", ".join(f"{t['module']} {t['cumulative_ms']}" for t in res["top"])
+            print(f"{res['command']:12} wall {res['wall_ms']:7.1f} ms  imports {res['import_ms']:6.1f} ms  [{top}]")
+        for msg in failures:
+            print(f"FAIL {msg}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
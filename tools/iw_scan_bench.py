@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""Parser benchmark for `iw scan` output (azazel_zero.sensors.wifi_scan).
+
+Times parse_scan() over captured scan dumps and, for comparison, the old
+regex/dict parser it replaced. Capture a dump on the device with
+
+    sudo iw dev wlan0 scan dump > /tmp/scan-station.txt
+
+and run
+
+    python3 tools/iw_scan_bench.py /tmp/scan-*.txt
+    python3 tools/iw_scan_bench.py --synthetic 400 --runs 20 --json
+
+Without files, a synthetic dump with --synthetic BSSes is generated.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import re
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT / "py"))
+
+from azazel_zero.sensors.wifi_scan import parse_scan, security_label  # noqa: E402
+
+_AKMS = [["PSK"], ["PSK", "SAE"], ["SAE"], ["IEEE 802.1X"], ["OWE"], ["PSK", "FT/PSK"]]
+
+
+def synthetic_dump(count: int, seed: int = 1) -> str:
+    """A dump shaped like real iw output: ~40 lines per BSS incl. HT/VHT blocks."""
+    rnd = random.Random(seed)
+    out: List[str] = []
+    for i in range(count):
+        freq = rnd.choice([2412, 2437, 2462, 5180, 5500, 5745, 5955])
+        out.append(f"BSS 02:00:00:{i >> 16 & 255:02x}:{i >> 8 & 255:02x}:{i & 255:02x}(on wlan0)")
+        out.append(f"\tlast seen: {rnd.randint(10, 9000)} ms [boottime]")
+        out.append("\tTSF: 123456789 usec (0d, 00:02:03)")
+        out.append(f"\tfreq: {freq}")
+        out.append("\tbeacon interval: 100 TUs")
+        out.append("\tcapability: ESS Privacy ShortSlotTime (0x0411)")
+        out.append(f"\tsignal: {rnd.uniform(-92, -35):.2f} dBm")
+        out.append(f"\tSSID: net-{i % max(1, count // 3)}")
+        out.append("\tSupported rates: 1.0* 2.0* 5.5* 11.0* 6.0 9.0 12.0 18.0 ")
+        out.append("\tDS Parameter set: channel 6")
+        akm = rnd.choice(_AKMS + [[]])
+        if akm:
+            out.append("\tRSN:\t * Version: 1")
+            out.append("\t\t * Group cipher: CCMP")
+            out.append("\t\t * Pairwise ciphers: CCMP")
+            out.append("\t\t * Authentication suites: " + " ".join(akm))
+            out.append("\t\t * Capabilities: 16-PTKSA-RC 1-GTKSA-RC MFP-capable (0x008c)")
+        out.append("\tHT capabilities:")
+        out.append("\t\tCapabilities: 0x1ad")
+        for cap in ("RX LDPC", "HT20", "SM Power Save disabled", "RX HT20 SGI", "RX STBC 1-stream"):
+            out.append(f"\t\t\t{cap}")
+        out.append("\t\tMaximum RX AMPDU length 65535 bytes (exponent: 0x003)")
+        out.append("\tHT operation:")
+        out.append("\t\t * primary channel: 6")
+        out.append("\t\t * secondary channel offset: no secondary")
+        out.append("\t\t * STA channel width: 20 MHz")
+        out.append("\tExtended capabilities:")
+        for cap in ("Extended Channel Switching", "BSS Transition", "Operating Mode Notification"):
+            out.append(f"\t\t * {cap}")
+        out.append("\tWMM:\t * Parameter version 1")
+        for ac in ("BE", "BK", "VI", "VO"):
+            out.append(f"\t\t * {ac}: CW 15-1023, AIFSN 3")
+    return "\n".join(out) + "\n"
+
+
+def legacy_parse(text: str) -> List[Dict[str, object]]:
+    """The previous parser (regex per line, repeated strip(), dict per BSS)."""
+    nets: List[Dict[str, object]] = []
+    cur = None
+    rsn_block = wpa_block = False
+    for line in text.splitlines():
+        line = line.rstrip()
+        m_bss = re.match(r"^BSS\s+([0-9a-f:]{17})", line)
+        if m_bss:
+            if cur:
+                nets.append(cur)
+            cur = {"bssid": m_bss.group(1), "ssid": "", "freq": None, "chan": None, "signal": None,
+                   "rsn": False, "wpa": False, "wpa3": False}
+            rsn_block = wpa_block = False
+            continue
+        if cur is None:
+            continue
+        if line.strip().startswith("SSID:"):
+            cur["ssid"] = line.split("SSID:", 1)[1].strip()
+            continue
+        if line.strip().startswith("freq:"):
+            try:
+                cur["freq"] = int(line.split("freq:", 1)[1].strip())
+            except Exception:
+                pass
+            continue
+        if line.strip().startswith("signal:"):
+            try:
+                cur["signal"] = float(line.split("signal:", 1)[1].split("dBm")[0].strip())
+            except Exception:
+                pass
+            continue
+        if line.strip().startswith("RSN:"):
+            cur["rsn"] = True
+            rsn_block, wpa_block = True, False
+            continue
+        if line.strip().startswith("WPA:"):
+            cur["wpa"] = True
+            wpa_block, rsn_block = True, False
+            continue
+        if (rsn_block or wpa_block) and "SAE" in line:
+            cur["wpa3"] = True
+        if line and not line.startswith("\t") and not line.startswith(" "):
+            rsn_block = wpa_block = False
+    if cur:
+        nets.append(cur)
+    return nets
+
+
+def time_parser(fn: Callable[[str], list], text: str, runs: int) -> float:
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn(text)
+        samples.append((time.perf_counter() - start) * 1000.0)
+    return statistics.median(samples)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("dumps", nargs="*", help="captured `iw dev <if> scan dump` outputs")
+    parser.add_argument("--synthetic", type=int, default=300, help="BSS count for the generated dump (no files given)")
+    parser.add_argument("--runs", type=int, default=10, help="runs per parser (median reported)")
+    parser.add_argument("--json", action="store_true", help="machine-readable output")
+    args = parser.parse_args()
+
+    inputs = [(p, Path(p).read_text(errors="replace")) for p in args.dumps]
+    if not inputs:
+        inputs = [(f"synthetic:{args.synthetic}", synthetic_dump(args.synthetic))]
+
+    results = []
+    for name, text in inputs:
+        entries = parse_scan(text)
+        labels: Dict[str, int] = {}
+        for e in entries:
+            label = security_label(e.rsn, e.wpa, e.akm)
+            labels[label] = labels.get(label, 0) + 1
+        new_ms = time_parser(parse_scan, text, args.runs)
+        old_ms = time_parser(legacy_parse, text, args.runs)
+        results.append(
+            {
+                "input": name,
+                "lines": text.count("\n"),
+                "bss": len(entries),
+                "parse_ms": round(new_ms, 2),
+                "legacy_ms": round(old_ms, 2),
+                "speedup": round(old_ms / new_ms, 2) if new_ms else None,
+                "security": labels,
+            }
+        )
+
+    if args.json:
+        print(json.dumps({"results": results}, indent=2))
+    else:
+        for r in results:
+            sec = ", ".join(f"{k} {v}" for k, v in sorted(r["security"].items()))
+            print(
+                f"{r['input']}: {r['bss']} BSS / {r['lines']} lines  "
+                f"parse {r['parse_ms']:.2f} ms  legacy {r['legacy_ms']:.2f} ms  x{r['speedup']}  [{sec}]"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())